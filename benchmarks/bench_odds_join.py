@@ -0,0 +1,103 @@
+"""Benchmarks the odds/prediction join against the old iterrows loop.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_odds_join --players 300 --markets 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from models.scoring import merge_predictions, normalize_american_odds
+
+
+MARKETS = {'pts': 'points', 'reb': 'rebounds', 'ast': 'assists', '3pm': 'threes'}
+
+
+def make_board(players, markets, seed=0):
+    """Builds a synthetic slate: per-market odds boards and one prediction row per player."""
+    rng = np.random.default_rng(seed)
+    names = [f'player {i}' for i in range(players)]
+    boards, latest = {}, {}
+    for category, line in list(MARKETS.items())[:markets]:
+        boards[category] = pd.DataFrame({
+            'Player': names,
+            line: rng.integers(5, 60, players) + 0.5,
+            'Over': rng.choice(['−110', '+105', '-120', '+100'], players),
+            'Under': rng.choice(['−110', '+105', '-120', '+100'], players),
+            'Date_Updated': pd.Timestamp.today(),
+        })
+        latest[category] = pd.DataFrame({
+            'player': names,
+            f'{category}_linear_model': rng.normal(20, 8, players),
+            f'{category}_lightgbm': rng.normal(20, 8, players),
+        })
+    return boards, latest
+
+
+def iterrows_join(odds_df, latest_rows, category, line):
+    """The per-row implementation predict_games used before the vectorized merge."""
+    odds_df = odds_df.copy()
+    for col in ['Over', 'Under']:
+        odds_df[col] = pd.to_numeric(
+            odds_df[col].astype(str).str.replace('−', '-', regex=False).str.replace('+', '', regex=False),
+            errors='coerce'
+        ).fillna(0).astype(int)
+    for idx, row in odds_df.iterrows():
+        matching_rows = latest_rows[latest_rows['player'] == row['Player']]
+        if matching_rows.empty:
+            continue
+        for model_name in ['lightgbm', 'linear_model']:
+            col_name = f'{category}_{model_name}'
+            prediction_value = matching_rows[col_name].values[0]
+            odds_df.at[idx, col_name] = prediction_value
+            recommendation = 'Over' if prediction_value > float(row[line]) else 'Under'
+            odds_df.at[idx, f'recommendation_{category}_{model_name}'] = recommendation
+    return odds_df
+
+
+def vectorized_join(odds_df, latest_rows, category, line):
+    return merge_predictions(normalize_american_odds(odds_df.copy()), latest_rows, category, line)
+
+
+def time_it(func, boards, latest, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for category, line in MARKETS.items():
+            if category in boards:
+                func(boards[category], latest[category], category, line)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(players=300, markets=4, repeat=5):
+    boards, latest = make_board(players, markets)
+
+    # Both paths must agree before timing means anything
+    for category, line in MARKETS.items():
+        if category not in boards:
+            continue
+        old = iterrows_join(boards[category], latest[category], category, line)
+        new = vectorized_join(boards[category], latest[category], category, line)
+        for col in [f'recommendation_{category}_lightgbm', f'recommendation_{category}_linear_model']:
+            assert (old[col].to_numpy() == new[col].to_numpy()).all(), col
+
+    old_time = time_it(iterrows_join, boards, latest, repeat)
+    new_time = time_it(vectorized_join, boards, latest, repeat)
+    print(f"board: {players} players x {markets} markets ({players * markets} odds rows)")
+    print(f"iterrows:   {old_time * 1000:8.1f} ms")
+    print(f"vectorized: {new_time * 1000:8.1f} ms ({old_time / new_time:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the odds/prediction join.")
+    parser.add_argument('--players', type=int, default=300)
+    parser.add_argument('--markets', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.players, args.markets, args.repeat)
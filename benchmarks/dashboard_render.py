@@ -0,0 +1,83 @@
+"""Render-time benchmark for dashboard.py on synthetic slates of growing size.
+
+    python -m benchmarks.dashboard_render
+    python -m benchmarks.dashboard_render --games 2 6 13 --repeats 5
+
+For each slate size a dashboard snapshot is written to a temporary
+NBA_SNAPSHOT_DIR and the app is driven through Streamlit's AppTest: the
+first run (snapshot load, index build and the all-players page) and then
+repeated player selections, which only hit the prebuilt index. Nothing
+touches the network or the warehouse, every section comes from the snapshot.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import SyntheticLeague
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_slate(games, repeats=5, league=None):
+    """Times a first run and `repeats` player selections on a slate of `games` games."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    from models import dashboard_snapshot
+    from scraping_data.game_scheduler import league_date
+
+    league = league or SyntheticLeague('night')
+    # The date dashboard.py reads the snapshot by
+    slate = league_date()
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        dashboard_snapshot.write_snapshot(league.dashboard_sections(games), slate, snapshot_dir)
+        # The app shares this interpreter, so point the already imported module at
+        # the slate and drop the previous slate's process-wide cache
+        dashboard_snapshot.SNAPSHOT_DIR = snapshot_dir
+        st.cache_resource.clear()
+
+        app = AppTest.from_file(os.path.join(REPO_DIR, 'dashboard.py'), default_timeout=120)
+        start = time.perf_counter()
+        app.run()
+        first = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(f"dashboard raised: {app.exception[0].value}")
+
+        options = app.selectbox[0].options
+        selects = []
+        for i in range(repeats):
+            app.selectbox[0].select(options[1 + i % (len(options) - 1)])
+            start = time.perf_counter()
+            app.run()
+            selects.append(time.perf_counter() - start)
+
+    return {'games': games, 'players': len(options) - 1, 'first_run_s': first,
+            'select_p50_s': statistics.median(selects), 'select_max_s': max(selects)}
+
+
+def main(games=(2, 6, 13), repeats=5):
+    # dashboard.py opens images/ relative to the working directory
+    os.chdir(REPO_DIR)
+    sys.path.insert(0, REPO_DIR)
+    league = SyntheticLeague('night')
+    results = []
+    for n in games:
+        result = run_slate(n, repeats, league)
+        print(f"{n:3d} games, {result['players']:4d} players: first run {result['first_run_s']:.3f}s, "
+              f"select p50 {result['select_p50_s']:.3f}s max {result['select_max_s']:.3f}s")
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time dashboard renders on synthetic slates.")
+    parser.add_argument('--games', type=int, nargs='+', default=[2, 6, 13])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.games, args.repeats)
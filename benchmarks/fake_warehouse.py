@@ -0,0 +1,169 @@
+"""In-memory stand-in for google.cloud.bigquery.Client, for the warehouse cache and writer.
+
+    python -m benchmarks.fake_warehouse
+
+Tables are DataFrames registered with a last-modified time; queries are
+answered by a handler (sql, params) -> DataFrame, which by default returns
+the first table the SQL names. Parquet load jobs (append, or truncate of a
+table$YYYYMMDD partition), the writer's DELETE of whole days and its MERGE
+of a staging table on key columns are applied to the stored frames. Every call is counted, with an optional delay per
+query to stand in for warehouse latency. Run as a script it times cold, warm
+and post-update reads through WarehouseCache.
+"""
+
+import argparse
+import datetime
+import re
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from scraping_data.warehouse_cache import WarehouseCache, query_tables
+
+
+DELETE_DAYS = re.compile(r"DELETE FROM `(.+?)` WHERE DATE\((\w+)\) IN UNNEST\(@days\)")
+MERGE = re.compile(r"MERGE `(.+?)` t\s+USING `(.+?)` s\s+ON (.+?)\s+WHEN", re.S)
+
+
+class FakeQueryJob:
+    def __init__(self, result):
+        self.result_frame = result
+        self.output_rows = len(result)
+
+    def result(self):
+        return self
+
+    def to_dataframe(self, **kwargs):
+        return self.result_frame.copy()
+
+
+class FakeBigQueryClient:
+    """get_table / query / load_table_from_file over registered DataFrames.
+
+    Args:
+        handler (callable, optional): (sql, params) -> DataFrame; by default the
+            first table referenced in the SQL is returned whole.
+        latency (float): Seconds each query sleeps.
+    """
+
+    def __init__(self, handler=None, latency=0.0, project='fake-project'):
+        self.project = project
+        self.handler = handler
+        self.latency = latency
+        self.tables = {}
+        self.partitioning = {}
+        self.calls = {'query': 0, 'get_table': 0, 'load': 0}
+
+    def _key(self, table_id):
+        # Writers name tables project.dataset.table, readers dataset.table
+        return table_id[len(self.project) + 1:] if table_id.startswith(f'{self.project}.') else table_id
+
+    def add_table(self, table_id, frame, modified=None, partition_field=None):
+        table_id = self._key(table_id)
+        self.tables[table_id] = (frame, modified or datetime.datetime.now(datetime.timezone.utc))
+        if partition_field:
+            self.partitioning[table_id] = partition_field
+
+    def touch(self, table_id):
+        """Marks a table as modified now, as a load or MERGE would."""
+        frame, _ = self.tables[self._key(table_id)]
+        self.add_table(table_id, frame)
+
+    def table(self, table_id):
+        return self.tables[self._key(table_id)][0]
+
+    def get_table(self, table_id):
+        self.calls['get_table'] += 1
+        table_id = self._key(table_id)
+        if table_id not in self.tables:
+            from google.api_core.exceptions import NotFound
+
+            raise NotFound(f"Table {table_id} not found")
+        frame, modified = self.tables[table_id]
+        field = self.partitioning.get(table_id)
+        return SimpleNamespace(table_id=table_id, modified=modified, num_rows=len(frame),
+                               schema=[SimpleNamespace(name=col) for col in frame.columns],
+                               time_partitioning=SimpleNamespace(field=field) if field else None)
+
+    def update_table(self, table, fields):
+        # Added columns appear on the stored frame when rows carrying them land
+        return table
+
+    def _days(self, frame, field):
+        return pd.to_datetime(frame[field]).dt.date
+
+    def load_table_from_file(self, file, destination, job_config=None):
+        self.calls['load'] += 1
+        rows = pd.read_parquet(file)
+        table_id, _, partition = self._key(destination).partition('$')
+        if table_id not in self.tables:
+            partitioning = getattr(job_config, 'time_partitioning', None)
+            self.add_table(table_id, rows, partition_field=getattr(partitioning, 'field', None))
+            return FakeQueryJob(rows)
+
+        frame = self.tables[table_id][0]
+        if job_config.write_disposition == 'WRITE_TRUNCATE':
+            if partition:
+                day = datetime.datetime.strptime(partition, '%Y%m%d').date()
+                frame = frame[self._days(frame, self.partitioning[table_id]) != day]
+            else:
+                frame = frame.iloc[:0]
+        self.add_table(table_id, pd.concat([frame, rows], ignore_index=True))
+        return FakeQueryJob(rows)
+
+    def query(self, sql, job_config=None):
+        self.calls['query'] += 1
+        time.sleep(self.latency)
+        params = {p.name: p.value if hasattr(p, 'value') else p.values
+                  for p in getattr(job_config, 'query_parameters', None) or []}
+        delete = DELETE_DAYS.search(sql)
+        if delete:
+            table_id, field = self._key(delete.group(1)), delete.group(2)
+            frame = self.tables[table_id][0]
+            self.add_table(table_id, frame[~self._days(frame, field).isin(set(params['days']))])
+            return FakeQueryJob(pd.DataFrame())
+        merge = MERGE.search(sql)
+        if merge:
+            target, staging = self._key(merge.group(1)), self._key(merge.group(2))
+            keys = re.findall(r"t\.(\w+) = s\.\w+", merge.group(3))
+            frame, rows = self.tables[target][0], self.tables[staging][0]
+            # Columns the table gained through update_table are NULL on its older rows
+            frame = frame.reindex(columns=list(frame.columns) + [c for c in rows.columns if c not in frame.columns])
+            matched = frame.set_index(keys).index.isin(rows.set_index(keys).index)
+            self.add_table(target, pd.concat([frame[~matched], rows], ignore_index=True))
+            return FakeQueryJob(pd.DataFrame())
+        if self.handler is not None:
+            return FakeQueryJob(self.handler(sql, params))
+        return FakeQueryJob(self.tables[self._key(query_tables(sql)[0])][0])
+
+
+def main(rows=200_000, latency=1.0):
+    from benchmarks.synthetic import SyntheticLeague
+
+    history = SyntheticLeague('season').player_history().head(rows)
+    client = FakeBigQueryClient(latency=latency)
+    client.add_table('capstone_data.player_prediction_data_partitioned', history)
+    query = "select * from `capstone_data.player_prediction_data_partitioned` where season_start_year = 2025"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = WarehouseCache(client, cache_dir, check_interval=0)
+        for label in ['cold', 'warm', 'warm']:
+            start = time.perf_counter()
+            result = cache.read(query)
+            print(f"{label:>12}: {time.perf_counter() - start:.3f}s, {len(result)} rows")
+        client.touch('capstone_data.player_prediction_data_partitioned')
+        start = time.perf_counter()
+        cache.read(query)
+        print(f"{'after update':>12}: {time.perf_counter() - start:.3f}s")
+        print(f"cache {cache.stats()}, client {client.calls}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time WarehouseCache reads against a fake BigQuery client.")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--latency', type=float, default=1.0, help="Seconds per fake warehouse query.")
+    args = parser.parse_args()
+
+    main(args.rows, args.latency)
@@ -0,0 +1,84 @@
+"""Import-time report for the entry points, built on ``python -X importtime``.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --top 15 --modules models.predict_new_games
+
+For each entry point the top-level imports are run in a fresh interpreter
+(the script body itself is not executed, so nothing touches the network or
+the database) and the slowest modules are listed by cumulative time. Heavy
+packages that should only load on first use are flagged when they show up.
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ['main.py', 'run_predictions.py']
+
+# Packages the no-op path should never pay for
+HEAVY_PACKAGES = ['pandas_gbq', 'google.cloud', 'google.oauth2', 'sklearn', 'lightgbm', 'streamlit']
+
+
+def top_level_imports(path):
+    """Returns the module-level import statements of a script, as source lines."""
+    with open(path) as file:
+        tree = ast.parse(file.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_times(statements, cwd=REPO_DIR):
+    """Runs the statements under -X importtime and parses the per-module timings.
+
+    Returns:
+        list: (module, self_us, cumulative_us) in import order, module indented by nesting depth.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', '\n'.join(statements)],
+                            cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import failed:\n{result.stderr[-2000:]}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level after the separator's space
+        timings.append((module[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def report(name, statements, top=10):
+    timings = import_times(statements)
+    # Top-level modules are the ones printed without indentation
+    total = sum(cumulative for module, _, cumulative in timings if not module.startswith(' '))
+    loaded = {module.strip() for module, _, _ in timings}
+    heavy = [pkg for pkg in HEAVY_PACKAGES if pkg in loaded]
+
+    print(f"\n{name}: {total / 1e6:.3f}s to import ({len(timings)} modules)")
+    for module, _, cumulative in sorted(timings, key=lambda t: -t[2])[:top]:
+        print(f"  {cumulative / 1e3:9.1f} ms  {module.strip()}")
+    if heavy:
+        print(f"  heavy packages loaded at import: {', '.join(heavy)}")
+    return total, heavy
+
+
+def main(modules=None, top=10):
+    for entry in ENTRY_POINTS:
+        report(entry, top_level_imports(os.path.join(REPO_DIR, entry)), top)
+    for module in modules or []:
+        report(module, [f'import {module}'], top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import time for the pipeline entry points.")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--modules', nargs='*', default=[],
+                        help="Extra modules to report, e.g. models.predict_new_games")
+    args = parser.parse_args()
+
+    main(args.modules, args.top)
@@ -0,0 +1,418 @@
+"""Times the pipeline's hot paths on synthetic data and records the results per commit.
+
+    python -m benchmarks.run_benchmarks --scale season --repeat 3
+    python -m benchmarks.run_benchmarks --compare          # last two commits, no new run
+
+Scales (see benchmarks/synthetic.py): night, season, five_seasons. The
+Postgres benchmarks seed clean_player_data / clean_team_data in a throwaway
+server (benchmarks/throwaway_pg.py) and are skipped when none can be started.
+Everything runs in a temporary working directory holding its own config.yaml
+and stand-in models/, the same layout the entry points expect.
+
+Each run appends one line per benchmark to benchmarks/results.jsonl, keyed by
+the git commit, and prints the change against the previous commit measured at
+the same scale.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime as dt
+
+import numpy as np
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(REPO_DIR, 'benchmarks', 'results.jsonl')
+REGRESSION_THRESHOLD = 0.2
+
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    return git('rev-parse', '--short', 'HEAD') or 'unknown', bool(git('status', '--porcelain', '--untracked-files=no'))
+
+
+def time_call(func, repeat, setup=None):
+    """Runs func `repeat` times, calling setup (untimed) before each run.
+
+    Returns:
+        tuple: (list of wall times in seconds, result of the last call)
+    """
+    timings, result = [], None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def _seeding_conn_class(psql):
+    """A psql connection that creates a missing table from the first frame uploaded to it."""
+
+    class SeedingConn(psql):
+
+        def ensure_table(self, table, table_name):
+            exists = self.query("SELECT to_regclass(%s) IS NOT NULL AS present", (f'"{table_name}"',))
+            if bool(exists['present'].iloc[0]):
+                return
+            df = table.copy()
+            # upload_data copies under these names
+            df.columns = df.columns.str.replace('%', '_pct').str.replace('3', 'three_')
+            self.create_table(df, f'"{table_name}"')
+            cur = self.connect.cursor()
+            for col in df.columns:
+                sample = df[col].dropna()
+                if df[col].dtype == object and len(sample) and type(sample.iloc[0]).__name__ == 'date':
+                    cur.execute(f'ALTER TABLE "{table_name}" ALTER COLUMN {col} TYPE date USING {col}::date')
+            self.connect.commit()
+            cur.close()
+
+        def upload_data(self, table, table_name):
+            self.ensure_table(table, table_name)
+            super().upload_data(table, table_name)
+
+        def count(self, table_name):
+            return int(self.query(f'SELECT count(*) AS n FROM "{table_name}"')['n'].iloc[0])
+
+    return SeedingConn
+
+
+class BenchmarkSession:
+    """Synthetic league, working directory and (optionally) Postgres shared by every benchmark in a run."""
+
+    def __init__(self, scale, seed=0, pg=None):
+        self.scale = scale
+        self.seed = seed
+        self.pg = pg
+        self.workdir = tempfile.mkdtemp(prefix='nba_bench_')
+        self.db = False
+
+    def setup(self):
+        config = dict(self.pg.config) if self.pg is not None else {
+            'database': 'unused', 'user': 'unused', 'password': '', 'host': 'unused'}
+        with open(os.path.join(self.workdir, 'config.yaml'), 'w') as file:
+            json.dump(config, file)  # JSON is valid YAML
+        os.chdir(self.workdir)
+
+        # Pipeline modules read config.yaml and models/ from the working directory
+        from benchmarks.synthetic import SyntheticLeague, build_models
+
+        start = time.perf_counter()
+        self.league = SyntheticLeague(self.scale, seed=self.seed)
+        build_models(os.path.join(self.workdir, 'models'), seed=self.seed)
+        print(f"generated {self.scale} league ({len(self.league.box)} player rows) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        if self.pg is not None:
+            from scraping_data.utils import psql
+            self.conn = _seeding_conn_class(psql)()
+            start = time.perf_counter()
+            self.conn.upload_data(self.league.player_history(), 'clean_player_data')
+            self.conn.upload_data(self.league.team_history(), 'clean_team_data')
+            print(f"seeded history tables in {time.perf_counter() - start:.1f}s")
+            self.db = True
+
+    def close(self):
+        if self.db:
+            from models.predict_new_games import close_conn
+
+            close_conn()
+            self.conn.close()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# Benchmarks: each takes the session and repeat count and returns (timings, rows)
+
+def bench_parse_box_score(session, repeat):
+    from scraping_data.scrape_games import parse_box_score
+
+    payloads = session.league.box_score_payloads()
+
+    def parse_all():
+        return [parse_box_score(payload, game_id) for game_id, payload in payloads.items()]
+    timings, frames = time_call(parse_all, repeat)
+    return timings, sum(len(frame) for frame in frames)
+
+
+def bench_clean_player_data(session, repeat):
+    from cleaning_data.cleaning_script import clean_current_player_data
+
+    before = session.conn.count('clean_player_data')
+    timings, _ = time_call(clean_current_player_data, repeat,
+                           setup=lambda: (session.league.scraped_player_rows(), session.league.tonight))
+    uploaded = (session.conn.count('clean_player_data') - before) // repeat
+    assert uploaded > 0, "clean_current_player_data uploaded nothing"
+    return timings, uploaded
+
+
+def bench_clean_team_data(session, repeat):
+    from cleaning_data.cleaning_script import clean_current_team_ratings
+
+    before = session.conn.count('clean_team_data')
+    timings, _ = time_call(clean_current_team_ratings, repeat,
+                           setup=lambda: (session.league.scraped_team_rows(),))
+    uploaded = (session.conn.count('clean_team_data') - before) // repeat
+    assert uploaded > 0, "clean_current_team_ratings uploaded nothing"
+    return timings, uploaded
+
+
+def bench_backtest(session, repeat):
+    from models.backtest import score_history, settle, sweep, threshold_grid
+    from models.model_store import ModelStore
+
+    bundles = ModelStore(os.path.join(session.workdir, 'models')).load()
+    frame = session.league.backtest_rows('pts', gap_rate=0.01)
+    gaps = int(frame['pts_season_opponent'].isna().sum())
+    pairs = threshold_grid(np.arange(0.50, 0.70, 0.02), np.arange(0.30, 0.50, 0.02))
+
+    def backtest():
+        scored = score_history(bundles, 'pts', frame)
+        return scored, sweep(settle(scored, 'pts'), pairs)
+    timings, (scored, results) = time_call(backtest, repeat)
+    # Rows with a feature gap are left out, every other row is scored
+    assert gaps and len(scored) == len(frame) - gaps, "backtest did not exclude exactly the gap rows"
+    assert len(results) == len(pairs) and scored['proba'].notna().all()
+    return timings, len(scored)
+
+
+def bench_export_parity(session, repeat):
+    import pandas as pd
+    from lightgbm import LGBMClassifier
+
+    from models.export_models import export_models, verify_parity
+    from models.model_store import ModelStore
+
+    bundles = ModelStore(os.path.join(session.workdir, 'models')).load()
+    # The stand-ins classify with logistic regressions; give one category a booster
+    # classifier so both classifier exports are checked
+    logistic = bundles['classification_models']['reb']['Fitted_Model']
+    features = list(logistic.feature_names_in_)
+    rng = np.random.default_rng(session.seed)
+    X = pd.DataFrame(rng.normal(0, 5, (2000, len(features))), columns=features)
+    booster = LGBMClassifier(n_estimators=50, num_leaves=15, verbose=-1).fit(X, X['reb_delta'] + rng.normal(0, 2, 2000) > 0)
+    bundles = {**bundles, 'classification_models': {**bundles['classification_models'],
+                                                    'reb': {**bundles['classification_models']['reb'],
+                                                            'Fitted_Model': booster}}}
+    out_dir = os.path.join(session.workdir, 'fast')
+
+    def export():
+        manifest = export_models(bundles, out_dir)
+        # Raises if any prediction, probability or recommendation drifts past the tolerance
+        verify_parity(bundles, out_dir, rows=2000, atol=1e-6)
+        return manifest
+    timings, manifest = time_call(export, repeat)
+    kinds = {spec['classifier']['type'] for spec in manifest['categories'].values()}
+    assert kinds == {'linear', 'lightgbm'}, f"classifier exports checked: {sorted(kinds)}"
+    return timings, len(manifest['categories'])
+
+
+def _predict_module(session):
+    from models import model_utils, predict_new_games
+    # The production connection class, so the uploads create (and quote) their own tables
+    if predict_new_games.conn is None:
+        predict_new_games.conn = model_utils.psql()
+    return predict_new_games
+
+
+def bench_recent_player_data(session, repeat):
+    module = _predict_module(session)
+    roster, boards = session.league.slate_roster(), session.league.odds_boards()
+    timings, (full_data, _) = time_call(module.recent_player_data, repeat, setup=lambda: (boards, roster))
+    assert full_data is not None and len(full_data), "recent_player_data returned no rows"
+    session.full_data, session.boards = full_data, boards
+    return timings, len(full_data)
+
+
+def bench_predict_games(session, repeat):
+    module = _predict_module(session)
+    if not hasattr(session, 'full_data'):
+        bench_recent_player_data(session, 1)
+    timings, (lowest_data, odds) = time_call(
+        module.predict_games, repeat,
+        setup=lambda: (session.full_data, {k: v.copy() for k, v in session.boards.items()}))
+    session.lowest_data, session.odds = lowest_data, odds
+    counts = {key: session.conn.count(f'{key}_predictions') for key in session.boards}
+    assert all(counts.values()), f"predict_games left markets empty: {counts}"
+    return timings, sum(len(board) for board in odds.values())
+
+
+def bench_classification(session, repeat):
+    module = _predict_module(session)
+    if not hasattr(session, 'odds'):
+        bench_predict_games(session, 1)
+    timings, _ = time_call(module.classification, repeat,
+                           setup=lambda: (session.lowest_data, {k: v.copy() for k, v in session.odds.items()}))
+    counts = {cat: session.conn.count(f'{cat}_classifications') for cat in session.odds}
+    assert all(counts.values()), f"classification left markets empty: {counts}"
+    uploaded = sum(counts.values()) // repeat
+    return timings, uploaded
+
+
+def bench_line_move(session, repeat):
+    from models.incremental_scoring import IncrementalScorer
+
+    module = _predict_module(session)
+    if not hasattr(session, 'odds'):
+        bench_predict_games(session, 1)
+    classified = module.classification(session.lowest_data, {k: v.copy() for k, v in session.odds.items()})
+    scorer = IncrementalScorer(session.lowest_data, conn=module.get_conn())
+    board = session.boards['points'].copy()
+    # The first boards score every player exactly like the full classification pass,
+    # and replace classification()'s rows with the same columns
+    rescored = scorer.apply({key: board if key == 'points' else session.boards[key].copy()
+                             for key in session.boards})
+    for category, scored in rescored.items():
+        full = classified[category].drop_duplicates(subset='player').set_index('player')['proba']
+        matched = scored.set_index('player')['proba'].reindex(full.index)
+        assert np.allclose(matched, full), f"{category}: incremental probabilities differ from classification"
+        columns = session.conn.query("SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+                                     (f'{category}_classifications',))['column_name']
+        assert set(columns) == {col.lower() for col in scored.columns} - {f'{category}_delta'}, \
+            f"{category}: upsert columns differ from {category}_classifications"
+    first = rescored['pts']
+
+    # A player with a feature gap is left out of the matrix instead of stalling the market
+    gapped = {category: rows.copy() for category, rows in session.lowest_data.items()}
+    gap_player = str(first['player'].iloc[0])
+    gapped['pts'].loc[gapped['pts']['player'].astype(str) == gap_player, 'pts_lightgbm'] = np.nan
+    rescored = IncrementalScorer(gapped, conn=module.get_conn()).apply({'points': board.copy()}, upsert=False)['pts']
+    assert set(rescored['player']) == set(first['player']) - {gap_player}, "gap player was not left out"
+
+    def move():
+        # One player's line moves half a point
+        moved = board.copy()
+        row = np.random.default_rng(len(board)).integers(len(moved))
+        board.loc[row, 'points'] += 0.5
+        moved.loc[row, 'points'] = board.loc[row, 'points']
+        return ({'points': moved},)
+    timings, result = time_call(scorer.apply, repeat, setup=move)
+    assert len(result['pts']) == 1, "a single move re-scored more than one player"
+    return timings, len(result['pts'])
+
+
+def bench_upload_data(session, repeat):
+    history = session.league.player_history()
+    session.conn.ensure_table(history, 'bench_upload')
+
+    def truncate():
+        cur = session.conn.connect.cursor()
+        cur.execute('TRUNCATE bench_upload')
+        session.conn.connect.commit()
+        cur.close()
+        return (history, 'bench_upload')
+    timings, _ = time_call(session.conn.upload_data, repeat, setup=truncate)
+    return timings, len(history)
+
+
+BENCHMARKS = {
+    # name: (function, needs Postgres)
+    'parse_box_score': (bench_parse_box_score, False),
+    'backtest': (bench_backtest, False),
+    'export_parity': (bench_export_parity, False),
+    'clean_player_data': (bench_clean_player_data, True),
+    'clean_team_data': (bench_clean_team_data, True),
+    'recent_player_data': (bench_recent_player_data, True),
+    'predict_games': (bench_predict_games, True),
+    'classification': (bench_classification, True),
+    'line_move': (bench_line_move, True),
+    'upload_data': (bench_upload_data, True),
+}
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def compare(results, scale, threshold=REGRESSION_THRESHOLD):
+    """Prints each benchmark's latest median against the most recent run on an earlier commit.
+
+    Returns:
+        list: Names of benchmarks that slowed down by more than threshold.
+    """
+    regressions = []
+    runs = [r for r in results if r['scale'] == scale]
+    for name in BENCHMARKS:
+        history = [r for r in runs if r['benchmark'] == name]
+        if not history:
+            continue
+        latest = history[-1]
+        previous = next((r for r in reversed(history) if r['commit'] != latest['commit']), None)
+        if previous is None:
+            print(f"{name:>20}: {latest['median_s'] * 1000:9.1f} ms ({latest['commit']}, no earlier commit)")
+            continue
+        change = latest['median_s'] / previous['median_s'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:>20}: {previous['median_s'] * 1000:9.1f} ms ({previous['commit']}) -> "
+              f"{latest['median_s'] * 1000:9.1f} ms ({latest['commit']}) {change:+.0%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def run(scale='night', repeat=3, only=None, seed=0, pg_bin=None, results_path=RESULTS_PATH):
+    """Runs the selected benchmarks and appends their timings to results_path."""
+    from benchmarks.throwaway_pg import ThrowawayPostgres
+
+    names = only or list(BENCHMARKS)
+    pg = ThrowawayPostgres(bin_dir=pg_bin) if any(BENCHMARKS[n][1] for n in names) else None
+    if pg is not None and not pg.start():
+        pg = None
+
+    commit, dirty = git_commit()
+    session = BenchmarkSession(scale, seed=seed, pg=pg)
+    records = []
+    try:
+        session.setup()
+        for name in names:
+            func, needs_db = BENCHMARKS[name]
+            if needs_db and not session.db:
+                print(f"{name:>20}: skipped (no Postgres)")
+                continue
+            timings, rows = func(session, repeat)
+            records.append({
+                'commit': commit, 'dirty': dirty, 'recorded_at': dt.now().isoformat(timespec='seconds'),
+                'scale': scale, 'benchmark': name, 'rows': int(rows), 'repeat': repeat,
+                'best_s': min(timings), 'median_s': statistics.median(timings),
+                'rows_per_s': float(rows / np.median(timings)) if rows else None,
+                'python': platform.python_version(), 'machine': platform.node(),
+            })
+            print(f"{name:>20}: median {records[-1]['median_s'] * 1000:.1f} ms over {repeat} runs, {rows} rows")
+    finally:
+        session.close()
+        if pg is not None:
+            pg.stop()
+
+    with open(results_path, 'a') as file:
+        for record in records:
+            file.write(json.dumps(record) + '\n')
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline hot paths on synthetic data.")
+    parser.add_argument('--scale', default='night', choices=['night', 'season', 'five_seasons'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', default=None, help=f"Comma-separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pg-bin', default=None, help="Directory holding initdb and pg_ctl")
+    parser.add_argument('--results', default=RESULTS_PATH)
+    parser.add_argument('--compare', action='store_true', help="Only compare stored results")
+    args = parser.parse_args()
+
+    if not args.compare:
+        run(args.scale, args.repeat, args.only.split(',') if args.only else None, args.seed, args.pg_bin, args.results)
+    regressions = compare(load_results(args.results), args.scale)
+    sys.exit(1 if regressions else 0)
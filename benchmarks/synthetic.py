@@ -0,0 +1,413 @@
+"""Synthetic NBA data shaped like the real pipeline inputs, at benchmark scale.
+
+Everything is generated from one table of player box score rows so the
+pieces agree with each other: the boxscoretraditionalv3 payloads and the
+leaguegamelog payload parse into the rows the scrapers return, and the
+clean_player_data / clean_team_data histories carry the same columns the
+cleaning scripts upload.
+
+The calendar is compressed: every day is a game day and a season is
+DAYS_PER_SEASON consecutive days ending on tonight's slate, so the current
+season always has history whatever the real date is.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from models.scoring import MARKETS
+from scraping_data.scrape_games import DESIRED_COLUMNS, parse_game_log, standardize_columns
+
+
+TEAMS = ['ATL', 'BOS', 'BKN', 'CHA', 'CHI', 'CLE', 'DAL', 'DEN', 'DET', 'GSW',
+         'HOU', 'IND', 'LAC', 'LAL', 'MEM', 'MIA', 'MIL', 'MIN', 'NOP', 'NYK',
+         'OKC', 'ORL', 'PHI', 'PHX', 'POR', 'SAC', 'SAS', 'TOR', 'UTA', 'WAS']
+FIRST_TEAM_ID = 1610612737
+PLAYERS_PER_TEAM = 13
+GAMES_PER_DAY = 8
+DAYS_PER_SEASON = 165
+
+# Days of history before tonight's slate
+SCALES = {
+    'night': 5,
+    'season': DAYS_PER_SEASON,
+    'five_seasons': 5 * DAYS_PER_SEASON,
+}
+
+# boxscoretraditionalv3 statistics keys for the DESIRED_COLUMNS stats
+BOX_SCORE_KEYS = {
+    'fgm': 'fieldGoalsMade', 'fga': 'fieldGoalsAttempted', 'fg_pct': 'fieldGoalsPercentage',
+    'fg3m': 'threePointersMade', 'fg3a': 'threePointersAttempted', 'fg3_pct': 'threePointersPercentage',
+    'ftm': 'freeThrowsMade', 'fta': 'freeThrowsAttempted', 'ft_pct': 'freeThrowsPercentage',
+    'oreb': 'reboundsOffensive', 'dreb': 'reboundsDefensive', 'reb': 'reboundsTotal',
+    'ast': 'assists', 'stl': 'steals', 'blk': 'blocks', 'to': 'turnovers',
+    'pf': 'foulsPersonal', 'pts': 'points', 'plus_minus': 'plusMinusPoints',
+}
+
+GAME_LOG_HEADERS = ['SEASON_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'TEAM_NAME', 'GAME_ID', 'GAME_DATE',
+                    'MATCHUP', 'WL', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT', 'FTM',
+                    'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS',
+                    'PLUS_MINUS', 'VIDEO_AVAILABLE']
+
+ROLLING_EXCLUDE = ['team_id', 'game_id', 'player_id']
+
+# Stat column each market's models are built around
+MARKET_STATS = {'pts': 'pts', 'reb': 'reb', 'ast': 'ast', '3pm': 'fgthree_m'}
+
+
+def current_season(today=None):
+    today = today or date.today()
+    return today.year if today.month >= 10 else today.year - 1
+
+
+def _pct(made, attempted):
+    return np.round(np.divide(made, attempted, out=np.zeros(len(made)), where=attempted > 0), 3)
+
+
+class SyntheticLeague:
+    """One generated league: a roster, a schedule and every box score in it.
+
+    Args:
+        scale (str): Key of SCALES, how much history precedes tonight.
+        seed (int): Random seed.
+        tonight (datetime.date, optional): Date of the slate being scored. Defaults to today.
+    """
+
+    def __init__(self, scale='night', seed=0, tonight=None):
+        self.scale = scale
+        self.rng = np.random.default_rng(seed)
+        self.tonight = tonight or date.today()
+        self.days = SCALES[scale]
+        self.roster = self._roster()
+        self.schedule = self._schedule()
+        self.box = self._box_scores()
+
+    def _roster(self):
+        team_idx = np.repeat(np.arange(len(TEAMS)), PLAYERS_PER_TEAM)
+        ids = 200000 + np.arange(len(team_idx))
+        return pd.DataFrame({
+            'player_id': ids,
+            'first_name': [f'Player{i}' for i in ids],
+            'family_name': [f'Jr. {TEAMS[t].title()}{i % PLAYERS_PER_TEAM}' for i, t in zip(ids, team_idx)],
+            'team_abbreviation': [TEAMS[t] for t in team_idx],
+            'team_id': FIRST_TEAM_ID + team_idx,
+        })
+
+    def _schedule(self):
+        games = []
+        season = current_season(self.tonight)
+        for day in range(self.days + 1):
+            game_date = self.tonight - timedelta(days=self.days - day)
+            season_start = season - (self.days - day) // DAYS_PER_SEASON
+            teams = self.rng.permutation(len(TEAMS))[:2 * GAMES_PER_DAY]
+            for n in range(GAMES_PER_DAY):
+                games.append({
+                    'game_id': f'002{season_start % 100:02d}{day:04d}{n}',
+                    'game_date': game_date,
+                    'season_start_year': season_start,
+                    'home': teams[2 * n],
+                    'away': teams[2 * n + 1],
+                })
+        return pd.DataFrame(games)
+
+    def _box_scores(self):
+        rng = self.rng
+        sides = pd.concat([
+            self.schedule.assign(team_idx=self.schedule['home'], opponent_idx=self.schedule['away']),
+            self.schedule.assign(team_idx=self.schedule['away'], opponent_idx=self.schedule['home']),
+        ], ignore_index=True).drop(columns=['home', 'away'])
+        box = sides.loc[sides.index.repeat(PLAYERS_PER_TEAM)].reset_index(drop=True)
+        box['player_idx'] = box['team_idx'] * PLAYERS_PER_TEAM + np.tile(np.arange(PLAYERS_PER_TEAM), len(sides))
+        n = len(box)
+
+        minutes = rng.uniform(8, 40, n)
+        fga = rng.poisson(minutes * 0.35)
+        fgm = rng.binomial(fga, 0.47)
+        fg3a = rng.binomial(fga, 0.38)
+        fg3m = np.minimum(rng.binomial(fg3a, 0.36), fgm)
+        fta = rng.poisson(minutes * 0.1)
+        ftm = rng.binomial(fta, 0.78)
+        oreb = rng.poisson(minutes * 0.03)
+        dreb = rng.poisson(minutes * 0.12)
+        stats = {
+            'fgm': fgm, 'fga': fga, 'fg_pct': _pct(fgm, fga),
+            'fg3m': fg3m, 'fg3a': fg3a, 'fg3_pct': _pct(fg3m, fg3a),
+            'ftm': ftm, 'fta': fta, 'ft_pct': _pct(ftm, fta),
+            'oreb': oreb, 'dreb': dreb, 'reb': oreb + dreb,
+            'ast': rng.poisson(minutes * 0.08), 'stl': rng.poisson(0.8, n), 'blk': rng.poisson(0.5, n),
+            'to': rng.poisson(1.3, n), 'pf': rng.poisson(2.0, n),
+            'pts': 2 * (fgm - fg3m) + 3 * fg3m + ftm,
+            'plus_minus': rng.integers(-20, 21, n),
+        }
+        for col, values in stats.items():
+            box[col] = values
+        box['min'] = [f'{int(m)}:{int(m % 1 * 60):02d}' for m in minutes]
+        return box
+
+    # Raw scraper payloads
+
+    def tonight_games(self):
+        return self.schedule[self.schedule['game_date'] == self.tonight]
+
+    def box_score_payloads(self, game_ids=None):
+        """boxscoretraditionalv3 responses keyed by game id, for the given games or the whole schedule."""
+        schedule = self.schedule if game_ids is None else self.schedule[self.schedule['game_id'].isin(game_ids)]
+        box = self.box[self.box['game_id'].isin(schedule['game_id'])]
+        roster = self.roster.iloc[box['player_idx']]
+        players = pd.DataFrame({
+            'game_id': box['game_id'].to_numpy(),
+            'team_idx': box['team_idx'].to_numpy(),
+            'personId': roster['player_id'].to_numpy(),
+            'firstName': roster['first_name'].to_numpy(),
+            'familyName': roster['family_name'].to_numpy(),
+            'minutes': box['min'].to_numpy(),
+            **{key: box[col].to_numpy() for col, key in BOX_SCORE_KEYS.items()},
+        })
+        stat_keys = ['minutes'] + list(BOX_SCORE_KEYS.values())
+
+        payloads = {}
+        for (game_id, team_idx), rows in players.groupby(['game_id', 'team_idx'], sort=False):
+            records = rows.drop(columns=['game_id', 'team_idx']).to_dict(orient='records')
+            side = {'teamTricode': TEAMS[team_idx], 'players': [
+                {'personId': r['personId'], 'firstName': r['firstName'], 'familyName': r['familyName'],
+                 'statistics': {key: r[key] for key in stat_keys}} for r in records]}
+            payloads.setdefault(game_id, {})[team_idx] = side
+
+        return {game['game_id']: {'boxScoreTraditional': {
+                    'homeTeam': payloads[game['game_id']][game['home']],
+                    'awayTeam': payloads[game['game_id']][game['away']]}}
+                for game in schedule.to_dict(orient='records')}
+
+    def team_games(self):
+        """Team box scores summed from the player rows, one row per team per game."""
+        stats = ['fgm', 'fga', 'fg3m', 'fg3a', 'ftm', 'fta', 'oreb', 'dreb', 'reb',
+                 'ast', 'stl', 'blk', 'to', 'pf', 'pts']
+        teams = (self.box.groupby(['game_id', 'game_date', 'season_start_year', 'team_idx', 'opponent_idx'])[stats]
+                 .sum().reset_index())
+        points_against = teams.set_index(['game_id', 'team_idx'])['pts']
+        teams['plus_minus'] = (teams['pts'].to_numpy()
+                               - points_against.loc[list(zip(teams['game_id'], teams['opponent_idx']))].to_numpy())
+        teams['fg_pct'] = _pct(teams['fgm'], teams['fga'])
+        teams['fg3_pct'] = _pct(teams['fg3m'], teams['fg3a'])
+        teams['ft_pct'] = _pct(teams['ftm'], teams['fta'])
+        return teams
+
+    def game_log_payload(self, team_games=None):
+        """A leaguegamelog response (PlayerOrTeam=T) for the given team games."""
+        team_games = self.team_games() if team_games is None else team_games
+        team = np.array(TEAMS)[team_games['team_idx']]
+        opponent = np.array(TEAMS)[team_games['opponent_idx']]
+        log = pd.DataFrame({
+            'SEASON_ID': '2' + team_games['season_start_year'].astype(str),
+            'TEAM_ID': FIRST_TEAM_ID + team_games['team_idx'],
+            'TEAM_ABBREVIATION': team,
+            'TEAM_NAME': [f'{t} Team' for t in team],
+            'GAME_ID': team_games['game_id'],
+            'GAME_DATE': team_games['game_date'].map(date.isoformat),
+            'MATCHUP': [f'{t} vs. {o}' for t, o in zip(team, opponent)],
+            'WL': np.where(team_games['plus_minus'] > 0, 'W', 'L'),
+            'MIN': 240,
+            **{header: team_games[header.lower().replace('tov', 'to')] for header in GAME_LOG_HEADERS[9:-1]},
+            'VIDEO_AVAILABLE': 1,
+        })
+        return {'resultSets': [{'name': 'LeagueGameLog', 'headers': GAME_LOG_HEADERS,
+                                'rowSet': log[GAME_LOG_HEADERS].astype(object).to_numpy().tolist()}]}
+
+    # Frames as the pipeline sees them
+
+    def scraped_player_rows(self, played_on=None):
+        """Rows shaped like scrape_current_games' player output (before cleaning)."""
+        played_on = played_on or self.tonight
+        box = self.box[self.box['game_date'] == played_on]
+        roster = self.roster.iloc[box['player_idx']].reset_index(drop=True)
+        rows = box.reset_index(drop=True).assign(
+            player_id=roster['player_id'],
+            team_abbreviation=roster['team_abbreviation'],
+            player_name=roster['first_name'] + ' ' + roster['family_name'])
+        return standardize_columns(rows[DESIRED_COLUMNS].copy())
+
+    def scraped_team_rows(self, played_on=None):
+        """Rows shaped like scrape_current_games' team output (before cleaning)."""
+        played_on = played_on or self.tonight
+        team_games = self.team_games()
+        return standardize_columns(parse_game_log(self.game_log_payload(team_games[team_games['game_date'] == played_on])))
+
+    def player_history(self):
+        """clean_player_data rows for every game before tonight."""
+        past = [d for d in self.schedule['game_date'].unique() if d < self.tonight]
+        box = self.box[self.box['game_date'].isin(past)].reset_index(drop=True)
+        roster = self.roster.iloc[box['player_idx']].reset_index(drop=True)
+        history = box.assign(player_id=roster['player_id'], team_abbreviation=roster['team_abbreviation'],
+                             player_name=roster['first_name'] + ' ' + roster['family_name'])
+        history = standardize_columns(history[DESIRED_COLUMNS + ['game_date', 'season_start_year']].copy())
+        history = history.rename(columns={'team_abbreviation': 'team', 'player_name': 'player'})
+        history['player'] = history['player'].str.replace('.', '', regex=False)
+        history['min'] = history['min'].map(lambda m: int(m.split(':')[0]) + int(m.split(':')[1]) / 60)
+        history['season'] = [f'{y}-{y + 1}' for y in history['season_start_year']]
+        return _add_rolling(history, 'player')
+
+    def team_history(self):
+        """clean_team_data rows for every game before tonight."""
+        team_games = self.team_games()
+        team_games = team_games[team_games['game_date'] < self.tonight]
+        history = standardize_columns(parse_game_log(self.game_log_payload(team_games)))
+        history = history.rename(columns={'team_abbreviation': 'team'})
+        history['season_start_year'] = history['season_id'].str[1:].astype(int)
+        history['season'] = [f'{y}-{y + 1}' for y in history['season_start_year']]
+        history = _add_rolling(history, 'team')
+        return history.drop(columns=['season'])
+
+    def slate_roster(self):
+        """Tonight's players with team_id and the opponent's team_id, as recent_player_data takes them."""
+        games = self.tonight_games()
+        sides = pd.concat([
+            pd.DataFrame({'team_idx': games['home'], 'opponent_idx': games['away'], 'home': True}),
+            pd.DataFrame({'team_idx': games['away'], 'opponent_idx': games['home'], 'home': False}),
+        ], ignore_index=True)
+        roster = self.roster.assign(team_idx=self.roster['team_id'] - FIRST_TEAM_ID).merge(sides, on='team_idx')
+        roster['opponent'] = FIRST_TEAM_ID + roster['opponent_idx']
+        return roster[['player_id', 'team_id', 'opponent', 'home']]
+
+    def odds_boards(self, markets=MARKETS):
+        """Prop boards for tonight's players, keyed like gather_odds' return value."""
+        roster = self.slate_roster().merge(self.roster, on=['player_id', 'team_id'])
+        names = (roster['first_name'] + ' ' + roster['family_name']).str.replace('.', '', regex=False)
+        prices = ['-110', '+105', '-120', '+100', '−115']
+        return {
+            market: pd.DataFrame({
+                'Player': names,
+                market: self.rng.integers(1, 35, len(names)) + 0.5,
+                'Over': self.rng.choice(prices, len(names)),
+                'Under': self.rng.choice(prices, len(names)),
+                'Date_Updated': pd.Timestamp.now().floor('s'),
+            })
+            for market in markets
+        }
+
+    def backtest_rows(self, category='pts', gap_rate=0.005, seed=0):
+        """Historical rows shaped like models.backtest input for one category.
+
+        A gap_rate share of rows has no opponent feature, as happens when the
+        opponent's team row is missing, so the stack cannot score them.
+        """
+        from models.scoring import CATEGORY_LINES
+
+        rng = np.random.default_rng(seed)
+        stat, line = MARKET_STATS[category], CATEGORY_LINES[category]
+        rows = self.player_history()
+        opponent = rng.normal(10, 5, len(rows))
+        opponent[rng.random(len(rows)) < gap_rate] = np.nan
+        rows[f'{stat}_season_opponent'] = opponent
+        rows[line] = np.floor(rows[f'{stat}_season']) + 0.5
+        rows[f'close_{line}'] = rows[line] + rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0], len(rows))
+        for side in ['Over', 'Under']:
+            rows[side] = rng.choice([-120, -115, -110, -105, 100], len(rows))
+            rows[f'close_{side}'] = rng.choice([-120, -115, -110, -105, 100], len(rows))
+        rows['actual'] = rows[stat]
+        return rows
+
+    def dashboard_sections(self, games=GAMES_PER_DAY):
+        """A dashboard snapshot (see models/dashboard_snapshot.py) for a slate of `games` games."""
+        teams = list(range(2 * games))
+        roster = self.roster[(self.roster['team_id'] - FIRST_TEAM_ID).isin(teams)]
+        names = (roster['first_name'] + ' ' + roster['family_name']).str.replace('.', '', regex=False).str.lower()
+        name_of = dict(zip(roster.index, names))
+
+        recommendations = pd.DataFrame({
+            'player': names.to_numpy(),
+            'points': self.rng.integers(1, 35, len(names)) + 0.5,
+            'Over': -110, 'Under': -110,
+            'Date_Updated': pd.Timestamp(self.tonight),
+            'recommendation': self.rng.choice(['Over', 'Under'], len(names)),
+            'proba': self.rng.uniform(0.2, 0.8, len(names)).round(3),
+            'market': 'pts',
+        })
+        box = self.box[self.box['player_idx'].isin(roster.index) & (self.box['game_date'] < self.tonight)]
+        recent = box.sort_values('game_date').groupby('player_idx').tail(3)
+        recent_games = pd.DataFrame({
+            'player': recent['player_idx'].map(name_of).to_numpy(),
+            'team': [TEAMS[t] for t in recent['team_idx']],
+            'Team Name': [f'{TEAMS[t].title()} Team' for t in recent['team_idx']],
+            'matchup': [f'{TEAMS[t]} vs. {TEAMS[o]}' for t, o in zip(recent['team_idx'], recent['opponent_idx'])],
+            'Game Date': recent['game_date'].to_numpy(),
+            'min': [int(m.split(':')[0]) + int(m.split(':')[1]) / 60 for m in recent['min']],
+            **{col: recent[col].to_numpy() for col in ['pts', 'reb', 'ast', 'fgm', 'fga']},
+            'team_id': (FIRST_TEAM_ID + recent['team_idx']).to_numpy(),
+        })
+        matchups = pd.DataFrame({
+            'team': [TEAMS[t] for t in teams],
+            'opponent': [TEAMS[t + 1 if t % 2 == 0 else t - 1] for t in teams],
+            'home': [1 - t % 2 for t in teams],
+        })
+        player_images = pd.DataFrame({'players': names.to_numpy(),
+                                      'images': [f'https://example.invalid/{i}.png' for i in roster['player_id']]})
+        team_images = pd.DataFrame({'teams': [TEAMS[t] for t in teams] + ['nba'],
+                                    'images': [f'https://example.invalid/{TEAMS[t]}.png' for t in teams]
+                                    + ['https://example.invalid/nba.png']})
+        return {'recommendations': recommendations, 'recent_games': recent_games, 'matchups': matchups,
+                'player_images': player_images, 'team_images': team_images}
+
+
+def _add_rolling(history, key):
+    """Adds the three-game, season and momentum columns the cleaning scripts upload."""
+    features = [col for col in history.select_dtypes(include='number').columns
+                if col not in ROLLING_EXCLUDE + ['season_start_year']]
+    history = history.sort_values([key, 'game_date']).reset_index(drop=True)
+    by_key = history.groupby(key, sort=False)
+    by_season = history.groupby([key, 'season'], sort=False)
+    rolling = {}
+    for feature in features:
+        total = by_key[feature].cumsum()
+        three = (total - total.groupby(history[key]).shift(3).fillna(0)) / 3
+        three[by_key.cumcount() < 2] = 0
+        season = by_season[feature].cumsum() / (by_season.cumcount() + 1)
+        rolling[f'{feature}_three_gm_avg'] = three
+        rolling[f'{feature}_season'] = season
+        rolling[f'{feature}_momentum'] = season - three
+    return pd.concat([history, pd.DataFrame(rolling)], axis=1)
+
+
+def build_models(model_dir, seed=0):
+    """Fits small stand-in models over the history's features and pickles them to model_dir.
+
+    The models are random-data fits; they only need the feature names, shapes
+    and pickle layout of the real bundles so inference runs end to end.
+    """
+    import os
+
+    import joblib
+    from lightgbm import LGBMRegressor
+    from sklearn.linear_model import LinearRegression, LogisticRegression
+
+    from models.scoring import CATEGORY_LINES
+
+    rng = np.random.default_rng(seed)
+    models, meta, classifiers = {}, {}, {}
+    rows = 2000
+    for category, stat in MARKET_STATS.items():
+        features = [f'{stat}_three_gm_avg', f'{stat}_season', f'{stat}_momentum',
+                    'min_three_gm_avg', 'min_season', f'{stat}_season_opponent']
+        X = pd.DataFrame(rng.normal(10, 5, (rows, len(features))), columns=features)
+        y = X.iloc[:, :2].mean(axis=1) + rng.normal(0, 2, rows)
+        models[category] = {
+            'linear_model': LinearRegression().fit(X, y),
+            'lightgbm': LGBMRegressor(n_estimators=100, num_leaves=15, verbose=-1).fit(X, y),
+        }
+
+        base = pd.DataFrame({'linear': y + rng.normal(0, 1, rows), 'lightgbm': y + rng.normal(0, 1, rows)})
+        meta[category] = LinearRegression(fit_intercept=False).fit(base, y)
+
+        clf_features = [f'{category}_ensemble', f'{category}_delta', f'{category}_linear_model',
+                        f'{category}_lightgbm', f'{stat}_three_gm_avg', CATEGORY_LINES[category]]
+        X_clf = pd.DataFrame(rng.normal(0, 5, (rows, len(clf_features))), columns=clf_features)
+        classifiers[category] = {
+            'Fitted_Model': LogisticRegression().fit(X_clf, X_clf[f'{category}_delta'] + rng.normal(0, 2, rows) > 0),
+            'Over_Threshold': 0.55,
+            'Under_Threshold': 0.45,
+        }
+
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump(models, os.path.join(model_dir, 'models.pkl'))
+    joblib.dump(meta, os.path.join(model_dir, 'meta_model.pkl'))
+    joblib.dump(classifiers, os.path.join(model_dir, 'classification_models.pkl'))
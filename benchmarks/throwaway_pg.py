@@ -0,0 +1,76 @@
+"""A disposable local Postgres for the benchmarks.
+
+Uses the server named by BENCH_PG_DSN when set (a libpq key=value string for
+a server on the default port, since utils.psql does not pass one;
+e.g. "dbname=bench user=bench host=/tmp password="), otherwise runs initdb
+into a temporary directory and starts a server that only listens on a unix
+socket inside it, so nothing else on the machine can collide with it.
+initdb/pg_ctl are found through PG_BIN or PATH.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+import psycopg2.extensions
+
+
+PORT = 5432
+
+
+def _find_bin(name, bin_dir=None):
+    bin_dir = bin_dir or os.environ.get('PG_BIN')
+    if bin_dir and os.path.exists(os.path.join(bin_dir, name)):
+        return os.path.join(bin_dir, name)
+    return shutil.which(name)
+
+
+class ThrowawayPostgres:
+    """Starts (or attaches to) a Postgres server for one benchmark session.
+
+    Args:
+        bin_dir (str, optional): Directory holding initdb and pg_ctl.
+        dsn (str, optional): Existing server to use instead. Defaults to BENCH_PG_DSN.
+    """
+
+    def __init__(self, bin_dir=None, dsn=None):
+        self.bin_dir = bin_dir
+        self.dsn = dsn or os.environ.get('BENCH_PG_DSN')
+        self.root = None
+        self.config = None
+
+    def start(self):
+        """Returns True once a server is reachable, False (with the reason printed) if none can be started."""
+        if self.dsn:
+            params = psycopg2.extensions.parse_dsn(self.dsn)
+            self.config = {'database': params.get('dbname', 'postgres'), 'user': params.get('user', ''),
+                           'password': params.get('password', ''), 'host': params.get('host', 'localhost')}
+            return True
+
+        initdb, pg_ctl = _find_bin('initdb', self.bin_dir), _find_bin('pg_ctl', self.bin_dir)
+        if not initdb or not pg_ctl:
+            print("Postgres benchmarks skipped: initdb/pg_ctl not found (set PG_BIN or BENCH_PG_DSN)")
+            return False
+        if hasattr(os, 'geteuid') and os.geteuid() == 0:
+            print("Postgres benchmarks skipped: initdb refuses to run as root (set BENCH_PG_DSN)")
+            return False
+
+        self.root = tempfile.mkdtemp(prefix='nba_bench_pg_')
+        data_dir = os.path.join(self.root, 'data')
+        subprocess.run([initdb, '-D', data_dir, '-U', 'bench', '--auth=trust', '--no-sync'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([pg_ctl, '-D', data_dir, '-l', os.path.join(self.root, 'server.log'), '-w', 'start',
+                        '-o', f"-k {self.root} -c listen_addresses='' -p {PORT} -c fsync=off"],
+                       check=True, stdout=subprocess.DEVNULL)
+        self.config = {'database': 'postgres', 'user': 'bench', 'password': '', 'host': self.root}
+        print(f"throwaway Postgres started in {self.root}")
+        return True
+
+    def stop(self):
+        if self.root is None:
+            return
+        subprocess.run([_find_bin('pg_ctl', self.bin_dir), '-D', os.path.join(self.root, 'data'),
+                        '-m', 'immediate', 'stop'], stdout=subprocess.DEVNULL)
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root = None
@@ -1,13 +1,12 @@
 """Module for cleaning and processing current NBA player data before uploading to BigQuery."""
 
 from datetime import datetime as dt
-from google.oauth2 import service_account
 from scraping_data.utils import send_message
 from scraping_data.utils import psql
+from scraping_data.instrumentation import instrumented
 
 import numpy as np
 import pandas as pd
-import pandas_gbq
 import unicodedata
 
 
@@ -39,6 +38,7 @@ def convert_minutes_to_decimal(min_played):
         return minutes + seconds / 60
 
 
+@instrumented()
 def clean_current_player_data(data, date):
     """Cleans and processes NBA player data for modeling and prediction.
 
@@ -94,11 +94,11 @@ def clean_current_player_data(data, date):
 
         # Fetch past modeling and prediction data from BigQuery
 
-        predict_data = conn.query(prediction_query, (players,))
+        predict_data = conn.query(prediction_query, (players,), stage='past_player_games')
 
         # Define features for rolling averages
         exclude_cols = ["team_id", "game_id", "player_id"]
-        features_for_rolling = [col for col in data.select_dtypes(include=['int64', 'float64']).columns if col not in exclude_cols]
+        features_for_rolling = [col for col in data.select_dtypes(include='number').columns if col not in exclude_cols]
 
 
 
@@ -114,18 +114,18 @@ def clean_current_player_data(data, date):
                 # Compute 3-game rolling averages, preventing data leakage
                 if feature == 'fgthree_m':
                     feat = 'fgthree_m'
-                    predict_avg = past_predict_data.groupby('player')[feat].rolling(3, min_periods=3).mean()
+                    predict_avg = past_predict_data.groupby('player', observed=True)[feat].rolling(3, min_periods=3).mean()
                 else:
-                    predict_avg = past_predict_data.groupby('player')[feature].rolling(3, min_periods=3).mean()
+                    predict_avg = past_predict_data.groupby('player', observed=True)[feature].rolling(3, min_periods=3).mean()
                 prediction_data[f'{feature}_three_gm_avg'] = predict_avg.iloc[-1] if not predict_avg.empty else 0
 
                 # Compute season averages and momentum
                 if feature == 'fgthree_m':
                     feat = 'fgthree_m'
-                    predict_season_avg = past_predict_data.groupby(['player', 'season'])[feat].expanding().mean()
+                    predict_season_avg = past_predict_data.groupby(['player', 'season'], observed=True)[feat].expanding().mean()
 
                 else:
-                    predict_season_avg = past_predict_data.groupby(['player', 'season'])[feature].expanding().mean()
+                    predict_season_avg = past_predict_data.groupby(['player', 'season'], observed=True)[feature].expanding().mean()
 
                 prediction_data[f'{feature}_season'] = predict_season_avg.iloc[-1] if not predict_season_avg.empty else 0
 
@@ -141,8 +141,9 @@ def clean_current_player_data(data, date):
 
         print(f"Prediction Data Shape: {predict_data.shape}")
 
-        # Fill NaNs with 0 for modeling
-        predict_data.fillna(0, inplace=True)
+        # Fill NaNs with 0 for modeling (categorical columns cannot take a 0)
+        numeric_cols = predict_data.select_dtypes(include='number').columns
+        predict_data[numeric_cols] = predict_data[numeric_cols].fillna(0)
 
         # Assign season start year
         predict_data['season_start_year'] = season
@@ -160,6 +161,7 @@ def clean_current_player_data(data, date):
         print('Error:', e)
 
 
+@instrumented()
 def clean_current_team_ratings(game_data):
     """Cleans and processes current NBA team ratings for modeling and prediction.
 
@@ -201,7 +203,7 @@ def clean_current_team_ratings(game_data):
         # Retrieve past modeling and prediction data
         print("Fetching past modeling and prediction data...")
 
-        prediction_data = conn.query(prediction_query, (teams,))
+        prediction_data = conn.query(prediction_query, (teams,), stage='past_team_games')
         # Assign season values
         for df in [prediction_data]:
             df["season"] = df["game_date"].apply(
@@ -210,7 +212,7 @@ def clean_current_team_ratings(game_data):
 
         # Identify numerical features for rolling calculations
         exclude_cols = ["team_id", "game_id", "player_id"]
-        features_for_rolling = [col for col in game_data.select_dtypes(include=['int64', 'float64']).columns if col not in exclude_cols]
+        features_for_rolling = [col for col in game_data.select_dtypes(include='number').columns if col not in exclude_cols]
 
 
 
@@ -225,14 +227,14 @@ def clean_current_team_ratings(game_data):
 
             for feature in features_for_rolling:
                 # 3-game rolling average (shifted to prevent data leakage)
-                predict_avg = predict_data_for_rolling.groupby("team")[feature].rolling(3, min_periods=3).mean()
+                predict_avg = predict_data_for_rolling.groupby("team", observed=True)[feature].rolling(3, min_periods=3).mean()
 
                 predict_data[f"{feature}_three_gm_avg"] = predict_avg.iloc[-1] if not predict_avg.empty else 0
 
                 # Season-long rolling average (shifted to prevent data leakage)
 
                 predict_data[f"{feature}_season"] = (
-                    prediction_data.groupby(["team", "season"])[feature].expanding().mean().reset_index(level=[0, 1], drop=True)
+                    prediction_data.groupby(["team", "season"], observed=True)[feature].expanding().mean().reset_index(level=[0, 1], drop=True)
                 )
 
                 # Momentum feature
@@ -245,9 +247,10 @@ def clean_current_team_ratings(game_data):
         # Combine all processed data
         predict_data = pd.concat(predict_dfs, ignore_index=True)
 
-        # Fill NaN values (excluding game_date)
+        # Fill NaN values in the numeric columns (game_date and categoricals untouched)
         for df in [predict_data]:
-            df.loc[:, df.columns != "game_date"] = df.drop(columns=["game_date"]).fillna(0)
+            numeric_cols = df.select_dtypes(include="number").columns
+            df[numeric_cols] = df[numeric_cols].fillna(0)
 
         # Assign season start year
         for df in [predict_data]:
@@ -1,14 +1,21 @@
 import streamlit as st
 import pandas as pd
-import pandas_gbq
 from google.oauth2 import service_account
 from datetime import timedelta
 from PIL import Image
 import datetime as dt
 import requests
+import io
+import time
 
+from dashboard_cache import SlateCache
+from dashboard_index import DashboardIndex
+from image_cache import ImageCache, image_assets, source_url
+from scraping_data.warehouse_cache import WarehouseCache
+from models.dashboard_snapshot import read_snapshot, snapshot_version
+from models.scoring import CATEGORY_LINES
+from scraping_data.game_scheduler import league_date
 
-image = Image.open("images/main_logo.png")
 
 st.set_page_config(
     page_title="NBA ProPicks",
@@ -16,17 +23,17 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_data
-def expensive_computation():
-    return "Computed Result"
+# Seconds before each cached pull is refreshed in the background. Entries are
+# keyed by slate date, so a new day never needs the cache cleared.
+CACHE_TTLS = {
+    'data': 10 * 60,
+    'odds': 10 * 60,
+    'stats': 60 * 60,
+    'images': 24 * 60 * 60,
+}
 
-# First-time load logic
-if 'first_visit_done' not in st.session_state:
-    st.session_state.first_visit_done = True
-    st.cache_data.clear()  # Clear the cache
-    st.rerun()  # Rerun the app after clearing cache
-
-# Now run your main app logic
+# Player cards per page in the all-players view
+PAGE_SIZE = 12
 
 def smart_title(name):
     # Words to preserve as all-uppercase
@@ -51,27 +58,107 @@ def clean_player_name(name):
         "cameron thomas": "cam thomas"
     }
     return name_corrections.get(name, name)
-def convert_minute(data):
-    data = float(data)
-    minutes = int(data)
-    seconds = round((data - minutes) * 60)
-    
-    if seconds >= 60:
-        minutes += 1
-        seconds = 0
+def prepare_odds(odds):
+    odds = odds.rename(columns={'Date_Updated':'game_date'})
+    odds['game_date'] = pd.to_datetime(odds['game_date']).dt.date
+    odds = odds.drop_duplicates(subset = ['player','game_date'])
+    odds['player'] = odds['player'].apply(clean_player_name)
+    return odds
+
+
+def prepare_images(player_images, team_images):
+    player_images['images'] = player_images['images'].fillna('')
+    player_images['images'] = player_images['images'].map(source_url)
+    player_images['players'] = player_images['players'].apply(clean_player_name)
+    player_images["players_lower"] = player_images["players"].str.lower()
+
+    team_images['images'] = team_images['images'].fillna('')
+    return player_images, team_images
+
+
+@st.cache_resource
+def load_logo(width=300):
+    """The header logo resized and encoded once per process instead of on every rerun."""
+    logo = Image.open("images/main_logo.png")
+    logo = logo.resize((width, round(logo.height * width / logo.width)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    logo.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@st.cache_resource
+def get_warehouse():
+    """BigQuery reads through the local query-result cache."""
+    from google.cloud import bigquery
+
+    try:
+        credentials = service_account.Credentials.from_service_account_info(st.secrets["gcp_service_account"])
+    except Exception as e:
+        # Running locally: application default credentials
+        print(f"Could not load GCP credentials from secrets: {e}")
+        credentials = None
+    return WarehouseCache(bigquery.Client(project='miscellaneous-projects-444203', credentials=credentials))
+
+
+@st.cache_resource
+def get_images():
+    """Local headshot and logo thumbnails, shared by every session."""
+    return ImageCache()
+
+
+@st.cache_resource
+def get_cache():
+    """One cache per server process, shared by every session."""
+    cache = SlateCache(refresh_interval=30)
+    cache.start()
+    return cache
+
+
+def load_data(game_date):
+    """Indexed dashboard data for a slate: the published snapshot, refreshed when a
+    new one lands, with live pulls for any section the snapshot does not have."""
+    cache = get_cache()
+    return cache.get('data', game_date, lambda: build_data(cache, game_date), CACHE_TTLS['data'],
+                     version=lambda: snapshot_version(game_date))
+
+
+def build_data(cache, game_date):
+    snapshot = read_snapshot(game_date) or {}
+
+    if 'recommendations' in snapshot:
+        odds_data = {CATEGORY_LINES.get(cat, cat): prepare_odds(board.drop(columns='market').dropna(axis=1, how='all'))
+                     for cat, board in snapshot['recommendations'].groupby('market')}
+    else:
+        odds_data, _ = cache.get('odds', game_date, pull_odds, CACHE_TTLS['odds'])
+
+    if 'recent_games' in snapshot and 'matchups' in snapshot:
+        player_data, games = snapshot['recent_games'], snapshot['matchups']
+    else:
+        player_data, games = cache.get('stats', game_date, lambda: pull_stats(odds_data), CACHE_TTLS['stats'])
+
+    if 'player_images' in snapshot and 'team_images' in snapshot:
+        player_images, team_images = prepare_images(snapshot['player_images'].copy(), snapshot['team_images'].copy())
+    else:
+        player_images, team_images = cache.get('images', game_date, pull_images, CACHE_TTLS['images'])
+
+    # Thumbnails missing from the local cache are fetched in the background;
+    # until then the cards fall back to the remote URLs
+    get_images().refresh_async(image_assets(player_images, team_images))
+    return DashboardIndex(player_images, team_images, odds_data, player_data, games)
+
+
+def show_cache_stats():
+    stats = get_cache().stats()
+    with st.sidebar.expander("Cache"):
+        for key, value in stats.items():
+            st.write(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
 
-    return f"{minutes}:{seconds:02}"
 
-@st.cache_data
 def pull_odds():
     tables = ['points' ]
     identifiers = ['pts']
     odds_data = {}
 
-
-    credentials = service_account.Credentials.from_service_account_info(st.secrets["gcp_service_account"])
-
-
     for table,cat in zip(tables,identifiers):
         odds_query = f"""
             SELECT DISTINCT *
@@ -80,21 +167,14 @@ def pull_odds():
             AND recommendation != 'No Bet Recommendation'
         """
         
-        odds_data[table] = pandas_gbq.read_gbq(odds_query, project_id='miscellaneous-projects-444203', credentials=credentials)
-        
-        odds_data[table].rename(columns={'Date_Updated':'game_date'},inplace=True)
-        odds_data[table]['game_date'] = odds_data[table]['game_date'].dt.date
-        odds_data[table].drop_duplicates(subset = ['player','game_date'],inplace = True)
-
-        odds_data[table]['player'] = odds_data[table]['player'].apply(clean_player_name)
+        odds_data[table] = prepare_odds(
+            get_warehouse().read(odds_query))
 
     return odds_data, odds_data['points']['game_date'].values[0]
 
-@st.cache_data
 def pull_stats(odds_data):
     
-    # season = dt.date.today().year if dt.date.today().month >= 10 else dt.date.today().year - 1
-    season = 2024
+    season = dt.date.today().year if dt.date.today().month >= 10 else dt.date.today().year - 1
     players = set()
     for table in odds_data:
         for player in odds_data[table]['player']:
@@ -147,13 +227,6 @@ def pull_stats(odds_data):
     WHERE game_rank <= 3
     """
 
-    try:
-        credentials = service_account.Credentials.from_service_account_info(st.secrets["gcp_service_account"])
-        local = False
-    except FileNotFoundError:
-        local = True
-        credentials = None
-    
     url = "https://stats.nba.com/stats/scoreboardv2"
     
     games_query = f""" 
@@ -162,112 +235,84 @@ def pull_stats(odds_data):
     where date(GAME_DATE_EST) = Current_date("America/Los_Angeles")
     """
 
-    games = pandas_gbq.read_gbq(games_query, project_id='miscellaneous-projects-444203', credentials=credentials)
+    games = get_warehouse().read(games_query)
 
 
-    player_data = pandas_gbq.read_gbq(query, project_id='miscellaneous-projects-444203', credentials=credentials)
+    player_data = get_warehouse().read(query)
 
     player_data.rename(columns = {'team_name':'Team Name','game_date':'Game Date','plus_minus':'Plus Minus'},inplace=True)
     return player_data,games
 
-@st.cache_data
 def pull_images():
-    try:
-        credentials = service_account.Credentials.from_service_account_info(st.secrets["gcp_service_account"])
-    except Exception as e:
-        st.error("Could not load GCP credentials.")
-        st.exception(e)
-        credentials = None
     query = "SELECT * FROM `capstone_data.player_images`"
-    player_images = pandas_gbq.read_gbq(query, project_id='miscellaneous-projects-444203',credentials=credentials)
+    player_images = get_warehouse().read(query)
 
-    player_images['images'] = player_images['images'].fillna('')
-    player_images['images'] = player_images['images'].apply(lambda x: x.replace("h=80", "h=254").replace("w=110", "w=350"))
-    player_images['players'] = player_images['players'].apply(clean_player_name)
-    player_images["players_lower"] = player_images["players"].str.lower()
+    team_query = "SELECT * FROM `capstone_data.team_logos`"
+    team_images = get_warehouse().read(team_query)
 
+    return prepare_images(player_images, team_images)
 
+def select_player(player):
+    st.session_state["selected_player"] = player
 
 
-    team_query = "SELECT * FROM `capstone_data.team_logos`"
-    team_images = pandas_gbq.read_gbq(team_query, project_id='miscellaneous-projects-444203',credentials=credentials)
+def set_page(page):
+    st.session_state["page"] = page
 
-    team_images['images'] = team_images['images'].fillna('')
 
+def show_player_list(index):
+    """One page of player cards, filtered by the typeahead box."""
+    query = st.text_input("Filter players:", key="player_filter", on_change=set_page, args=(0,))
+    players = index.search(query)
+    pages = max(1, -(-len(players) // PAGE_SIZE))
+    page = min(st.session_state["page"], pages - 1)
 
-    return player_images,team_images
+    for player in players[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]:
+        player_lower = player.lower()
+        player_image = index.image(player_lower)
+        thumbnail = get_images().get('player', index.asset_key(player_lower), 'card')
 
-@st.cache_data
-def get_available_players(category, odds_data):
-    available_players = set()
-    # category_key = category.lower().replace(" ", "_")
+        with st.container():
+            col1, col2 = st.columns([1, 3])
 
-    # if category == "All":
-    #     for table in odds_data:
-    #         available_players.update(odds_data[table]["player"].unique())
-    # else:
-    #     if category_key in odds_data:
-    #         available_players = odds_data[category_key]["player"].unique()
+            with col1:
+                if thumbnail:
+                    st.image(thumbnail, width=200)
+                elif player_image:
+                    # The browser fetches the headshot only once the card scrolls into view
+                    st.markdown(f'<img src="{player_image}" width="200" loading="lazy">', unsafe_allow_html=True)
 
+            with col2:
+                st.button(f"**{smart_title(player)}**", key=f"btn_{player}", on_click=select_player, args=(player_lower,))
 
-    return sorted(available_players)
+            st.markdown("<br><hr><br>", unsafe_allow_html=True)
 
-@st.cache_data
-def get_player_odds(player_selected, category, odds_data):
-    """Fetch betting odds + model recommendations for a selected player"""
-    category_map = {
-        "Points": "pts",
-        "Rebounds": "reb",
-        "Assists": "ast",
-        "Threes Made": "3pm"
-    }
-    
-    category_key = category_map.get(category, "pts")  # Default to "pts" if category is "All"
-    player_odds = []
-    
-    if category == "All":
-        # Fetch all categories
-        for (table_name, df), cat in zip(odds_data.items(), ["pts", "reb", "ast", "3pm"]):
-            if player_selected in df["player"].values:
-                available_columns = [col for col in [
-                    f"{table_name}", "Over", "Under",
-                    "recommendation"
-                ] if col in df.columns]
-                
-                temp_df = df[df["player"] == player_selected][available_columns].copy()
-                temp_df.rename(columns={'Over':'Under_1','Under':'Over'},inplace=True)
-                temp_df.rename(columns={'Under_1':'Under'},inplace=True)
-                player_odds.append((table_name, temp_df))
-    else:
-        # Only fetch the selected category's odds
-        if category_key in odds_data and player_selected in odds_data[category_key]["player"].values:
-            df = odds_data[category_key]
-
-            available_columns = [col for col in [
-                f"{category_key}", "Over", "Under",
-                f"recommendation_{category_key}_linear_model",
-                f"recommendation_{category_key}_lightgbm"
-            ] if col in df.columns]
-            
-            temp_df = df[df["player"] == player_selected][available_columns].copy()
-            player_odds.append((category_key, temp_df))  #Only return selected category
+    if not players:
+        st.write("No players match the filter.")
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        st.button("Previous", disabled=page == 0, on_click=set_page, args=(page - 1,))
+    with page_col:
+        st.write(f"Page {page + 1} of {pages} ({len(players)} players)")
+    with next_col:
+        st.button("Next", disabled=page >= pages - 1, on_click=set_page, args=(page + 1,))
 
-    
-    return player_odds
 
-def make_dashboard(player_images,team_images, odds_data,player_data,games):
+def make_dashboard(index):
 
     main_time = dt.date.today()
     side_col,main_col = st.columns([10,1])
 
     with side_col:
-        st.image(image, width=300)
+        st.image(load_logo(), width=300)
         st.write(f"{main_time}")
     with main_col:
-        nba_logo = team_images[team_images['teams']=='nba']['images'].values[0]
+        nba_logo = index.team_images.get('nba')
         
     if "selected_player" not in st.session_state:
         st.session_state["selected_player"] = ""
+    if "page" not in st.session_state:
+        st.session_state["page"] = 0
 
     # if "selected_category" not in st.session_state:
     #     st.session_state["selected_category"] = "All"
@@ -277,14 +322,8 @@ def make_dashboard(player_images,team_images, odds_data,player_data,games):
     
     # if category != st.session_state["selected_category"]:
     #     st.session_state["selected_category"] = category
-        
-        # Reset selected player when filtering in "All Players" mode
-        if not st.session_state["selected_player"]:
-            st.session_state["selected_player"] = ""
-        
-        st.rerun()
 
-    available_players = get_available_players('Points', odds_data)
+    available_players = index.players
 
     # Ensure selecting the blank option resets the selected player
     player_options = [""] + [smart_title(p) for p in available_players]
@@ -305,44 +344,32 @@ def make_dashboard(player_images,team_images, odds_data,player_data,games):
 
     if st.session_state["selected_player"]:
         # Selected Player's Page (Shows All Categories)
-        player_row = player_images.loc[player_images["players_lower"] == st.session_state["selected_player"]]
-        selected_image = player_row["images"].values[0] if not player_row.empty else None
-
-        team = player_data[player_data['player'].apply(lambda x: x.lower()) == st.session_state['selected_player']]['team'].values[0]
-        team_name = player_data[player_data['player'].apply(lambda x: x.lower()) == st.session_state['selected_player']]['Team Name'].values[0]
-        team_selected_image = team_images[team_images['teams'] == team]['images'].values[0]
-       
-        if games[games['team']==team]['home'].values[0] == 1:
-            divider = 'vs'
-            opponent = games[games['team']==team]['opponent'].values[0]
-        else:
-            divider = '@'
-            opponent = games[games['team']==team]['opponent'].values[0]
+        selected = st.session_state["selected_player"]
+        selected_image = index.image(selected)
+
+        team, team_name = index.team(selected)
+        team_selected_image = index.team_images.get(team)
+        divider, opponent = index.matchup(team)
 
         col1, col2, = st.columns(2)
 
         with col1:
             if selected_image:
-
-                st.image(team_selected_image,width=77)
-                st.image(selected_image, width=320)
-                st.header(f"{smart_title(st.session_state['selected_player'])} | {team_name}")
+                if team_selected_image:
+                    st.image(get_images().get('team', team, 'logo') or team_selected_image,width=77)
+                st.image(get_images().get('player', index.asset_key(selected), 'detail') or selected_image, width=320)
+                st.header(f"{smart_title(selected)} | {team_name}")
                 st.write(f"Next Game: {team} {divider} {opponent}")
                 
 
         # Always show all categories for the selected player
-        player_odds = get_player_odds(st.session_state["selected_player"], "All", odds_data)
-        
+        player_odds = index.odds.get(selected, [])
 
         if player_odds:
-            player_data.columns = [col.replace("_","").title() for col in player_data.columns]
-            filtered_player_df = player_data[player_data['Player'].apply(lambda x:x.lower())==st.session_state['selected_player']].copy()
-            filtered_player_df.drop(['Player','Team','Team Name','Teamid'],axis = 1,inplace=True)
-            filtered_player_df['Min'] = filtered_player_df['Min'].apply(lambda x: convert_minute(x))
-            st.dataframe(filtered_player_df,hide_index=True)
+            if selected in index.recent_games:
+                st.dataframe(index.recent_games[selected],hide_index=True)
             for table_name, odds in player_odds:
                 st.markdown(f"**{table_name.replace('_',' ').title()} Odds**")
-                odds.columns = [col.replace("_", " ").title() for col in odds.columns]
                 st.dataframe(odds,hide_index=True, use_container_width=True)
         else:
             st.write("No odds available for this player today.")
@@ -353,29 +380,13 @@ def make_dashboard(player_images,team_images, odds_data,player_data,games):
         #     st.subheader(f"All Players")
         # else:
         #     st.subheader(f"All Players: {category}")
-        for player in available_players:
-            player_lower = player.lower()
-            player_row = player_images.loc[player_images["players_lower"] == player_lower]
-            player_image = player_row["images"].values[0] if not player_row.empty else None
-
-            with st.container():
-                col1, col2 = st.columns([1, 3])
-
-                with col1:
-                    if player_image:
-                        st.image(player_image, width=200)
-
-                with col2:
-                    if st.button(f"**{smart_title(player)}**", key=f"btn_{player}"):
-                        st.session_state["selected_player"] = player_lower
-                        st.rerun()
-
-                st.markdown("<br><hr><br>", unsafe_allow_html=True)
-
+        show_player_list(index)
 
 
 # Run the dashboard
-images,team_images = pull_images()
-odds_data,date = pull_odds()
-player_data,games = pull_stats(odds_data)
-make_dashboard(images,team_images, odds_data,player_data,games)
+# The same slate date the pipeline publishes the snapshot under
+index = load_data(league_date())
+render_start = time.perf_counter()
+make_dashboard(index)
+get_cache().record_timing('render', time.perf_counter() - render_start)
+show_cache_stats()
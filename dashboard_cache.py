@@ -0,0 +1,182 @@
+"""Process-wide, slate-keyed cache for the dashboard's data.
+
+Streamlit reruns dashboard.py for every interaction of every session. The
+entries here live once per server process (dashboard.py holds the cache with
+st.cache_resource) and are keyed by (name, slate date), so a new day is a new
+key instead of a cleared cache. Each entry has a TTL: an expired entry keeps
+being served while a background thread reloads it, and the same thread swaps
+in new data as soon as an entry's version (e.g. the published snapshot's
+mtime) changes. Nothing is ever invalidated by a visit.
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+
+
+class CacheEntry:
+    def __init__(self, value, version):
+        self.value = value
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+
+class SlateCache:
+    """Thread-safe TTL cache with single-flight loads and a background refresher.
+
+    Args:
+        refresh_interval (float): Seconds between refresher passes.
+        keep_slates (int): Slate dates kept per entry name; older ones are dropped.
+    """
+
+    def __init__(self, refresh_interval=30.0, keep_slates=2):
+        self.refresh_interval = refresh_interval
+        self.keep_slates = keep_slates
+        self.entries = {}
+        self.specs = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.refreshing = set()
+        self.counters = {'hits': 0, 'misses': 0, 'stale_hits': 0, 'refreshes': 0, 'swaps': 0, 'errors': 0}
+        self.load_seconds = deque(maxlen=200)
+        self.timings = {}
+        self.thread = None
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def get(self, name, slate, loader, ttl, version=None):
+        """Returns the cached value for (name, slate), loading it on first use.
+
+        Args:
+            name (str): Entry name, e.g. 'odds'.
+            slate (date): Slate the value belongs to.
+            loader (callable): Produces the value, called with no arguments.
+            ttl (float): Seconds before the entry is reloaded in the background.
+            version (callable, optional): Returns a token that changes when the
+                source is republished; a change triggers a background reload.
+        """
+        key = (name, slate)
+        with self.lock:
+            self.specs[key] = (loader, ttl, version)
+            entry = self.entries.get(key)
+
+        if entry is None:
+            self._count('misses')
+            return self._load(key)
+        if time.monotonic() - entry.loaded_at > ttl:
+            self._count('stale_hits')
+            self._refresh_async(key)
+        else:
+            self._count('hits')
+        return entry.value
+
+    def _key_lock(self, key):
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _load(self, key, force=False):
+        # One load per key at a time; sessions arriving meanwhile get its result
+        with self._key_lock(key):
+            with self.lock:
+                loader, _, version = self.specs[key]
+                entry = self.entries.get(key)
+            if entry is not None and not force:
+                return entry.value
+
+            start = time.perf_counter()
+            token = version() if version else None
+            value = loader()
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                replaced = key in self.entries
+                self.entries[key] = CacheEntry(value, token)
+                self.load_seconds.append(elapsed)
+                if replaced:
+                    self.counters['swaps'] += 1
+            return value
+
+    def _refresh_async(self, key):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key,), daemon=True, name=f'cache-refresh-{key[0]}').start()
+
+    def _refresh(self, key):
+        try:
+            self._count('refreshes')
+            self._load(key, force=True)
+        except Exception as e:
+            # Keep serving the previous value
+            self._count('errors')
+            print(f"cache refresh of {key[0]} for {key[1]} failed: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def refresh_due(self):
+        """Reloads expired entries and entries whose source version changed."""
+        with self.lock:
+            keys = list(self.entries.items())
+        for key, entry in keys:
+            _, ttl, version = self.specs[key]
+            if time.monotonic() - entry.loaded_at > ttl:
+                self._refresh_async(key)
+                continue
+            if version is not None:
+                try:
+                    changed = version() != entry.version
+                except Exception:
+                    changed = False
+                if changed:
+                    self._refresh_async(key)
+        self._prune()
+
+    def _prune(self):
+        with self.lock:
+            for name in {name for name, _ in self.entries}:
+                slates = sorted(slate for entry_name, slate in self.entries if entry_name == name)
+                for slate in slates[:-self.keep_slates]:
+                    self.entries.pop((name, slate), None)
+                    self.specs.pop((name, slate), None)
+
+    def start(self):
+        """Starts the background refresher (once)."""
+        if self.thread is not None:
+            return self.thread
+
+        def _poll():
+            while True:
+                time.sleep(self.refresh_interval)
+                try:
+                    self.refresh_due()
+                except Exception as e:
+                    print(f"cache refresher: {e}")
+
+        self.thread = threading.Thread(target=_poll, daemon=True, name='dashboard-cache-refresher')
+        self.thread.start()
+        return self.thread
+
+    def record_timing(self, label, seconds):
+        """Keeps recent durations of a labelled operation (e.g. a page render) for stats()."""
+        with self.lock:
+            self.timings.setdefault(label, deque(maxlen=200)).append(seconds)
+
+    def stats(self):
+        """Hit/miss counters, entry count and load latency."""
+        with self.lock:
+            stats = dict(self.counters)
+            loads = list(self.load_seconds)
+            timings = {label: list(values) for label, values in self.timings.items()}
+            stats['entries'] = len(self.entries)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else None
+        stats['load_p50_s'] = statistics.median(loads) if loads else None
+        stats['load_max_s'] = max(loads) if loads else None
+        for label, values in timings.items():
+            stats[f'{label}_p50_ms'] = 1000 * statistics.median(values)
+            stats[f'{label}_max_ms'] = 1000 * max(values)
+        return stats
@@ -0,0 +1,124 @@
+"""Lookup tables the dashboard builds once per data load.
+
+Every structure is keyed by the lower-cased player name (or team
+abbreviation), so rendering a player card or a selection is a handful of
+dict lookups instead of scans over the loaded frames.
+"""
+
+from image_cache import image_key
+
+
+def convert_minute(data):
+    data = float(data)
+    minutes = int(data)
+    seconds = round((data - minutes) * 60)
+
+    if seconds >= 60:
+        minutes += 1
+        seconds = 0
+
+    return f"{minutes}:{seconds:02}"
+
+
+def name_tokens(name):
+    return name.lower().replace(".", "").split()
+
+
+def prefix_index(players):
+    """{prefix: [players]} over every word of every name, players kept in the given order."""
+    prefixes = {}
+    for player in players:
+        seen = set()
+        for token in name_tokens(player):
+            for end in range(1, len(token) + 1):
+                prefix = token[:end]
+                if prefix not in seen:
+                    seen.add(prefix)
+                    prefixes.setdefault(prefix, []).append(player)
+    return prefixes
+
+
+def _first_by(frame, key, value):
+    # First row wins, as the .values[0] lookups this replaces did
+    frame = frame.drop_duplicates(subset=key, keep='first')
+    return dict(zip(frame[key], frame[value]))
+
+
+def recent_games_table(games):
+    """A player's recent games as shown on the player page."""
+    table = games.copy()
+    table.columns = [col.replace("_", "").title() for col in table.columns]
+    table = table.drop(['Player', 'Team', 'Team Name', 'Teamid'], axis=1, errors='ignore')
+    if 'Min' in table.columns:
+        table['Min'] = table['Min'].apply(convert_minute)
+    return table.reset_index(drop=True)
+
+
+def odds_tables(odds_data):
+    """{player: [(table name, odds rows)]} across every market."""
+    odds = {}
+    for table_name, df in odds_data.items():
+        columns = [col for col in [table_name, "Over", "Under", "recommendation"] if col in df.columns]
+        # The classification tables store the prices under each other's label
+        swapped = df[['player'] + columns].rename(columns={'Over': 'Under', 'Under': 'Over'})
+        titles = {col: col.replace("_", " ").title() for col in columns}
+        for player, rows in swapped.groupby('player', sort=False):
+            table = rows[columns].rename(columns=titles).reset_index(drop=True)
+            odds.setdefault(player, []).append((table_name, table))
+    return odds
+
+
+class DashboardIndex:
+    """Per-player and per-team lookups over one load of the dashboard data.
+
+    Args:
+        player_images (pd.DataFrame): players_lower -> images.
+        team_images (pd.DataFrame): teams -> images.
+        odds_data (dict): {table name: today's recommendations}.
+        player_data (pd.DataFrame): Recent games of the listed players.
+        games (pd.DataFrame): Tonight's team / opponent / home rows.
+    """
+
+    def __init__(self, player_images, team_images, odds_data, player_data, games):
+        self.players = sorted({player for df in odds_data.values() for player in df['player']})
+        self.player_images = _first_by(player_images, 'players_lower', 'images')
+        self.asset_keys = _first_by(player_images, 'players_lower', image_key(player_images))
+        self.team_images = _first_by(team_images, 'teams', 'images')
+        self.games = {row.team: (row.opponent, row.home) for row in games.drop_duplicates('team').itertuples()}
+
+        player_data = player_data.assign(player_key=player_data['player'].str.lower())
+        latest = player_data.drop_duplicates('player_key')
+        self.player_teams = dict(zip(latest['player_key'], zip(latest['team'], latest['Team Name'])))
+        self.recent_games = {key: recent_games_table(rows.drop(columns='player_key'))
+                             for key, rows in player_data.groupby('player_key', sort=False)}
+        self.odds = odds_tables(odds_data)
+        self.prefixes = prefix_index(self.players)
+
+    def search(self, query):
+        """Players with a name word starting with each word of the query, e.g. 'leb ja'."""
+        tokens = name_tokens(query)
+        if not tokens:
+            return self.players
+        matches = self.prefixes.get(tokens[0], [])
+        for token in tokens[1:]:
+            allowed = set(self.prefixes.get(token, []))
+            matches = [player for player in matches if player in allowed]
+        return matches
+
+    def image(self, player):
+        return self.player_images.get(player)
+
+    def asset_key(self, player):
+        """The player's key in the thumbnail cache."""
+        return self.asset_keys.get(player, player)
+
+    def team(self, player):
+        """(team, team name) of a player's most recent game, or (None, None)."""
+        return self.player_teams.get(player, (None, None))
+
+    def matchup(self, team):
+        """('vs' or '@', opponent) for tonight, or (None, None) when the team is not playing."""
+        if team not in self.games:
+            return None, None
+        opponent, home = self.games[team]
+        return ('vs' if home == 1 else '@'), opponent
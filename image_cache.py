@@ -0,0 +1,267 @@
+"""Local thumbnail cache for player headshots and team logos.
+
+Each asset is downloaded once, resized to the sizes the dashboard shows and
+stored as PNG under
+
+    <NBA_IMAGE_CACHE>/<kind>/<key>/<content hash>_<size>.png
+
+next to a source.txt holding the URL it came from. Players are keyed by
+player_id (or by name when the image table has no id) and teams by
+abbreviation. Serving a thumbnail touches its mtime, which is what eviction
+orders by: once the directory is over its disk budget the least recently
+used assets are removed first.
+
+    python image_cache.py                 # fetch missing or changed assets for today's slate
+    python image_cache.py --force         # re-download everything
+    python image_cache.py --budget-mb 100 # evict down to a smaller budget
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+CACHE_DIR = os.environ.get('NBA_IMAGE_CACHE', os.path.join(os.getcwd(), 'image_cache'))
+
+BUDGET_BYTES = 200 * 1024 * 1024
+
+# Display width in pixels of each stored size, per asset kind
+SIZES = {
+    'player': {'card': 200, 'detail': 320},
+    'team': {'logo': 77},
+}
+
+# Served files are only re-touched this often, so a render is not a burst of utime calls
+TOUCH_INTERVAL = 60 * 60
+
+
+def source_url(url):
+    """The largest headshot variant; the table stores the 110x80 one."""
+    return url.replace("h=80", "h=254").replace("w=110", "w=350")
+
+
+def thumbnail(content, width):
+    """PNG bytes of the image resized to `width` pixels wide (never upscaled)."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(content))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def download(url, timeout=10):
+    import requests
+
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+class ImageCache:
+    """Disk-backed thumbnails with LRU eviction by total size.
+
+    Args:
+        cache_dir (str): Root directory, NBA_IMAGE_CACHE by default.
+        budget_bytes (int): Disk budget enforced by evict().
+        fetch (callable): url -> bytes, requests by default.
+    """
+
+    def __init__(self, cache_dir=None, budget_bytes=BUDGET_BYTES, fetch=download):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.budget_bytes = budget_bytes
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def key_dir(self, kind, key):
+        return os.path.join(self.cache_dir, kind, str(key).replace(os.sep, '_'))
+
+    def path(self, kind, key, size):
+        """Path of a stored thumbnail, or None when the asset was never fetched."""
+        try:
+            names = os.listdir(self.key_dir(kind, key))
+        except FileNotFoundError:
+            return None
+        suffix = f'_{size}.png'
+        for name in names:
+            if name.endswith(suffix):
+                return os.path.join(self.key_dir(kind, key), name)
+        return None
+
+    def get(self, kind, key, size):
+        """Thumbnail bytes for st.image, or None on a miss."""
+        path = self.path(kind, key, size)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+            if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except FileNotFoundError:
+            # Evicted between the listing and the read
+            return None
+        return content
+
+    def stored_url(self, kind, key):
+        try:
+            with open(os.path.join(self.key_dir(kind, key), 'source.txt')) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def store(self, kind, key, url):
+        """Downloads one asset and writes its thumbnails.
+
+        Returns:
+            bool: True when new thumbnails were written, False when the content was unchanged.
+        """
+        url = source_url(url)
+        content = self.fetch(url)
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        key_dir = self.key_dir(kind, key)
+        os.makedirs(key_dir, exist_ok=True)
+        existing = set(os.listdir(key_dir))
+
+        changed = False
+        for size, width in SIZES[kind].items():
+            name = f'{digest}_{size}.png'
+            if name in existing:
+                continue
+            with open(os.path.join(key_dir, f'{name}.tmp'), 'wb') as file:
+                file.write(thumbnail(content, width))
+            os.replace(os.path.join(key_dir, f'{name}.tmp'), os.path.join(key_dir, name))
+            changed = True
+
+        # Thumbnails of a previous version of the image
+        for name in existing:
+            if name.endswith('.png') and not name.startswith(f'{digest}_'):
+                os.remove(os.path.join(key_dir, name))
+        with open(os.path.join(key_dir, 'source.txt'), 'w') as file:
+            file.write(url)
+        return changed
+
+    def refresh(self, assets, force=False, workers=8):
+        """Fetches assets that are missing, whose URL changed, or all of them with force.
+
+        Args:
+            assets (iterable): (kind, key, url) tuples.
+
+        Returns:
+            dict: Counts of fetched, unchanged, skipped and failed assets, and evicted bytes.
+        """
+        assets = list(assets)
+        todo = [(kind, key, url) for kind, key, url in assets
+                if url and (force or self.stored_url(kind, key) != source_url(url)
+                            or any(self.path(kind, key, size) is None for size in SIZES[kind]))]
+        counts = {'fetched': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+        errors = []
+
+        def _store(asset):
+            try:
+                return 'fetched' if self.store(*asset) else 'unchanged'
+            except Exception as e:
+                errors.append(f"{asset[0]} {asset[1]}: {e}")
+                return 'failed'
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(_store, todo):
+                counts[result] += 1
+        if errors:
+            print(f"image cache: {len(errors)} downloads failed, first: {errors[0]}")
+        counts['skipped'] = len(assets) - len(todo)
+        counts['evicted_bytes'] = self.evict()
+        print(f"image cache: {counts}")
+        return counts
+
+    def refresh_async(self, assets):
+        """Runs refresh() on a background thread unless one is already running."""
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+
+        def _run():
+            try:
+                self.refresh(assets)
+            except Exception as e:
+                print(f"image cache refresh failed: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing = False
+
+        threading.Thread(target=_run, daemon=True, name='image-cache-refresh').start()
+
+    def usage(self):
+        """[(last used, bytes, key dir)] for every stored asset."""
+        assets = []
+        for kind in SIZES:
+            kind_dir = os.path.join(self.cache_dir, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for entry in os.scandir(kind_dir):
+                stats = [f.stat() for f in os.scandir(entry.path) if f.is_file()]
+                if stats:
+                    assets.append((max(s.st_mtime for s in stats), sum(s.st_size for s in stats), entry.path))
+        return assets
+
+    def evict(self):
+        """Removes least recently used assets until the cache fits the budget; returns bytes freed."""
+        assets = sorted(self.usage())
+        total = sum(size for _, size, _ in assets)
+        freed = 0
+        for _, size, key_dir in assets:
+            if total - freed <= self.budget_bytes:
+                break
+            shutil.rmtree(key_dir, ignore_errors=True)
+            freed += size
+        return freed
+
+
+def image_key(player_images):
+    """Column the player thumbnails are keyed by: player_id when the table has it."""
+    return 'player_id' if 'player_id' in player_images.columns else 'players_lower'
+
+
+def image_assets(player_images, team_images):
+    """(kind, key, url) for every row of the image tables (players_lower already cleaned)."""
+    key = image_key(player_images)
+    assets = [('player', k, url) for k, url in zip(player_images[key], player_images['images']) if url]
+    assets += [('team', k, url) for k, url in zip(team_images['teams'], team_images['images']) if url]
+    return assets
+
+
+if __name__ == "__main__":
+    from models.dashboard_snapshot import images, read_snapshot
+    from scraping_data.game_scheduler import league_date
+    from outcomes import clean_player_names
+
+    parser = argparse.ArgumentParser(description="Download and thumbnail the dashboard's headshots and logos.")
+    parser.add_argument('--force', action='store_true', help="Re-download every asset.")
+    parser.add_argument('--budget-mb', type=int, default=BUDGET_BYTES // (1024 * 1024))
+    parser.add_argument('--cache-dir', default=None)
+    args = parser.parse_args()
+
+    snapshot = read_snapshot(league_date()) or {}
+    if 'player_images' in snapshot and 'team_images' in snapshot:
+        player_images, team_images = snapshot['player_images'], snapshot['team_images']
+    else:
+        player_images, team_images = images()
+    if player_images is None:
+        raise SystemExit("no image tables available")
+    player_images = player_images.assign(images=player_images['images'].fillna(''),
+                                         players_lower=clean_player_names(player_images['players']))
+    team_images = team_images.assign(images=team_images['images'].fillna(''))
+
+    cache = ImageCache(args.cache_dir, budget_bytes=args.budget_mb * 1024 * 1024)
+    cache.refresh(image_assets(player_images, team_images), force=args.force)
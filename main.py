@@ -1,23 +1,60 @@
-from scraping_data.scrape_games import scrape_current_games
-from cleaning_data.cleaning_script import clean_current_player_data,clean_current_team_ratings
-from outcomes import current_outcome
+import argparse
+
 from scraping_data.todays_matchups import get_matchups
+from scraping_data.instrumentation import pipeline_run
+from scraping_data.pipeline import Pipeline, StopPipeline, add_arguments
 
-matchups = get_matchups()
 
-if matchups.empty:
-    print("no games today")
-else:
-    print("Starting scraping of game data")
+def matchups_stage():
+    matchups = get_matchups()
+    if matchups.empty:
+        raise StopPipeline("no games today")
+    return matchups
 
-    team_data, player_data, date = scrape_current_games(0)
 
+def scrape_stage(matchups):
+    # The scraping and cleaning stack is only needed on game days
+    from scraping_data.scrape_games import scrape_current_games
+
+    print("Starting scraping of game data")
+    scraped = scrape_current_games(0)
+    if scraped is None:
+        raise RuntimeError("scraping returned no data")
+    team_data, player_data, date = scraped
     print(date)
-    print("Cleaning Data")
+    return team_data, player_data, date
+
 
+def clean_players_stage(player_data, date):
+    from cleaning_data.cleaning_script import clean_current_player_data
+
+    print("Cleaning Data")
     clean_current_player_data(player_data, date)
 
+
+def clean_teams_stage(team_data):
+    from cleaning_data.cleaning_script import clean_current_team_ratings
+
     clean_current_team_ratings(team_data)
 
-    # current_outcome(player_data, date)
 
+pipeline = (Pipeline('daily_ingest')
+            .add('matchups', matchups_stage, outputs=['matchups'])
+            .add('scrape_games', scrape_stage, inputs=['matchups'],
+                 outputs=['team_data', 'player_data', 'game_date'])
+            # Player and team cleaning only share the scrape, so they run side by side
+            .add('clean_players', clean_players_stage, inputs=['player_data', 'game_date'])
+            .add('clean_teams', clean_teams_stage, inputs=['team_data']))
+
+
+if __name__ == "__main__":
+    args = add_arguments(argparse.ArgumentParser(description="Scrape and clean last night's games.")).parse_args()
+
+    with pipeline_run('daily_ingest'):
+        pipeline.run(from_stage=args.from_stage, resume=args.resume)
+
+        # from outcomes import current_outcome  (loads the BigQuery client)
+        # current_outcome(player_data, date)
+
+        from scraping_data.schema import memory_report
+        print(memory_report())
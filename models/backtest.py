@@ -0,0 +1,265 @@
+"""Walk-forward backtests of the base model -> meta-model -> classifier stack.
+
+Replays the stack over historical prop boards in one vectorized pass per
+category, then evaluates Over/Under threshold settings against the results:
+
+    python -m models.backtest --data backtest_pts.parquet --category pts \
+        --over 0.50:0.70:0.01 --under 0.30:0.50:0.01 --workers 8
+
+The input frame has one row per player, game and market with:
+    - the model features as of tip-off (see models/training_data.py),
+    - the line column ('points', ...) and Over/Under prices at bet time,
+    - close_<line>, close_Over and close_Under from the closing snapshot,
+    - 'actual', the stat the player finished with.
+
+Stakes follow American odds: risk |odds| to win 100 on favourites, risk 100
+to win the odds on underdogs. A push returns the stake.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from models.scoring import CATEGORY_LINES, score_frame
+
+
+TARGET = 'actual'
+
+
+def implied_probability(odds):
+    """Implied win probability of American odds (no vig removal)."""
+    odds = np.asarray(odds, dtype=np.float64)
+    # np.where evaluates both branches; -100 divides by zero in the unused one
+    with np.errstate(divide='ignore'):
+        return np.where(odds < 0, -odds / (100 - odds), 100 / (odds + 100))
+
+
+def _risk(odds):
+    odds = np.asarray(odds, dtype=np.float64)
+    return np.where(odds < 0, -odds, 100.0)
+
+
+def _payout(odds):
+    odds = np.asarray(odds, dtype=np.float64)
+    return np.where(odds < 0, 100.0, odds)
+
+
+def score_history(scorer, category, frame):
+    """Scores every historical row with the full stack in one batch.
+
+    Args:
+        scorer: Loaded bundles (pickled models) or a fast_scoring.FastModels instance.
+        category (str): Stat category, e.g. 'pts'.
+        frame (pd.DataFrame): Backtest rows, see the module docstring.
+
+    Returns:
+        pd.DataFrame: frame with the stack's predictions, ensemble, delta and proba,
+            without the rows the stack could not score (feature gaps).
+    """
+    if hasattr(scorer, 'score'):
+        scored = pd.DataFrame(scorer.score(category, frame), index=frame.index)
+    else:
+        scored = score_frame(scorer, category, frame)
+    scored = pd.concat([frame.drop(columns=scored.columns, errors='ignore'), scored], axis=1)
+    unscored = scored['proba'].isna()
+    if unscored.any():
+        print(f"{category}: excluded {int(unscored.sum())} of {len(scored)} rows with incomplete stack features")
+    return scored[~unscored]
+
+
+def settle(scored, category):
+    """Precomputes what an Over and an Under bet on each row would have returned.
+
+    Returns:
+        dict: Arrays aligned to scored (sorted by game_date) used by evaluate().
+    """
+    line = CATEGORY_LINES[category]
+    scored = scored.sort_values('game_date', kind='stable')
+    actual = scored[TARGET].to_numpy(dtype=np.float64)
+    bet_line = scored[line].to_numpy(dtype=np.float64)
+    over_odds, under_odds = scored['Over'].to_numpy(), scored['Under'].to_numpy()
+
+    over_won, under_won = actual > bet_line, actual < bet_line
+    push = actual == bet_line
+    settled = {
+        'game_date': scored['game_date'].to_numpy(),
+        'proba': scored['proba'].to_numpy(dtype=np.float64),
+        'over_hit': over_won, 'under_hit': under_won, 'push': push,
+        'over_profit': np.where(over_won, _payout(over_odds), np.where(push, 0.0, -_risk(over_odds))),
+        'under_profit': np.where(under_won, _payout(under_odds), np.where(push, 0.0, -_risk(under_odds))),
+        'over_risk': _risk(over_odds), 'under_risk': _risk(under_odds),
+    }
+
+    close_line = f'close_{line}'
+    if close_line in scored.columns:
+        close = scored[close_line].to_numpy(dtype=np.float64)
+        settled['over_line_clv'] = close - bet_line
+        settled['under_line_clv'] = bet_line - close
+    if 'close_Over' in scored.columns and 'close_Under' in scored.columns:
+        settled['over_price_clv'] = implied_probability(scored['close_Over']) - implied_probability(over_odds)
+        settled['under_price_clv'] = implied_probability(scored['close_Under']) - implied_probability(under_odds)
+    return settled
+
+
+def _max_drawdown(profit):
+    equity = np.cumsum(profit)
+    peak = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:]
+    return float(np.max(peak - equity)) if len(equity) else 0.0
+
+
+def evaluate(settled, over_threshold, under_threshold):
+    """Hit rate, ROI, CLV and drawdown for one threshold pair.
+
+    Rows with proba above over_threshold bet the Over, below under_threshold the
+    Under, mirroring models.scoring.recommend.
+    """
+    proba = settled['proba']
+    over = proba > over_threshold
+    under = ~over & (proba < under_threshold)
+    bet = over | under
+
+    profit = np.where(over, settled['over_profit'], np.where(under, settled['under_profit'], 0.0))
+    risk = np.where(over, settled['over_risk'], np.where(under, settled['under_risk'], 0.0))
+    hits = (over & settled['over_hit']) | (under & settled['under_hit'])
+    decided = bet & ~settled['push']
+
+    result = {
+        'over_threshold': over_threshold, 'under_threshold': under_threshold,
+        'bets': int(bet.sum()), 'overs': int(over.sum()), 'unders': int(under.sum()),
+        'hit_rate': float(hits.sum() / decided.sum()) if decided.any() else np.nan,
+        'profit': float(profit.sum()),
+        'roi': float(profit.sum() / risk.sum()) if risk.sum() else np.nan,
+        'max_drawdown': _max_drawdown(profit[bet]),
+    }
+    for kind in ['line_clv', 'price_clv']:
+        if f'over_{kind}' in settled:
+            clv = np.where(over, settled[f'over_{kind}'], settled[f'under_{kind}'])[bet]
+            result[kind] = float(np.nanmean(clv)) if len(clv) else np.nan
+    return result
+
+
+def _evaluate_chunk(args):
+    settled, pairs = args
+    return [evaluate(settled, over, under) for over, under in pairs]
+
+
+def threshold_grid(over_values, under_values):
+    """Every (over, under) pair where the Under threshold sits at or below the Over one."""
+    return [(float(o), float(u)) for o in over_values for u in under_values if u <= o]
+
+
+def sweep(settled, pairs, workers=None):
+    """Evaluates many threshold pairs, split across processes.
+
+    Args:
+        settled (dict): Output of settle().
+        pairs (list): (over_threshold, under_threshold) tuples.
+        workers (int, optional): Processes to use, defaults to the core count.
+
+    Returns:
+        pd.DataFrame: One row of metrics per threshold pair.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(pairs) < 2 * workers:
+        return pd.DataFrame(_evaluate_chunk((settled, pairs)))
+
+    chunks = [pairs[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_evaluate_chunk, [(settled, chunk) for chunk in chunks])
+    return (pd.DataFrame([row for chunk in results for row in chunk])
+            .sort_values(['over_threshold', 'under_threshold'], ignore_index=True))
+
+
+def _subset(settled, mask):
+    return {key: value[mask] for key, value in settled.items()}
+
+
+def walk_forward(settled, pairs, train_days=60, test_days=14, min_bets=50, workers=None):
+    """Picks thresholds on a trailing window and scores them on the window that follows.
+
+    Each fold chooses the pair with the best ROI (among pairs with at least
+    min_bets bets) over the previous train_days game days, then applies it to
+    the next test_days, so the reported numbers never see their own outcomes.
+
+    Returns:
+        pd.DataFrame: One row per fold with the chosen thresholds and out-of-sample metrics.
+    """
+    days = np.unique(settled['game_date'])
+    folds = []
+    for start in range(train_days, len(days), test_days):
+        train = np.isin(settled['game_date'], days[start - train_days:start])
+        test = np.isin(settled['game_date'], days[start:start + test_days])
+        results = sweep(_subset(settled, train), pairs, workers)
+        results = results[results['bets'] >= min_bets]
+        if results.empty:
+            continue
+        best = results.loc[results['roi'].idxmax()]
+        fold = evaluate(_subset(settled, test), best['over_threshold'], best['under_threshold'])
+        fold.update(test_start=days[start], train_roi=best['roi'])
+        folds.append(fold)
+    return pd.DataFrame(folds)
+
+
+def backtest(scorer, category, frame, pairs, workers=None):
+    """Scores, settles and sweeps one category's history.
+
+    Returns:
+        tuple: (scored rows, sweep results)
+    """
+    scored = score_history(scorer, category, frame)
+    return scored, sweep(settle(scored, category), pairs, workers)
+
+
+def _parse_range(text):
+    start, stop, step = (float(part) for part in text.split(':'))
+    return np.round(np.arange(start, stop + step / 2, step), 6)
+
+
+def main(data, category, over, under, workers=None, model_dir=None, fast_dir=None, min_bets=50, folds=False):
+    import time
+
+    from models.model_store import ModelStore
+
+    frame = pd.read_parquet(data)
+    if fast_dir:
+        from models.fast_scoring import FastModels
+        scorer = FastModels(fast_dir)
+    else:
+        scorer = ModelStore(model_dir).load()
+
+    start = time.perf_counter()
+    scored = score_history(scorer, category, frame)
+    settled = settle(scored, category)
+    pairs = threshold_grid(_parse_range(over), _parse_range(under))
+    print(f"scored {len(scored)} rows in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    results = sweep(settled, pairs, workers)
+    print(f"evaluated {len(pairs)} threshold pairs in {time.perf_counter() - start:.2f}s")
+
+    pd.set_option('display.width', 200)
+    print(results[results['bets'] >= min_bets].sort_values('roi', ascending=False).head(20).to_string(index=False))
+
+    if folds:
+        print(walk_forward(settled, pairs, min_bets=min_bets, workers=workers).to_string(index=False))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest Over/Under thresholds over historical boards.")
+    parser.add_argument('--data', required=True, help="Parquet file of backtest rows for one category")
+    parser.add_argument('--category', default='pts')
+    parser.add_argument('--over', default='0.50:0.70:0.01', help="start:stop:step")
+    parser.add_argument('--under', default='0.30:0.50:0.01', help="start:stop:step")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--model-dir', default=None)
+    parser.add_argument('--fast-dir', default=None, help="Score with models exported by models.export_models")
+    parser.add_argument('--min-bets', type=int, default=50)
+    parser.add_argument('--walk-forward', action='store_true', help="Also report walk-forward threshold folds")
+    args = parser.parse_args()
+
+    main(args.data, args.category, args.over, args.under, args.workers, args.model_dir,
+         args.fast_dir, args.min_bets, args.walk_forward)
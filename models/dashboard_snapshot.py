@@ -0,0 +1,182 @@
+"""Daily dashboard snapshot, written after classification and read by dashboard.py.
+
+One Parquet file per slate, dashboard_<YYYY-MM-DD>.parquet, holds everything
+the dashboard renders as a single union table with a 'section' column:
+
+    recommendations   today's classified boards, one 'market' per line column
+    recent_games      each listed player's last three games, in display names
+    matchups          team, opponent, home for tonight's games
+    player_images     player headshot URLs
+    team_images       team logo URLs
+
+Set NBA_SNAPSHOT_DIR (a local directory or any fsspec URL such as gs://...)
+to the same location for the pipeline and the dashboard.
+"""
+
+import os
+from datetime import date as dt
+
+import pandas as pd
+
+from scraping_data.game_scheduler import league_date
+
+
+SNAPSHOT_DIR = os.environ.get('NBA_SNAPSHOT_DIR', os.path.join(os.getcwd(), 'snapshots'))
+
+SECTIONS = ['recommendations', 'recent_games', 'matchups', 'player_images', 'team_images']
+
+# clean_player_data column -> the name the dashboard shows
+RECENT_GAME_COLUMNS = {
+    'team_name': 'Team Name', 'game_date': 'Game Date', 'fg_pct': 'FG %', 'fgthree_m': '3pm',
+    'fgthree_a': 'fg3a', 'fgthree__pct': 'FG3 %', 'ft_pct': 'FT %', 'plus_minus': 'Plus Minus',
+}
+
+# Integer columns the union turns into floats (their sections' rows are never null)
+INTEGER_COLUMNS = ['home', 'team_id']
+
+RECENT_GAMES_QUERY = """
+    SELECT p.player, p.team, t.team_name, t.matchup, p.game_date, p.min, p.pts, p.reb, p.ast,
+           p.fgm, p.fga, p.fg_pct * 100 AS fg_pct, p.fgthree_m, p.fgthree_a, p.fgthree__pct * 100 AS fgthree__pct,
+           p.ftm, p.fta, p.ft_pct * 100 AS ft_pct, p.plus_minus, t.team_id
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY game_date DESC) AS rn
+        FROM clean_player_data
+        WHERE player_id = ANY(%s) AND season_start_year = %s
+    ) p
+    INNER JOIN clean_team_data t
+        ON p.game_id = t.game_id AND p.team = t.team
+    WHERE p.rn <= 3
+    ORDER BY p.player, p.game_date DESC
+"""
+
+
+def snapshot_path(game_date, snapshot_dir=None):
+    return f"{(snapshot_dir or SNAPSHOT_DIR).rstrip('/')}/dashboard_{game_date.isoformat()}.parquet"
+
+
+def snapshot_version(game_date, snapshot_dir=None):
+    """A token that changes whenever the slate's snapshot is (re)published, None before it exists."""
+    path = snapshot_path(game_date, snapshot_dir)
+    try:
+        if '://' in path:
+            import fsspec
+
+            fs, _, _ = fsspec.get_fs_token_paths(path)
+            info = fs.info(path)
+            return str(info.get('mtime') or info.get('updated') or info.get('etag') or info.get('size'))
+        return os.stat(path).st_mtime_ns
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def recent_games(conn, player_ids, season):
+    """Last three games of each player with the columns the dashboard shows."""
+    games = conn.query(RECENT_GAMES_QUERY, params=([int(p) for p in player_ids], str(season)))
+    return games.rename(columns=RECENT_GAME_COLUMNS)
+
+
+def tonight_matchups(matchups, team_ids):
+    """team / opponent / home rows from the scoreboard GameHeader.
+
+    Args:
+        matchups (pd.DataFrame): get_matchups() output.
+        team_ids (pd.DataFrame): team_id -> team abbreviation.
+    """
+    abbreviations = team_ids.drop_duplicates('team_id').set_index('team_id')['team']
+    home = matchups['HOME_TEAM_ID'].map(abbreviations)
+    away = matchups['VISITOR_TEAM_ID'].map(abbreviations)
+    return pd.concat([
+        pd.DataFrame({'team': home, 'opponent': away, 'home': 1}),
+        pd.DataFrame({'team': away, 'opponent': home, 'home': 0}),
+    ], ignore_index=True).dropna()
+
+
+def recommendations(boards):
+    """Stacks the classified boards, keeping only rows with a bet."""
+    frames = []
+    for cat, board in (boards or {}).items():
+        # A market that was not classified has no board, or one without recommendations
+        if board is None or 'recommendation' not in board.columns:
+            continue
+        board = board[board['recommendation'].notna() & (board['recommendation'] != 'No Bet Recommendation')]
+        frames.append(board.assign(market=cat))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def images():
+    """Player headshots and team logos from the warehouse (skipped when it cannot be reached)."""
+    import pandas_gbq
+
+    project_id = 'miscellaneous-projects-444203'
+    try:
+        return (pandas_gbq.read_gbq("SELECT * FROM `capstone_data.player_images`", project_id=project_id),
+                pandas_gbq.read_gbq("SELECT * FROM `capstone_data.team_logos`", project_id=project_id))
+    except Exception as e:
+        print(f"snapshot: could not pull images, the dashboard will query them live: {e}")
+        return None, None
+
+
+def write_snapshot(sections, game_date, snapshot_dir=None):
+    """Writes the sections as one Parquet file for the slate date.
+
+    Args:
+        sections (dict): {section name: DataFrame}; missing or None sections are left out.
+        game_date (date): Slate date the snapshot is for.
+
+    Returns:
+        str: Path written.
+    """
+    frames = [frame.assign(section=name) for name, frame in sections.items()
+              if name in SECTIONS and frame is not None and not frame.empty]
+    snapshot = pd.concat(frames, ignore_index=True)
+    # Sections share one schema, so columns a section lacks are NaN, which Arrow
+    # will not mix with strings or dates in an object column
+    for col in snapshot.columns:
+        values = snapshot[col].dropna()
+        if isinstance(snapshot[col].dtype, pd.CategoricalDtype) or values.map(type).eq(str).all():
+            snapshot[col] = snapshot[col].astype('string')
+        elif snapshot[col].dtype == object and len(values) and isinstance(values.iloc[0], dt):
+            snapshot[col] = pd.to_datetime(snapshot[col])
+
+    path = snapshot_path(game_date, snapshot_dir)
+    if '://' in path:
+        snapshot.to_parquet(path, index=False)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        snapshot.to_parquet(f'{path}.tmp', index=False)
+        os.replace(f'{path}.tmp', path)
+    print(f"snapshot: {len(snapshot)} rows across {len(frames)} sections -> {path}")
+    return path
+
+
+def read_snapshot(game_date, snapshot_dir=None):
+    """Reads a slate's snapshot back into {section: DataFrame}, or None when it was not published."""
+    path = snapshot_path(game_date, snapshot_dir)
+    try:
+        snapshot = pd.read_parquet(path)
+    except (FileNotFoundError, OSError):
+        return None
+    sections = {}
+    for name, frame in snapshot.groupby('section', sort=False):
+        frame = frame.drop(columns='section').dropna(axis=1, how='all').reset_index(drop=True)
+        integers = [col for col in INTEGER_COLUMNS if col in frame.columns and frame[col].notna().all()]
+        sections[name] = frame.astype({col: 'int64' for col in integers})
+    return sections
+
+
+def publish(conn, matchups, full_data, boards, game_date, snapshot_dir=None):
+    """Collects every section for the slate and writes the snapshot.
+
+    game_date is the slate's league_date(), the date dashboard.py reads the snapshot by.
+    """
+    season = game_date.year if game_date.month >= 10 else game_date.year - 1
+    team_ids = conn.query("SELECT DISTINCT team_id, team FROM clean_team_data")
+    player_images, team_images = images()
+    sections = {
+        'recommendations': recommendations(boards),
+        'recent_games': recent_games(conn, full_data['player_id'].unique(), season),
+        'matchups': tonight_matchups(matchups, team_ids),
+        'player_images': player_images,
+        'team_images': team_images,
+    }
+    return write_snapshot(sections, game_date, snapshot_dir)
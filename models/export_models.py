@@ -0,0 +1,135 @@
+"""Exports the pickled models to the compact format read by models/fast_scoring.py.
+
+    python -m models.export_models --model-dir models --out-dir models/fast
+
+Writes manifest.json (coefficients, thresholds, feature order) plus one
+LightGBM text dump per booster, then checks the fast path reproduces the
+pickled models before reporting success.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from models.fast_scoring import FastModels
+from models.model_store import ModelStore
+from models.scoring import CATEGORY_LINES, SKIPPED_MODELS, score_frame
+
+
+def _feature_names(model):
+    return [f.strip() for f in model.feature_names_in_]
+
+
+def _export_model(model, name, out_dir, link='identity'):
+    """Returns the manifest spec for one fitted model, writing booster dumps to out_dir."""
+    if hasattr(model, 'booster_'):
+        file_name = f'{name}.txt'
+        with open(os.path.join(out_dir, file_name), 'w') as file:
+            file.write(model.booster_.model_to_string())
+        return {'type': 'lightgbm', 'file': file_name, 'features': _feature_names(model)}
+
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        intercept = np.asarray(model.intercept_, dtype=np.float64)
+        if coef.ndim > 1 and coef.shape[0] != 1:
+            raise NotImplementedError(f"{name}: only single-output linear models can be exported")
+        return {'type': 'linear', 'features': _feature_names(model), 'link': link,
+                'coef': coef.ravel().tolist(), 'intercept': float(intercept.ravel()[0]) if intercept.size else 0.0}
+
+    raise NotImplementedError(f"{name}: {type(model).__name__} has no fast-path export")
+
+
+def export_models(bundles, out_dir):
+    """Writes every category with a complete model stack to out_dir.
+
+    Args:
+        bundles (dict): Loaded bundles from ModelStore.
+        out_dir (str): Destination directory.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'categories': {}}
+
+    for category, category_models in bundles['models'].items():
+        if category not in bundles['meta_model'] or category not in bundles['classification_models']:
+            print(f"Skipping {category}: no meta-model or classifier")
+            continue
+        model_dict = bundles['classification_models'][category]
+        base = {name: _export_model(model, f'{category}_{name}', out_dir)
+                for name, model in category_models.items()
+                if name.lower() not in SKIPPED_MODELS}
+        manifest['categories'][category] = {
+            'base': base,
+            'meta_coef': np.asarray(bundles['meta_model'][category].coef_, dtype=np.float64).tolist(),
+            'classifier': _export_model(model_dict['Fitted_Model'], f'{category}_classifier', out_dir, link='logistic'),
+            'Over_Threshold': float(model_dict['Over_Threshold']),
+            'Under_Threshold': float(model_dict['Under_Threshold']),
+            'line': CATEGORY_LINES[category],
+        }
+
+    # Written last and swapped in whole: servers reload when the manifest changes
+    path = os.path.join(out_dir, 'manifest.json')
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(f'{path}.tmp', path)
+    return manifest
+
+
+def sample_frame(bundles, category, rows=500, seed=0):
+    """Random feature rows covering every input the category's stack reads."""
+    rng = np.random.default_rng(seed)
+    features = set()
+    for name, model in bundles['models'][category].items():
+        if name.lower() not in SKIPPED_MODELS:
+            features.update(_feature_names(model))
+    features.update(_feature_names(bundles['classification_models'][category]['Fitted_Model']))
+    frame = pd.DataFrame({f: rng.normal(0, 10, rows) for f in sorted(features)})
+    frame[CATEGORY_LINES[category]] = rng.integers(5, 40, rows) + 0.5
+    # Feed both paths the same float32 values so tree splits compare identically
+    return frame.astype(np.float32).astype(np.float64)
+
+
+def verify_parity(bundles, out_dir, rows=500, atol=1e-6):
+    """Compares the fast path with the pickled models on random rows.
+
+    Raises:
+        AssertionError: If any prediction differs by more than atol.
+    """
+    fast = FastModels(out_dir)
+    for category in fast.categories:
+        frame = sample_frame(bundles, category, rows)
+        expected = score_frame(bundles, category, frame)
+        actual = fast.score(category, frame)
+        for col in expected.columns:
+            if col == 'recommendation':
+                mismatched = int((expected[col].to_numpy() != actual[col]).sum())
+                assert mismatched == 0, f"{category} {col}: {mismatched} recommendations differ"
+            else:
+                diff = float(np.max(np.abs(expected[col].to_numpy(dtype=np.float64) - actual[col])))
+                assert diff <= atol, f"{category} {col}: max abs difference {diff}"
+                print(f"{category} {col}: max abs difference {diff:.2e}")
+
+
+def main(model_dir=None, out_dir=None):
+    store = ModelStore(model_dir)
+    bundles = store.load()
+    out_dir = out_dir or os.path.join(store.model_dir, 'fast')
+
+    export_models(bundles, out_dir)
+    verify_parity(bundles, out_dir)
+    print(f"fast-path models exported to {out_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export pickled models for the NumPy-only scoring path.")
+    parser.add_argument('--model-dir', default=None)
+    parser.add_argument('--out-dir', default=None)
+    args = parser.parse_args()
+
+    main(args.model_dir, args.out_dir)
@@ -0,0 +1,226 @@
+"""Lean scoring path over the artifacts written by models/export_models.py.
+
+Only NumPy is imported: the linear models are coefficient arrays, the LightGBM
+booster is evaluated straight from its text dump, and the classifier is either
+a logistic coefficient vector or another booster dump. Inputs are contiguous
+float32 matrices built in each model's feature order.
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+K_ZERO_THRESHOLD = 1e-35
+MISSING_ZERO = 1
+MISSING_NAN = 2
+
+
+def feature_matrix(frame, features):
+    """Builds a contiguous float32 matrix from a DataFrame or dict of columns, in feature order."""
+    return np.ascontiguousarray(np.column_stack([np.asarray(frame[f], dtype=np.float32) for f in features]))
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -500, 500)))
+
+
+class LinearModel:
+    """y = X @ coef + intercept, optionally squashed for logistic classifiers."""
+
+    def __init__(self, features, coef, intercept, link='identity'):
+        self.features = list(features)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.link = link
+
+    def predict(self, X):
+        raw = X @ self.coef + self.intercept
+        return _sigmoid(raw) if self.link == 'logistic' else raw
+
+
+class TreeEnsemble:
+    """Evaluates a LightGBM text model with every tree traversed in lockstep.
+
+    All trees are flattened into one node table. Internal node pointers are
+    non-negative, leaf pointers are stored as -(leaf index) - 1, so a single
+    (rows x trees) state array walks every tree one level per iteration.
+    """
+
+    def __init__(self, features, split_feature, threshold, decision_type,
+                 left, right, leaf_value, roots, objective, average_output=False):
+        self.features = list(features)
+        self.split_feature = split_feature
+        self.threshold = threshold
+        self.default_left = ((decision_type >> 1) & 1).astype(bool)
+        self.missing_type = (decision_type >> 2) & 3
+        self.left = left
+        self.right = right
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.objective = objective
+        self.average_output = average_output
+
+    @classmethod
+    def from_text(cls, text):
+        """Parses the output of Booster.model_to_string()."""
+        header, trees = {}, []
+        current = None
+        for line in text.splitlines():
+            line = line.strip()
+            if line == 'end of trees':
+                break
+            if line.startswith('Tree='):
+                current = {}
+                trees.append(current)
+            elif line == 'average_output' and current is None:
+                header['average_output'] = True
+            elif '=' in line:
+                key, value = line.split('=', 1)
+                (current if current is not None else header)[key] = value
+
+        if int(header.get('num_class', 1)) != 1:
+            raise NotImplementedError("multiclass boosters are not supported by the fast path")
+
+        split_feature, threshold, decision_type, left, right, leaf_value, roots = [], [], [], [], [], [], []
+        node_offset = leaf_offset = 0
+
+        def pointer(child, node_base, leaf_base):
+            return np.where(child >= 0, child + node_base, -(leaf_base + ~child) - 1)
+
+        for tree in trees:
+            if int(tree.get('num_cat', 0)) > 0 or tree.get('is_linear', '0') == '1':
+                raise NotImplementedError("categorical splits and linear trees are not supported by the fast path")
+            leaves = np.array(tree['leaf_value'].split(), dtype=np.float64)
+            if int(tree['num_leaves']) == 1:
+                roots.append(-leaf_offset - 1)
+            else:
+                roots.append(node_offset)
+                split_feature.append(np.array(tree['split_feature'].split(), dtype=np.int64))
+                threshold.append(np.array(tree['threshold'].split(), dtype=np.float64))
+                decision_type.append(np.array(tree['decision_type'].split(), dtype=np.int64))
+                left.append(pointer(np.array(tree['left_child'].split(), dtype=np.int64), node_offset, leaf_offset))
+                right.append(pointer(np.array(tree['right_child'].split(), dtype=np.int64), node_offset, leaf_offset))
+                node_offset += len(split_feature[-1])
+            leaf_value.append(leaves)
+            leaf_offset += len(leaves)
+
+        def stack(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+        return cls(features=header['feature_names'].split(),
+                   split_feature=stack(split_feature, np.int64),
+                   threshold=stack(threshold, np.float64),
+                   decision_type=stack(decision_type, np.int64),
+                   left=stack(left, np.int64),
+                   right=stack(right, np.int64),
+                   leaf_value=stack(leaf_value, np.float64),
+                   roots=np.array(roots, dtype=np.int64),
+                   objective=header.get('objective', 'regression'),
+                   average_output=header.get('average_output', False))
+
+    def raw_score(self, X):
+        n_rows = X.shape[0]
+        state = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        rows = np.broadcast_to(np.arange(n_rows)[:, None], state.shape)
+
+        active = state >= 0
+        while active.any():
+            node = state[active]
+            value = X[rows[active], self.split_feature[node]].astype(np.float64)
+            missing_type = self.missing_type[node]
+
+            is_nan = np.isnan(value)
+            value = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, value)
+            use_default = (((missing_type == MISSING_ZERO) & (np.abs(value) <= K_ZERO_THRESHOLD))
+                           | ((missing_type == MISSING_NAN) & is_nan))
+            go_left = np.where(use_default, self.default_left[node], value <= self.threshold[node])
+
+            state[active] = np.where(go_left, self.left[node], self.right[node])
+            active = state >= 0
+
+        scores = self.leaf_value[-state - 1].sum(axis=1)
+        return scores / len(self.roots) if self.average_output else scores
+
+    def predict(self, X):
+        raw = self.raw_score(X)
+        if self.objective.startswith('binary'):
+            scale = 1.0
+            for part in self.objective.split()[1:]:
+                if part.startswith('sigmoid:'):
+                    scale = float(part.split(':')[1])
+            return _sigmoid(scale * raw)
+        return raw
+
+
+def _load_model(spec, export_dir):
+    if spec['type'] == 'linear':
+        return LinearModel(spec['features'], spec['coef'], spec['intercept'], spec.get('link', 'identity'))
+    with open(os.path.join(export_dir, spec['file'])) as file:
+        model = TreeEnsemble.from_text(file.read())
+    # LightGBM sanitizes names in the dump, keep the names the pickles were fit with
+    model.features = list(spec['features'])
+    return model
+
+
+class FastModels:
+    """All exported categories, loaded from an export directory's manifest.json."""
+
+    def __init__(self, export_dir):
+        with open(os.path.join(export_dir, 'manifest.json')) as file:
+            self.manifest = json.load(file)
+        self.categories = {}
+        for category, spec in self.manifest['categories'].items():
+            self.categories[category] = {
+                'base': {name: _load_model(model_spec, export_dir) for name, model_spec in spec['base'].items()},
+                'meta_coef': np.asarray(spec['meta_coef'], dtype=np.float64),
+                'classifier': _load_model(spec['classifier'], export_dir),
+                'Over_Threshold': spec['Over_Threshold'],
+                'Under_Threshold': spec['Under_Threshold'],
+                'line': spec['line'],
+            }
+
+    def base_predictions(self, category, frame):
+        """Returns {'{category}_{model}': predictions} for every exported base model.
+
+        Rows with a gap in a model's features get NaN, as the pickled path leaves them.
+        """
+        predictions = {}
+        for name, model in self.categories[category]['base'].items():
+            X = feature_matrix(frame, model.features)
+            preds = np.asarray(model.predict(X), dtype=np.float64)
+            preds[np.isnan(X).any(axis=1)] = np.nan
+            predictions[f'{category}_{name}'] = preds
+        return predictions
+
+    def score(self, category, frame):
+        """Runs base models -> ensemble -> classifier, mirroring models.scoring.score_frame.
+
+        Args:
+            category (str): Stat category, e.g. 'pts'.
+            frame: DataFrame or dict of columns holding features and the line column.
+
+        Returns:
+            dict: Prediction arrays keyed like score_frame's output columns.
+        """
+        spec = self.categories[category]
+        scored = self.base_predictions(category, frame)
+        coef_linear, coef_lightgbm = spec['meta_coef']
+        scored[f'{category}_ensemble'] = (scored[f'{category}_linear_model'] * coef_linear
+                                          + scored[f'{category}_lightgbm'] * coef_lightgbm)
+        scored[f'{category}_delta'] = scored[f'{category}_ensemble'] - np.asarray(frame[spec['line']], dtype=np.float64)
+
+        classifier = spec['classifier']
+        columns = {f: (scored[f] if f in scored else frame[f] if f in frame else np.zeros(len(scored[f'{category}_delta'])))
+                   for f in classifier.features}
+        X = feature_matrix(columns, classifier.features)
+        proba = np.asarray(classifier.predict(X), dtype=np.float64)
+        # Incomplete rows stay unscored, like score_frame
+        missing = np.isnan(X).any(axis=1)
+        proba[missing] = np.nan
+        scored['proba'] = proba
+        recommendation = np.where(proba > spec['Over_Threshold'], 'Over',
+                                  np.where(proba < spec['Under_Threshold'], 'Under', 'No Bet Recommendation'))
+        scored['recommendation'] = np.where(missing, None, recommendation)
+        return scored
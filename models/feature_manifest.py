@@ -0,0 +1,115 @@
+"""Derives the columns inference needs from the loaded models.
+
+recent_player_data used to pull every column of clean_player_data and
+clean_team_data and then drop whatever had gaps. The manifest built here
+lists exactly the features the base models and classifier consume, maps each
+one back to its source table, and generates narrow queries for them.
+"""
+
+from models.scoring import SKIPPED_MODELS
+
+
+PLAYER_TABLE = 'clean_player_data'
+TEAM_TABLE = 'clean_team_data'
+
+# Columns the merges and odds matching rely on, whether or not a model uses them
+PLAYER_KEYS = ['player_id', 'player', 'game_date']
+TEAM_KEYS = ['team_id']
+
+
+def model_features(bundles):
+    """Returns every input feature named by models.pkl and classification_models.pkl."""
+    features = set()
+    for category_models in bundles['models'].values():
+        for model_name, model in category_models.items():
+            if model_name.lower() not in SKIPPED_MODELS:
+                features.update(f.strip() for f in model.feature_names_in_)
+    for model_dict in bundles['classification_models'].values():
+        features.update(f.strip() for f in model_dict['Fitted_Model'].feature_names_in_)
+    return features
+
+
+def table_columns(conn, tables=(PLAYER_TABLE, TEAM_TABLE)):
+    """Reads the column names of the feature tables from information_schema."""
+    columns = conn.query(
+        """
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_name = ANY(%s)
+        """, params=(list(tables),))
+    return {table: set(columns.loc[columns['table_name'] == table, 'column_name']) for table in tables}
+
+
+def resolve_features(features, player_columns, team_columns):
+    """Maps each model feature to the table column it is built from.
+
+    The names follow the merges in recent_player_data: player columns keep their
+    name, team columns keep theirs unless they collide with a player column
+    ('_remove'), and opponent columns end in '_opponent'.
+
+    Returns:
+        dict: 'player' list of columns, 'team' and 'opponent' dicts of
+        {source column: feature name}, and 'unresolved' features (scoring outputs,
+        odds columns or anything the tables do not have).
+    """
+    manifest = {'player': set(PLAYER_KEYS), 'team': {}, 'opponent': {}, 'unresolved': []}
+    for feature in sorted(features):
+        if feature in player_columns:
+            manifest['player'].add(feature)
+        elif feature.endswith('_opponent') and feature[:-len('_opponent')] in team_columns:
+            manifest['opponent'][feature[:-len('_opponent')]] = feature
+        elif feature in team_columns:
+            manifest['team'][feature] = feature
+        elif feature.endswith('_remove') and feature[:-len('_remove')] in team_columns:
+            manifest['team'][feature[:-len('_remove')]] = feature
+        else:
+            manifest['unresolved'].append(feature)
+    manifest['player'] = sorted(manifest['player'])
+    return manifest
+
+
+def _select_list(columns):
+    return ',\n                '.join(f'"{col}"' for col in columns)
+
+
+def build_queries(manifest):
+    """Builds the latest-game queries selecting only manifest columns.
+
+    Both queries take two bound parameters: a Python list of ids (sent as a
+    Postgres array for ``= ANY``) and the season start year.
+    """
+    team_columns = sorted(set(TEAM_KEYS) | set(manifest['team']) | set(manifest['opponent']))
+    return {
+        "player_data": f"""
+        WITH RankedGames AS (
+            SELECT {_select_list(manifest['player'])},
+                ROW_NUMBER() OVER (PARTITION BY player ORDER BY game_date DESC) AS game_rank
+            FROM {PLAYER_TABLE}
+            WHERE player_id = ANY(%s)
+            AND season_start_year = %s
+        )
+        SELECT *
+        FROM RankedGames
+        where game_rank = 1;
+    """,
+        "team_data": f"""
+        WITH RankedGames AS (
+            SELECT {_select_list(team_columns)},
+                ROW_NUMBER() OVER (PARTITION BY team_id ORDER BY game_date DESC) AS game_rank
+            FROM {TEAM_TABLE}
+            WHERE team_id = ANY(%s)
+            AND season_start_year = %s
+        )
+        SELECT *
+        FROM RankedGames
+        where game_rank = 1;
+    """}
+
+
+def build_manifest(bundles, conn):
+    """Builds the manifest for the loaded models against the live table columns."""
+    columns = table_columns(conn)
+    manifest = resolve_features(model_features(bundles), columns[PLAYER_TABLE], columns[TEAM_TABLE])
+    print(f"feature manifest: {len(manifest['player'])} player, {len(manifest['team'])} team, "
+          f"{len(manifest['opponent'])} opponent columns; computed at scoring time: {manifest['unresolved']}")
+    return manifest
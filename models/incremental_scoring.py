@@ -0,0 +1,201 @@
+"""Re-scores only the players whose line moved, against features kept in memory.
+
+The base models and the meta-model ensemble do not depend on the betting line,
+so for a slate they are computed once: each player's latest feature row, base
+predictions and ensemble are packed into the classifier's feature matrix when
+the scorer is built. A line move then only rewrites the line-dependent columns
+of the moved players' rows (the line, {cat}_delta and the Over/Under prices),
+runs the classifier over those rows and maps the probability to a
+recommendation with the market's thresholds. The re-scored rows replace the
+players' rows for that day in {cat}_classifications in one transaction.
+
+    scorer = IncrementalScorer(lowest_data)     # predict_games' latest rows
+    scorer.apply(boards)                        # parse_markets / gather_odds boards
+
+scraping_data/odds_poller.py --rescore feeds every refreshed board through
+apply(), so a move is scored and stored within one poll.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from models.model_store import get_store
+from models.model_utils import quote_ident
+from models.scoring import (MARKETS, CATEGORY_LINES, classification_columns, classifier_features,
+                            ensemble_prediction, normalize_american_odds, recommend)
+from scraping_data.schema import apply_schema
+
+
+# Line-dependent columns of the classifier features, beside the line itself
+PRICE_COLUMNS = ['Over', 'Under']
+
+
+class MarketState:
+    """One category's classifier matrix, a row per player, with the line columns left to fill."""
+
+    def __init__(self, category, latest_rows, meta_models, model_dict):
+        line = CATEGORY_LINES[category]
+        rows = latest_rows.drop_duplicates(subset='player', keep='last').reset_index(drop=True)
+        ensemble = ensemble_prediction(meta_models, category, rows[f'{category}_linear_model'],
+                                       rows[f'{category}_lightgbm'])
+        frame = rows.assign(**{f'{category}_ensemble': ensemble})
+
+        self.category = category
+        self.line = line
+        self.classifier = model_dict['Fitted_Model']
+        self.threshold_over = model_dict['Over_Threshold']
+        self.threshold_under = model_dict['Under_Threshold']
+        columns = list(self.classifier.feature_names_in_)
+        # Position of each line-dependent column the classifier reads, if it reads it
+        self.columns = {col: columns.index(col) for col in [line, f'{category}_delta'] + PRICE_COLUMNS
+                        if col in columns}
+
+        features = classifier_features(model_dict, frame).to_numpy()
+        ensemble = ensemble.to_numpy(dtype=float)
+        # Players with feature gaps cannot be scored on any line; the line columns are filled per move
+        fixed = [i for i in range(len(columns)) if i not in self.columns.values()]
+        complete = ~np.isnan(features[:, fixed]).any(axis=1) & ~np.isnan(ensemble)
+        if not complete.all():
+            print(f"{category}: leaving out {int((~complete).sum())} players with incomplete features: "
+                  f"{', '.join(rows.loc[~complete, 'player'].astype(str))}")
+        self.players = {player: i for i, player in enumerate(rows.loc[complete, 'player'].astype(str))}
+        self.ensemble = ensemble[complete]
+        self.features = features[complete]
+
+    def score(self, board):
+        """Classifier probability and recommendation for board rows of known players.
+
+        Args:
+            board (pd.DataFrame): Rows with 'Player', the line column and numeric Over/Under.
+
+        Returns:
+            pd.DataFrame: The rows as {cat}_classifications stores them, plus {cat}_delta.
+        """
+        lines = pd.to_numeric(board[self.line], errors='coerce')
+        known = board[board['Player'].astype(str).isin(self.players) & lines.notna()]
+        rows = known['Player'].astype(str).map(self.players).to_numpy()
+        lines = lines[known.index].to_numpy(dtype=float)
+        delta = self.ensemble[rows] - lines
+
+        X = self.features[rows]
+        values = {self.line: lines, f'{self.category}_delta': delta,
+                  **{col: known[col].to_numpy(dtype=float) for col in PRICE_COLUMNS}}
+        for col, position in self.columns.items():
+            X[:, position] = values[col]
+        proba = self.classifier.predict_proba(X)[:, 1] if len(X) else np.empty(0)
+
+        scored = known[['Player', self.line, 'Over', 'Under', 'Date_Updated']].rename(columns={'Player': 'player'})
+        scored['proba'] = proba
+        scored['recommendation'] = recommend(proba, self.threshold_over, self.threshold_under)
+        scored = scored[classification_columns(self.category)]
+        scored[f'{self.category}_delta'] = delta
+        return scored.reset_index(drop=True)
+
+
+class IncrementalScorer:
+    """Keeps a slate's line-independent predictions and re-scores players as their lines move.
+
+    Args:
+        lowest_data (dict): {category: latest feature rows with base predictions}, as
+            predict_games returns them.
+        bundles (dict, optional): Loaded model bundles; the ./models store by default.
+        conn (optional): PSQL connection for the upserts; predict_new_games' shared one by default.
+    """
+
+    def __init__(self, lowest_data, bundles=None, conn=None):
+        bundles = bundles or get_store(f'{os.getcwd()}/models').get()
+        self.conn = conn
+        self.markets = {}
+        for category, rows in lowest_data.items():
+            base = [f'{category}_linear_model', f'{category}_lightgbm']
+            if category not in bundles['meta_model'] or category not in bundles['classification_models']:
+                print(f"Skipping {category}: no meta-model or classifier.")
+                continue
+            if not set(base) <= set(rows.columns):
+                print(f"Skipping {category} due to missing model cols.")
+                continue
+            self.markets[category] = MarketState(category, rows, bundles['meta_model'],
+                                                 bundles['classification_models'][category])
+        # {category: {player: rows of (line, Over, Under) last scored}}
+        self.lines = {category: {} for category in self.markets}
+
+    @classmethod
+    def for_slate(cls, full_data, categories, bundles=None, conn=None):
+        """Builds the scorer from recent_player_data's feature rows, running the base models once."""
+        from models.predict_new_games import latest_predictions
+
+        bundles = bundles or get_store(f'{os.getcwd()}/models').get()
+        categories = [category for category in categories if category in bundles['models']]
+        latest_rows = latest_predictions(bundles['models'], full_data, categories)
+        return cls({category: latest_rows for category in categories}, bundles, conn)
+
+    def moved(self, category, board):
+        """Board rows of players whose lines or prices differ from the ones last scored."""
+        line = CATEGORY_LINES[category]
+        seen = self.lines[category]
+        players = board['Player'].astype(str).to_numpy()
+        # A plain pass over the columns; a groupby per board costs more than the scoring
+        current = {}
+        for player, quote in zip(players, zip(board[line].to_numpy(), board['Over'].to_numpy(),
+                                              board['Under'].to_numpy())):
+            current.setdefault(player, []).append(quote)
+        changed = {player: tuple(sorted(quotes)) for player, quotes in current.items()
+                   if seen.get(player) != tuple(sorted(quotes))}
+        return board[[player in changed for player in players]], changed
+
+    def apply(self, boards, upsert=True):
+        """Scores the moved players of each board and writes them to {cat}_classifications.
+
+        Args:
+            boards (dict): {line column: odds board}, e.g. parse_markets' output.
+            upsert (bool): Write the re-scored rows; False only returns them.
+
+        Returns:
+            dict: {category: re-scored rows}, empty frames where nothing moved.
+        """
+        rescored = {}
+        for key, board in boards.items():
+            category = MARKETS.get(key)
+            if category not in self.markets or board is None or board.empty:
+                continue
+            start = time.perf_counter()
+            board = normalize_american_odds(board.copy())
+            board[key] = pd.to_numeric(board[key], errors='coerce')
+            moved, quotes = self.moved(category, board)
+            scored = self.markets[category].score(moved)
+            if upsert and not scored.empty:
+                self.upsert(category, scored)
+            self.lines[category].update(quotes)
+            rescored[category] = scored
+            if len(moved):
+                print(f"{category}: re-scored {len(scored)} rows for {len(quotes)} moved players "
+                      f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return rescored
+
+    def upsert(self, category, scored):
+        """Replaces the scored players' rows for the day in {cat}_classifications."""
+        if self.conn is None:
+            from models.predict_new_games import get_conn
+
+            self.conn = get_conn()
+        table_name = f'{category}_classifications'
+        # The full row classification() writes, typed like its upload (proba is a real
+        # column); no stage, so moves do not pile up in the memory report
+        rows = apply_schema(scored[classification_columns(category)])
+        self.conn.ensure_table(rows, table_name)
+        days = sorted({day.isoformat() for day in pd.to_datetime(rows['Date_Updated']).dt.date})
+        cur = self.conn.connect.cursor()
+        try:
+            # upload_data commits the DELETE together with the new rows
+            cur.execute(f"DELETE FROM {quote_ident(table_name)} "
+                        "WHERE player = ANY(%s) AND date_updated::date = ANY(%s::date[])",
+                        (sorted(set(rows['player'])), days))
+            self.conn.upload_data(rows, table_name)
+        except Exception:
+            self.conn.connect.rollback()
+            raise
+        finally:
+            cur.close()
@@ -0,0 +1,128 @@
+"""Long-running local inference service that keeps the model bundles warm.
+
+Start it once per day (or under a process supervisor):
+
+    python -m models.inference_server --port 8765
+
+and send batched requests:
+
+    POST /predict {"category": "pts", "rows": [{<features>, "points": 24.5}, ...]}
+    GET  /health
+
+Pickles (and the --fast-dir export) are hot-reloaded when they change on disk, so a
+retrain or re-export does not need a restart.
+"""
+
+import argparse
+import json
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from models.model_store import FastModelStore, ModelStore
+from models.scoring import score_frame
+
+
+def _to_records(df):
+    # JSON has no NaN, send nulls instead
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def make_handler(store, fast=None):
+    """Builds a request handler bound to a model store (or a FastModelStore of exported models)."""
+
+    class InferenceHandler(BaseHTTPRequestHandler):
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/health':
+                self._send(404, {'error': f'unknown path {self.path}'})
+                return
+            self._send(200, {'status': 'ok', 'model_dir': store.model_dir,
+                             'version': (store.version or {}).get('version'),
+                             'models': {name: mtime for name, (mtime, _) in store.signature.items()}})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send(404, {'error': f'unknown path {self.path}'})
+                return
+            start = time.perf_counter()
+            try:
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                frame = pd.DataFrame(request['rows'])
+                category = request.get('category', 'pts')
+                if fast is not None:
+                    scored = pd.DataFrame(fast.get().score(category, frame), index=frame.index)
+                else:
+                    scored = score_frame(store.get(), category, frame)
+            except Exception as e:
+                self._send(400, {'error': str(e)})
+                return
+            self._send(200, {'predictions': _to_records(scored),
+                             'elapsed_ms': (time.perf_counter() - start) * 1000})
+
+        def log_message(self, format, *args):
+            print(f"inference server: {format % args}")
+
+    return InferenceHandler
+
+
+def serve(host='127.0.0.1', port=8765, model_dir=None, reload_interval=2.0, fast_dir=None):
+    """Loads the models once and serves predict requests until interrupted."""
+    store = ModelStore(model_dir)
+    store.load()
+    store.watch(reload_interval)
+    fast = None
+    if fast_dir:
+        fast = FastModelStore(fast_dir)
+        fast.load()
+        fast.watch(reload_interval)
+
+    server = ThreadingHTTPServer((host, port), make_handler(store, fast))
+    print(f"inference server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def request_predictions(rows, category='pts', url='http://127.0.0.1:8765'):
+    """Sends a batch of feature rows to a running inference server.
+
+    Args:
+        rows (pd.DataFrame): Feature rows including the betting line column.
+        category (str): Stat category, e.g. 'pts'.
+        url (str): Base URL of the server.
+
+    Returns:
+        pd.DataFrame: Scored rows aligned to the input order.
+    """
+    payload = json.dumps({'category': category, 'rows': _to_records(rows)}, default=str).encode()
+    request = urllib.request.Request(f'{url}/predict', data=payload,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        result = json.loads(response.read())
+    return pd.DataFrame(result['predictions'], index=rows.index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve warm model predictions over local HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model-dir', default=None)
+    parser.add_argument('--reload-interval', type=float, default=2.0)
+    parser.add_argument('--fast-dir', default=None, help="Score with models exported by models.export_models")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.model_dir, args.reload_interval, args.fast_dir)
@@ -0,0 +1,197 @@
+"""Loads the model pickles once and reloads them when a pickle changes on disk."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import joblib
+
+from models.scoring import SKIPPED_MODELS
+
+
+MODEL_FILES = {
+    'models': 'models.pkl',
+    'meta_model': 'meta_model.pkl',
+    'classification_models': 'classification_models.pkl',
+}
+
+# Written last by models.retrain.publish; records the digest of each pickle it published
+VERSION_FILE = 'model_version.json'
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_version(model_dir):
+    """Returns the published version metadata, or None for hand-placed pickles."""
+    path = os.path.join(model_dir, VERSION_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def check_version(model_dir):
+    """Raises if the pickles on disk are not the set the version file describes (a publish in progress)."""
+    version = read_version(model_dir)
+    if version is None:
+        return None
+    for name, file_name in MODEL_FILES.items():
+        expected = version.get('files', {}).get(file_name)
+        if expected and file_digest(os.path.join(model_dir, file_name)) != expected:
+            raise ValueError(f"{file_name} does not match model version {version['version']}")
+    return version
+
+
+def validate_bundles(bundles):
+    """Checks the loaded bundles expose what inference relies on.
+
+    Args:
+        bundles (dict): Loaded bundles keyed like MODEL_FILES.
+
+    Raises:
+        ValueError: If a model is missing feature names, coefficients or thresholds.
+    """
+    problems = []
+    for category, category_models in bundles['models'].items():
+        for model_name, model in category_models.items():
+            if model_name.lower() in SKIPPED_MODELS:
+                continue
+            if len(getattr(model, 'feature_names_in_', [])) == 0:
+                problems.append(f"models.pkl[{category}][{model_name}] has no feature_names_in_")
+
+    for category, meta in bundles['meta_model'].items():
+        if len(getattr(meta, 'coef_', [])) != 2:
+            problems.append(f"meta_model.pkl[{category}] does not have two ensemble coefficients")
+
+    for category, model_dict in bundles['classification_models'].items():
+        clf = model_dict.get('Fitted_Model')
+        if len(getattr(clf, 'feature_names_in_', [])) == 0:
+            problems.append(f"classification_models.pkl[{category}] has no feature_names_in_")
+        for key in ['Over_Threshold', 'Under_Threshold']:
+            if key not in model_dict:
+                problems.append(f"classification_models.pkl[{category}] is missing {key}")
+
+    if problems:
+        raise ValueError("Invalid model bundles:\n" + "\n".join(problems))
+
+
+class ModelStore:
+    """Holds the three model bundles in memory.
+
+    Args:
+        model_dir (str, optional): Directory holding the pickles. Defaults to ./models.
+        mmap_mode (str, optional): Passed to joblib.load so large arrays are memory-mapped.
+    """
+
+    def __init__(self, model_dir=None, mmap_mode='r'):
+        self.model_dir = model_dir or os.path.join(os.getcwd(), 'models')
+        self.mmap_mode = mmap_mode
+        self.bundles = None
+        self.signature = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _signature(self):
+        signature = {}
+        for name, file_name in MODEL_FILES.items():
+            stat = os.stat(os.path.join(self.model_dir, file_name))
+            signature[name] = (stat.st_mtime_ns, stat.st_size)
+        version_path = os.path.join(self.model_dir, VERSION_FILE)
+        if os.path.exists(version_path):
+            # Same (mtime, size) shape as the pickles, /health reads every entry that way
+            stat = os.stat(version_path)
+            signature['version'] = (stat.st_mtime_ns, stat.st_size)
+        return signature
+
+    def load(self):
+        """Loads and validates every bundle, swapping them in only if all are valid."""
+        signature = self._signature()
+        version = check_version(self.model_dir)
+        bundles = {name: joblib.load(os.path.join(self.model_dir, file_name), mmap_mode=self.mmap_mode)
+                   for name, file_name in MODEL_FILES.items()}
+        validate_bundles(bundles)
+
+        with self.lock:
+            self.bundles = bundles
+            self.signature = signature
+            self.version = version
+        suffix = f" (version {version['version']})" if version else ''
+        print(f"models loaded from {self.model_dir}{suffix}")
+        return bundles
+
+    def changed(self):
+        """Returns True when any pickle differs from the loaded version."""
+        return self.signature != self._signature()
+
+    def reload_if_changed(self):
+        try:
+            if self.changed():
+                self.load()
+                return True
+        except Exception as e:
+            # Keep serving the last good models while a pickle is mid-write or invalid
+            print(f"model reload failed: {e}")
+        return False
+
+    def get(self):
+        """Returns the loaded bundles, loading them on first use."""
+        if self.bundles is None:
+            return self.load()
+        return self.bundles
+
+    def watch(self, interval=2.0):
+        """Starts a daemon thread that hot-reloads the bundles when a pickle changes."""
+        def _poll():
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        thread = threading.Thread(target=_poll, daemon=True, name='model-store-watch')
+        thread.start()
+        return thread
+
+
+class FastModelStore(ModelStore):
+    """Holds the models exported by models.export_models, hot-reloaded like the pickles.
+
+    export_models writes manifest.json after every booster dump, so its (mtime, size)
+    alone marks a finished export; a reload never pairs a new manifest with old dumps.
+
+    Args:
+        export_dir (str): Directory holding manifest.json and the booster dumps.
+    """
+
+    def _signature(self):
+        stat = os.stat(os.path.join(self.model_dir, 'manifest.json'))
+        return {'manifest': (stat.st_mtime_ns, stat.st_size)}
+
+    def load(self):
+        # NumPy-only scoring path, only imported by servers that use it
+        from models.fast_scoring import FastModels
+
+        signature = self._signature()
+        fast = FastModels(self.model_dir)
+        with self.lock:
+            self.bundles = fast
+            self.signature = signature
+        print(f"fast-path models loaded from {self.model_dir} (exported {fast.manifest.get('exported_at')})")
+        return fast
+
+
+_stores = {}
+
+
+def get_store(model_dir=None):
+    """Returns the process-wide store for a model directory."""
+    model_dir = model_dir or os.path.join(os.getcwd(), 'models')
+    if model_dir not in _stores:
+        _stores[model_dir] = ModelStore(model_dir)
+    return _stores[model_dir]
@@ -1,9 +1,10 @@
-import yaml
-import os
 import psycopg2
 import requests
 import pandas as pd
 from io import StringIO
+from scraping_data.schema import apply_schema
+from scraping_data import instrumentation
+from scraping_data.utils import get_config
 # import chromedriver_autoinstaller
 
 
@@ -16,6 +17,7 @@ def establish_requests(url, params=False):
         "Referer": "https://www.nba.com/stats/",
         "Origin": "https://www.nba.com"
     }
+    instrumentation.count_call('http')
     if not params:
         # Send request
         response = requests.get(url, headers=headers)
@@ -26,11 +28,18 @@ def establish_requests(url, params=False):
     return response
 
 
+def quote_ident(name):
+    """A Postgres identifier, lower-cased the way unquoted names fold, then quoted.
+
+    Quoting lets names start with a digit (3pm_classifications, 3pm_linear_model)
+    while still matching the tables created from unquoted names.
+    """
+    return '"' + str(name).lower().replace('"', '""') + '"'
+
+
 class psql:
     def __init__(self):
-        config = os.getcwd()
-        with open('config.yaml', 'r') as file:
-            config = yaml.safe_load(file)
+        config = get_config()
 
         try:
             print("database connection successful")
@@ -50,22 +59,25 @@ class psql:
         dtype_converter = {
             "int64": "bigint",
             "int32": "integer",
+            "int16": "smallint",
             "float64": "double precision",
             "float32": "real",
             "bool": "boolean",
             "boolean": "boolean",
             "object": "text",
             "string": "text",
+            "category": "text",
             "datetime64[ns]": "timestamp",
+            "datetime64[us]": "timestamp",
             "datetime64[ns, utc]": "timestamptz",
         }
         d = ([(col, dtype_converter[str(table[col].dtype)])
              for col in list(table.columns)])
 
-        cols = ',\n'.join([f'\t{col} {typ}' for col, typ in d])
+        cols = ',\n'.join([f'\t{quote_ident(col)} {typ}' for col, typ in d])
 
         query = f"""
-        create table {table_name}(
+        create table {quote_ident(table_name)}(
         {cols}
         );
         """
@@ -79,29 +91,40 @@ class psql:
         if cur is None:
             return
 
-        buffer = StringIO()
+        with instrumentation.stage(f'upload:{table_name}', rows_in=len(table)) as record:
+            buffer = StringIO()
 
-        table.to_csv(buffer, index=False, header=False)
+            table.to_csv(buffer, index=False, header=False)
 
-        buffer.seek(0)
+            buffer.seek(0)
 
-        cols = ',\n'.join([f'\t{col}' for col in table.columns])
+            cols = ',\n'.join([f'\t{quote_ident(col)}' for col in table.columns])
 
-        cur.copy_expert(
-                f"""copy {table_name}
-                ({cols})
-                from stdin with (format csv)""", buffer)
+            instrumentation.count_call('db')
+            cur.copy_expert(
+                    f"""copy {quote_ident(table_name)}
+                    ({cols})
+                    from stdin with (format csv)""", buffer)
 
-        self.connect.commit()
+            self.connect.commit()
+            record['rows_out'] = len(table)
+
+    def ensure_table(self, table, table_name):
+        """Creates table_name from the frame's columns and dtypes if it does not exist yet."""
+        exists = self.query("SELECT to_regclass(%s) IS NOT NULL AS present", (quote_ident(table_name),))
+        if not bool(exists['present'].iloc[0]):
+            print(f"creating {table_name}")
+            self.create_table(table, table_name)
 
-    def query(self, query):
+    def query(self, query, params=None, stage=None):
         cur = self.connect.cursor()
 
-        cur.execute(query)
+        instrumentation.count_call('db')
+        cur.execute(query, params)
         columns = [desc[0] for desc in cur.description]
         data = pd.DataFrame(cur.fetchall(), columns=columns)
 
-        return data
+        return apply_schema(data, stage)
 
     def close(self):
 
@@ -1,190 +1,159 @@
-from google.oauth2 import service_account
 from datetime import datetime as date
 from models import model_utils
-import joblib
+from models.model_store import get_store
+from models.feature_manifest import build_manifest, build_queries
+from models.scoring import (MARKETS, CATEGORY_LINES, batch_base_predictions, market_ensemble, classify,
+                            classification_columns, recommend, merge_predictions, normalize_american_odds)
+from scraping_data.schema import apply_schema, memory_report
+from scraping_data.instrumentation import instrumented
+import numpy as np
 import pandas as pd
 import os
 
 current_wd = os.getcwd()
 print(current_wd)
-#Connect to PSQL
-conn = model_utils.psql()
+# PSQL connection, opened on first use so importing this module stays cheap
+conn = None
 
 
+def get_conn():
+    """Returns the shared PSQL connection, connecting on first call."""
+    global conn
+    if conn is None:
+        conn = model_utils.psql()
+    return conn
+
+
+def close_conn():
+    global conn
+    if conn is not None:
+        conn.close()
+        conn = None
+
+
+@instrumented()
 def recent_player_data(odds_data, games):
-    """Fetches recent player, team, and opponent data from BigQuery."""
+    """Fetches the latest player, team, and opponent features the models need from Postgres.
+
+    Args:
+        odds_data: Passed through unchanged.
+        games (pd.DataFrame): Tonight's players with integer player_id, team_id and
+            opponent, as scraping_data.roster_cache.get_roster resolves them.
+    """
     print("Fetching recent player, team, and opponent data...")
 
     today = date.today()
     season =int(today.year if today.month >= 10 else today.year - 1)
 
-    filtered_players = tuple(games['player_id'])
-    teams = tuple(set(games['team_id']))
+    filtered_players = [int(player_id) for player_id in pd.unique(games['player_id'])]
+    teams = [int(team_id) for team_id in pd.unique(pd.concat([games['team_id'], games['opponent']]))]
 
     print(f'player length:{len(filtered_players)}')
     print(f'team length: {len(teams)}')
     if not filtered_players:
         print("No valid players found.")
         return None, None
-    queries = {
-        "player_data": f"""
-        WITH RankedGames AS (
-            SELECT *,
-                ROW_NUMBER() OVER (PARTITION BY player ORDER BY game_date DESC) AS game_rank
-            FROM clean_player_data
-            WHERE player_id IN {filtered_players}
-            AND season_start_year = '{season}'
-        )
-        SELECT *
-        FROM RankedGames
-        where game_rank = 1;
-    """,
-        "team_data": f"""
-        WITH RankedGames AS (
-            SELECT *,
-                ROW_NUMBER() OVER (PARTITION BY team ORDER BY game_date DESC) AS game_rank
-            FROM clean_team_data
-            WHERE team_id IN {teams}
-            AND season_start_year = '{season}'
-        )
-        SELECT *
-        FROM RankedGames
-        where game_rank = 1;
-    """}
+
+    # Only select the columns the loaded models consume
+    manifest = build_manifest(get_store(f'{current_wd}/models').get(), get_conn())
+    queries = build_queries(manifest)
 
     # Fetch player, opponent, and team data
-    player_data, team_data = [conn.query(queries[q]) for q in queries]
+    player_data = get_conn().query(queries['player_data'], params=(filtered_players, str(season)), stage='player_data')
+    team_data = get_conn().query(queries['team_data'], params=(teams, str(season)), stage='team_data')
 
     print('queries complete')
-    # Standardize player names in player_data
-    print('cleaning names')
-    len(f'player_data length: {player_data}')
-    len(f'team_data length:{team_data}')
-
-    team_data_1 = team_data.copy()
-
-    team_data_1.rename(columns={'team_id':'opponent'},inplace=True)
 
-    # print(player_data)
-    # print(team_data)
-    # print(team_data_1)
+    team_features = team_data[['team_id'] + list(manifest['team'])].rename(columns=manifest['team'])
+    opponent_features = (team_data[['team_id'] + list(manifest['opponent'])]
+                         .rename(columns={'team_id': 'opponent', **manifest['opponent']}))
 
     pd.set_option('display.max_rows', None)  # Show all rows
     pd.set_option('display.max_columns', None)  # Show all columns
     pd.set_option('display.expand_frame_repr', False)
     # Merge datasets while keeping only necessary columns
-    full_data = (player_data.merge(games, on="player_id", how="inner",
+    full_data = (player_data.drop(columns='game_rank').merge(games, on="player_id", how="inner",
                  suffixes=("", "_remove")))
-    full_data = full_data.merge(team_data, on = 'team_id', how = 'left',
-                suffixes = ("", "_remove"))
-    full_data = full_data.merge(team_data_1, on= 'opponent', how = 'left',suffixes = ("","_opponent"))
+    full_data = full_data.merge(team_features, on='team_id', how='left')
+    full_data = full_data.merge(opponent_features, on='opponent', how='left')
 
     print('print full data post merge', len(full_data['player'].unique()))
-    # Drop duplicate or unnecessary columns
+    print(f'merge width: {full_data.shape[1]} columns')
 
-    full_data.dropna(axis=1, inplace=True)
+    # Report gaps instead of dropping columns, a dropped column silently disables a model
+    required = set(manifest['player']) | set(manifest['team'].values()) | set(manifest['opponent'].values())
+    gaps = full_data[sorted(required & set(full_data.columns))].isna().sum()
+    if gaps.any():
+        print(f"Feature gaps (rows missing a value): {gaps[gaps > 0].to_dict()}")
+
+    full_data = apply_schema(full_data, 'full_data')
     print(full_data['player'])
     return full_data, odds_data
 
 
-def predict_games(full_data, odds_raw):
-    """Predicts NBA player stats using pre-trained models and compares with betting odds."""
+def latest_predictions(models, full_data, categories, max_workers=None):
+    """Each player's most recent feature row with every category's base model predictions joined on."""
+    # Ensure chronological order for calculations
+    data_ordered = full_data.sort_values(by=['player', 'game_date'])
+    latest_rows = data_ordered.groupby('player', as_index=False, observed=True).tail(1)
+
+    # One batched pass of every market's base models over the shared matrix
+    return latest_rows.join(batch_base_predictions(models, categories, latest_rows, max_workers=max_workers))
+
+
+@instrumented()
+def predict_games(full_data, odds_raw, max_workers=None):
+    """Predicts NBA player stats for every prop market using pre-trained models and compares with betting odds.
+
+    Args:
+        full_data (pd.DataFrame): Feature rows from recent_player_data.
+        odds_raw (dict or pd.DataFrame): Odds boards keyed by line column ('points',
+            'rebounds', ...). A single frame is treated as the points board.
+        max_workers (int, optional): Threads for the batched base-model pass.
+
+    Returns:
+        tuple: (latest feature rows, odds boards with predictions), both keyed by category.
+    """
     print('loading models...')
-    # Load models
-    # models = joblib.load('/home/aportra99/nba-bet/models/models.pkl')
-    full_data = full_data
-    odds_data = {'points':odds_raw}
+    odds_data = odds_raw if isinstance(odds_raw, dict) else {'points': odds_raw}
     odds = {}
     lowest_data = {}
-    print(odds_data['points'])
     print(current_wd)
-    models = joblib.load(f'{current_wd}/models/models.pkl')
-    for key, odds_df in odds_data.items():
-        # Filter relevant players
-        data_ordered = full_data[full_data['player'].isin(odds_df['Player'])].copy()
+    models = get_store(f'{current_wd}/models').get()['models']
 
-        print(f"Filtered {len(data_ordered)} players for {key} predictions.")
-        # Players in odds_df that are not in full_data
-        players_not_in_full_data = set(odds_df['Player']) - set(full_data['player'])
+    markets = {}
+    for key in odds_data:
+        category = MARKETS.get(key)
+        if category in models:
+            markets[key] = category
+        else:
+            print(f"Skipping {key}: no trained models for category {category}")
+    if not markets:
+        return lowest_data, odds
 
-        # Players in odds_df that are not in data_ordered
-        players_not_in_data_ordered = set(odds_df['Player']) - set(data_ordered['player'])
+    # Build the feature matrix once for every player on any board
+    board_players = set().union(*[set(odds_data[key]['Player']) for key in markets])
+    data_ordered = full_data[full_data['player'].isin(board_players)].copy()
 
-        # Display results
-        print("Players in odds_df but not in full_data:", players_not_in_full_data)
-        print("Players in odds_df but not in data_ordered:", players_not_in_data_ordered)
+    print(f"Filtered {len(data_ordered)} players for {list(markets)} predictions.")
+    print("Players on the boards but not in full_data:", board_players - set(full_data['player']))
 
+    latest_rows = latest_predictions(models, data_ordered, list(markets.values()), max_workers)
 
-        # Ensure chronological order for calculations
-        data_ordered.sort_values(by=['player', 'game_date'], inplace=True)
+    for key, category in markets.items():
+        # Convert betting odds to numeric values (once, classification reuses them)
+        odds_df = normalize_american_odds(odds_data[key])
 
-        latest_rows = data_ordered.groupby('player', as_index=False).tail(1)
-        # Load Google Cloud credentials
-        try:
-            credentials = service_account.Credentials.from_service_account_file('/home/aportra99/scraping_key.json')
-            local = False
-        except FileNotFoundError:
-            print("File not found, running in local mode.")
-            local = True
-            credentials = None
-
-        # Determine category for prediction
-        category_mapping = {
-            "points": "pts"
-        }
-        category = category_mapping[key]
-
-        # Run predictions using trained models
-        for model_name, model in models[category].items():
-            print(category)
-            print(model_name)
-            if model_name.lower() not in ["xgboost", "sarimax", "mlp", "random_forest"]:
-                features = [f.strip() for f in model.feature_names_in_]
-
-                if set(features).issubset(latest_rows.columns):
-                    latest_rows[f'{category}_{model_name}'] = model.predict(latest_rows[features])
-                else:
-                    missing = set(features) - set(latest_rows.columns)
-                    print(f"Skipping {model_name} for {category}: Missing features: {missing}")
-
-
-        # Convert betting odds to numeric values
-        for col in ['Over', 'Under']:
-            odds_df[col] = pd.to_numeric(
-                odds_df[col].astype(str).str.replace('−', '-', regex=False).str.replace('+', '', regex=False),
-                errors='coerce'
-            ).fillna(0).astype(int)
-        # Merge predictions with odds data
-        for idx, row in odds_df.iterrows():
-            player_name = row['Player']
-            matching_rows = latest_rows[latest_rows['player'] == player_name]
-
-            if not matching_rows.empty:
-                for model_name in models[category]:
-                    if model_name not in ['lightgbm', 'linear_model']:
-                        continue
-
-                    col_name = f'{category}_{model_name}'
-                    if col_name in matching_rows.columns:
-                        print('0',matching_rows[col_name].values[0],matching_rows['game_date'].values[0],matching_rows['player'].values[0])
-                        prediction_value = matching_rows[col_name].values[0]
-                        print(col_name)
-                        odds_df.at[idx, col_name] = prediction_value
-
-                        # Determine betting recommendation
-                        actual_value = float(row[key])
-                        recommendation = 'Over' if prediction_value > actual_value else 'Under'
-                        odds_df.at[idx, f'recommendation_{category}_{model_name}'] = recommendation
-                    else:
-                        print(f"Missing column {col_name} for {player_name} in {category}")
-            else:
-                print(f"Warning: No match found for {player_name} in category {category}")
+        # Merge predictions with odds data and pick Over/Under per model
+        odds_df = merge_predictions(odds_df, latest_rows, category, key)
 
         # Upload predictions to PSQL
         table_name = f'{key}_predictions'
         odds_df.dropna(axis=0, inplace = True)
         odds_df.drop_duplicates(keep='first', inplace=True)
-        conn.upload_data(odds_df, table_name)
+        # Only points_predictions predates the other markets
+        get_conn().ensure_table(odds_df, table_name)
+        get_conn().upload_data(odds_df, table_name)
         odds[category] = odds_df
         lowest_data[category] = latest_rows
         print(f"Successfully uploaded {key} predictions.")
@@ -193,107 +162,87 @@ def predict_games(full_data, odds_raw):
 
 #best bets tab added in
 
+@instrumented()
 def classification(lowest_data,odds):
-        
-    ensemble = joblib.load(f'{current_wd}/models/meta_model.pkl')
-    models = joblib.load(f'{current_wd}/models/classification_models.pkl')
+    """Scores every market's odds board with the meta-model and Over/Under classifier, then uploads."""
+    bundles = get_store(f'{current_wd}/models').get()
+    ensemble = bundles['meta_model']
+    models = bundles['classification_models']
 
     # Display settings
     pd.set_option('display.max_columns', None)
     pd.set_option('display.max_colwidth', None)
     pd.set_option('display.max_rows', None)
 
-    categories = ['pts']
-    lines = ['points']
-
-    # Backup
-    odds_raw = {cat: df.copy() for cat, df in odds.items()}
-
-    for cat, line in zip(categories, lines):
-        print(f"\n=== Category: {cat.upper()} ===")
-
-        # Format odds
-        for col in ['Over', 'Under']:
-            odds[cat][col] = pd.to_numeric(
-                odds[cat][col].astype(str).str.replace('−', '-', regex=False).str.replace('+', '', regex=False),
-                errors='coerce'
-            ).fillna(0).astype(int)
-
-        odds[cat].rename(columns={'Player': 'player'}, inplace=True)
-
-        # Check required model columns exist
+    # Stack every market's board into one long frame with generic column names
+    boards = []
+    for cat, board in odds.items():
         linear_col = f'{cat}_linear_model'
         lightgbm_col = f'{cat}_lightgbm'
-
-
-        print(f"Columns available for {cat}: {list(odds[cat].columns)}")
-        print(f"Looking for: {linear_col}, {lightgbm_col}")
-
-        if linear_col not in odds[cat].columns or lightgbm_col not in odds[cat].columns:
+        if cat not in ensemble or cat not in models:
+            print(f"Skipping {cat}: no meta-model or classifier.")
+            continue
+        if linear_col not in board.columns or lightgbm_col not in board.columns:
             print(f"Skipping {cat} due to missing model cols.")
             continue
-        # Ensemble score
-        coef_linear, coef_lightgbm = ensemble[cat].coef_
-        odds[cat][f'{cat}_ensemble'] = (
-            odds[cat][linear_col] * coef_linear +
-            odds[cat][lightgbm_col] * coef_lightgbm
-        )
-
-        # Merge with features
-        all_data = odds[cat].merge(lowest_data[cat], on='player', how='inner')
-        all_data[line] = pd.to_numeric(all_data[line], errors='coerce')
-
-        # Recalc delta
-        all_data[f'{cat}_delta'] = all_data[f'{cat}_ensemble'] - all_data[line]
-
-        #Load model + thresholds
-        model_dict = models[cat]
-        clf = model_dict['Fitted_Model']
-        threshold_over = model_dict['Over_Threshold']
-        threshold_under = model_dict['Under_Threshold']
-
-        # Ensure all expected features exist
-        expected_features = list(clf.feature_names_in_)
-        
-        for col in expected_features:
-            if col not in all_data.columns:
-                all_data[col] = 0.0
-
-        # Slice and match expected order
-        filtered_data = all_data[expected_features].astype(float)
-        assert list(filtered_data.columns) == list(clf.feature_names_in_)
-
-        #Predict
+        boards.append(board.rename(columns={
+            'Player': 'player', CATEGORY_LINES[cat]: 'line',
+            linear_col: 'linear_model', lightgbm_col: 'lightgbm',
+        }).assign(market=cat))
+    if not boards:
+        return
+
+    all_odds = pd.concat(boards, ignore_index=True)
+    all_odds['line'] = pd.to_numeric(all_odds['line'], errors='coerce')
+
+    # Ensemble score and delta for every market at once
+    all_odds['ensemble'] = market_ensemble(ensemble, all_odds['market'], all_odds['linear_model'], all_odds['lightgbm'])
+    all_odds['delta'] = all_odds['ensemble'] - all_odds['line']
+
+    # Classifier probabilities, one fitted model per market
+    all_odds['proba'] = np.nan
+    for cat, rows in all_odds.groupby('market', sort=False):
+        # Base predictions are already on the board, only take the features
+        features = lowest_data[cat].drop(columns=[f'{cat}_linear_model', f'{cat}_lightgbm'], errors='ignore')
+        all_data = (rows.reset_index()
+                    .merge(features, on='player', how='inner')
+                    .set_index('index')
+                    .rename(columns={'line': CATEGORY_LINES[cat], 'linear_model': f'{cat}_linear_model',
+                                     'lightgbm': f'{cat}_lightgbm', 'ensemble': f'{cat}_ensemble',
+                                     'delta': f'{cat}_delta'}))
+        all_data = all_data[~all_data.index.duplicated(keep='first')]
+
+        #Predict (absent classifier features are filled with 0)
         try:
-            proba = clf.predict_proba(filtered_data.to_numpy())[:, 1]
+            proba, _ = classify(models[cat], all_data)
         except Exception as e:
             print(f"Error predicting for {cat}: {e}")
             continue
+        all_odds.loc[all_data.index, 'proba'] = proba
 
-        def classify(p): return 'Over' if p > threshold_over else 'Under' if p < threshold_under else 'No Bet Recommendation'
-
-        all_data['proba'] = proba
-        all_data['recommendation'] = all_data['proba'].apply(classify)
-
-        for col in ['recommendation', 'proba']:
-            if col in odds[cat].columns:
-                odds[cat].drop(columns=col, inplace=True)
-
-        # Clean up from all_data
-        merged_predictions = all_data[['player', 'recommendation', 'proba']].drop_duplicates(subset='player')
-
-        # Merge cleanly
-        odds[cat] = odds[cat].merge(merged_predictions, on='player', how='left')
+    # Thresholds differ per market, apply them as aligned arrays
+    threshold_over = all_odds['market'].map({cat: models[cat]['Over_Threshold'] for cat in odds if cat in models})
+    threshold_under = all_odds['market'].map({cat: models[cat]['Under_Threshold'] for cat in odds if cat in models})
+    all_odds['recommendation'] = pd.Series(
+        recommend(all_odds['proba'], threshold_over, threshold_under), index=all_odds.index
+    ).where(all_odds['proba'].notna())
 
+    for cat, board in all_odds.groupby('market', sort=False):
+        # The stacked frame carries every market's per-model recommendation columns,
+        # other markets' are all NaN here and would empty the board in dropna; keep
+        # only the table's columns (the same set IncrementalScorer.upsert writes)
+        board = board.rename(columns={'line': CATEGORY_LINES[cat]})[classification_columns(cat)]
 
         #Optional sanity check
-        if odds[cat].duplicated(subset='player').any():
+        if board.duplicated(subset='player').any():
             print(f"Duplicates found in {cat} after merge!")
-        odds[cat].drop(columns =[f'{cat}_linear_model',f'{cat}_lightgbm',f'recommendation_{cat}_linear_model',f'recommendation_{cat}_lightgbm',f'{cat}_ensemble'],inplace= True)
-        odds[cat].dropna(axis=0,inplace=True)
-        odds[cat].drop_duplicates(keep='first',inplace=True)
+        board = board.dropna(axis=0).drop_duplicates(keep='first')
         table_name = f'{cat}_classifications'
-        conn.upload_data(odds[cat], table_name)
+        odds[cat] = apply_schema(board, table_name)
+        get_conn().ensure_table(odds[cat], table_name)
+        get_conn().upload_data(odds[cat], table_name)
+
+    return odds
 
 
 def run_predictions(odds_data, matchups):
@@ -313,5 +262,6 @@ def run_predictions(odds_data, matchups):
     except Exception as e:
         print(e)
 
-    conn.close()
+    print(memory_report())
+    close_conn()
 
@@ -0,0 +1,342 @@
+"""Nightly incremental retraining of the base model -> meta-model -> classifier stack.
+
+    python -m models.retrain --markets points rebounds assists threes
+
+Rebuilds the point-in-time training sets (models/training_data.py, skipped
+with --skip-build) and then, per category, only touches what the new games
+change:
+
+    - the LightGBM booster is warm-started (init_model) with a few extra trees
+      fitted on the recent window,
+    - the linear model is re-solved in closed form from running X'X / X'y sums,
+      so adding a night of games costs one small matrix update,
+    - the meta-model weights are re-solved in closed form on the recent window,
+    - the Over/Under thresholds are recalibrated on a rolling holdout made of
+      games each published version scored before it was trained on them.
+
+The three pickles are published with version metadata in model_version.json;
+ModelStore refuses a set whose pickles do not match it, so a reader never
+loads a half-published version. The previous set is kept under versions/.
+"""
+
+import argparse
+import copy
+import json
+import os
+import shutil
+import time
+from datetime import datetime as dt
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from models.backtest import TARGET, score_history, settle, sweep, threshold_grid
+from models.model_store import (MODEL_FILES, VERSION_FILE, ModelStore, file_digest,
+                                read_version, validate_bundles)
+from models.scoring import CATEGORY_LINES, MARKETS, base_predictions
+
+
+RETRAIN_DIR = 'retrain'
+VERSIONS_DIR = 'versions'
+
+OVER_GRID = np.round(np.arange(0.50, 0.755, 0.01), 2)
+UNDER_GRID = np.round(np.arange(0.25, 0.505, 0.01), 2)
+
+# Holdout columns models.backtest.settle reads
+HOLDOUT_COLUMNS = ['game_date', 'player_id', 'proba', 'Over', 'Under', 'close_Over', 'close_Under', TARGET]
+
+
+def _features(model):
+    return [f.strip() for f in model.feature_names_in_]
+
+
+def _complete(frame, features):
+    return frame[frame[features + [TARGET]].notna().all(axis=1)]
+
+
+def _closed_form(model):
+    # Only ordinary least squares has the X'X / X'y solution; anything else is refit
+    return type(model).__name__ == 'LinearRegression'
+
+
+def linear_stats(model, frame):
+    """X'X and X'y over the labeled rows, the sufficient statistics of least squares."""
+    features = _features(model)
+    rows = _complete(frame, features)
+    X = rows[features].to_numpy(dtype=np.float64)
+    if getattr(model, 'fit_intercept', True):
+        X = np.column_stack([X, np.ones(len(X))])
+    y = rows[TARGET].to_numpy(dtype=np.float64)
+    return {'features': features, 'gram': X.T @ X, 'moment': X.T @ y, 'rows': len(rows)}
+
+
+def add_stats(stats, new):
+    if stats['features'] != new['features']:
+        raise ValueError("linear model features changed; rerun without saved retrain state")
+    return dict(stats, gram=stats['gram'] + new['gram'], moment=stats['moment'] + new['moment'],
+                rows=stats['rows'] + new['rows'])
+
+
+def solve_linear(model, stats):
+    """A copy of model with coefficients solved from the accumulated statistics."""
+    beta = np.linalg.lstsq(stats['gram'], stats['moment'], rcond=None)[0]
+    model = copy.deepcopy(model)
+    if getattr(model, 'fit_intercept', True):
+        model.coef_, model.intercept_ = beta[:-1], float(beta[-1])
+    else:
+        model.coef_, model.intercept_ = beta, 0.0
+    return model
+
+
+def warm_start_lightgbm(model, frame, new_trees):
+    """Continues boosting from the fitted booster with new_trees trees fitted on frame."""
+    features = _features(model)
+    rows = _complete(frame, features)
+    params = dict(model.get_params(), n_estimators=new_trees)
+    updated = type(model)(**params)
+    updated.fit(rows[features], rows[TARGET], init_model=model.booster_)
+    return updated
+
+
+def refit_meta(meta, linear, lightgbm, actual):
+    """Re-solves the ensemble weights (no intercept, as ensemble_prediction uses coef_ only)."""
+    preds = pd.concat([linear, lightgbm, actual], axis=1).dropna().to_numpy(dtype=np.float64)
+    beta = np.linalg.lstsq(preds[:, :2], preds[:, 2], rcond=None)[0]
+    meta = copy.deepcopy(meta)
+    meta.coef_ = beta
+    if hasattr(meta, 'intercept_'):
+        meta.intercept_ = 0.0
+    return meta
+
+
+def recalibrate_thresholds(holdout, category, model_dict, min_bets=50):
+    """Best-ROI threshold pair on the holdout, or the current pair when too few bets qualify.
+
+    Returns:
+        tuple: (over_threshold, under_threshold, metrics dict or None)
+    """
+    results = sweep(settle(holdout, category), threshold_grid(OVER_GRID, UNDER_GRID), workers=1)
+    results = results[results['bets'] >= min_bets]
+    if results.empty:
+        return model_dict['Over_Threshold'], model_dict['Under_Threshold'], None
+    best = results.loc[results['roi'].idxmax()]
+    return float(best['over_threshold']), float(best['under_threshold']), best.to_dict()
+
+
+def _stack_features(bundles, category):
+    features = set()
+    for model_name in ['linear_model', 'lightgbm']:
+        features.update(_features(bundles['models'][category][model_name]))
+    return sorted(features)
+
+
+class Retrainer:
+    """Incrementally updates the published models from the training sets.
+
+    Args:
+        model_dir (str, optional): Directory holding the pickles. Defaults to ./models.
+        data_dir (str, optional): Training set root, defaults to models.training_data.DATASET_DIR.
+    """
+
+    def __init__(self, model_dir=None, data_dir=None, window_days=30, holdout_days=28, new_trees=25, min_bets=50):
+        self.model_dir = model_dir or os.path.join(os.getcwd(), 'models')
+        self.data_dir = data_dir
+        self.window = pd.Timedelta(days=window_days)
+        self.holdout = pd.Timedelta(days=holdout_days)
+        self.new_trees = new_trees
+        self.min_bets = min_bets
+        self.state_dir = os.path.join(self.model_dir, RETRAIN_DIR)
+        self.state_path = os.path.join(self.state_dir, 'state.pkl')
+        self.state = joblib.load(self.state_path) if os.path.exists(self.state_path) else {}
+        self._pending = {}
+
+    def _holdout_path(self, category):
+        return os.path.join(self.state_dir, f'holdout_{category}.parquet')
+
+    def retrain_category(self, bundles, line):
+        """Updates one category's models in bundles. Returns its version metadata, or None when up to date."""
+        from models.training_data import load_training_set
+
+        category = MARKETS[line]
+        start = time.perf_counter()
+        frame = load_training_set(line, self.data_dir).dropna(subset=[TARGET])
+        frame['game_date'] = pd.to_datetime(frame['game_date'])
+        latest = frame['game_date'].max()
+
+        saved = self.state.get(category, {})
+        trained_through = pd.Timestamp(saved['trained_through']) if 'trained_through' in saved else None
+        new = frame[frame['game_date'] > trained_through] if trained_through is not None else frame
+        if new.empty:
+            print(f"{category}: no games after {trained_through.date()}, nothing to retrain")
+            return None
+
+        # Score the new games with the current stack before it learns them; on the
+        # first run (no state) the most recent days stand in for the holdout
+        unseen = new if trained_through is not None else frame[frame['game_date'] > latest - self.holdout]
+        unseen = _complete(unseen, _stack_features(bundles, category))
+        scored = score_history(bundles, category, unseen)
+        line_columns = [CATEGORY_LINES[category], f'close_{CATEGORY_LINES[category]}']
+        holdout = scored[HOLDOUT_COLUMNS + line_columns]
+        if os.path.exists(self._holdout_path(category)):
+            holdout = pd.concat([pd.read_parquet(self._holdout_path(category)), holdout], ignore_index=True)
+        holdout = holdout[holdout['game_date'] > latest - self.holdout]
+
+        models = dict(bundles['models'][category])
+        linear = models['linear_model']
+        if _closed_form(linear):
+            if 'linear' in saved:
+                stats = add_stats(saved['linear'], linear_stats(linear, new))
+            else:
+                stats = linear_stats(linear, frame)
+            models['linear_model'] = solve_linear(linear, stats)
+        else:
+            print(f"{category}: {type(linear).__name__} has no closed form, refitting on all rows")
+            rows = _complete(frame, _features(linear))
+            models['linear_model'] = copy.deepcopy(linear).fit(rows[_features(linear)], rows[TARGET])
+            stats = None
+
+        window = frame[frame['game_date'] > latest - self.window]
+        models['lightgbm'] = warm_start_lightgbm(models['lightgbm'], window, self.new_trees)
+
+        preds = base_predictions({category: models}, category, window)
+        meta = refit_meta(bundles['meta_model'][category], preds[f'{category}_linear_model'],
+                          preds[f'{category}_lightgbm'], window[TARGET])
+
+        model_dict = dict(bundles['classification_models'][category])
+        over, under, metrics = recalibrate_thresholds(holdout, category, model_dict, self.min_bets)
+        model_dict.update(Over_Threshold=over, Under_Threshold=under)
+
+        bundles['models'][category] = models
+        bundles['meta_model'][category] = meta
+        bundles['classification_models'][category] = model_dict
+        self._pending[category] = {'trained_through': str(latest.date()), 'linear': stats, 'holdout': holdout}
+
+        elapsed = time.perf_counter() - start
+        print(f"{category}: +{len(new)} rows, {models['lightgbm'].booster_.num_trees()} trees, "
+              f"thresholds {over:.2f}/{under:.2f} in {elapsed:.1f}s")
+        return {
+            'trained_through': str(latest.date()), 'rows_added': len(new),
+            'linear_rows': stats['rows'] if stats else None,
+            'trees': int(models['lightgbm'].booster_.num_trees()),
+            'meta_coef': [float(c) for c in meta.coef_],
+            'over_threshold': over, 'under_threshold': under,
+            'holdout_rows': len(holdout), 'holdout_roi': metrics['roi'] if metrics else None,
+            'seconds': round(elapsed, 2),
+        }
+
+    def run(self, markets, publish_models=True):
+        """Retrains the markets and publishes the result.
+
+        Returns:
+            dict: The published version metadata, or None when nothing changed.
+        """
+        bundles = ModelStore(self.model_dir, mmap_mode=None).load()
+        bundles = {name: dict(bundle) for name, bundle in bundles.items()}
+        self._pending = {}
+        categories = {}
+        for line in markets:
+            if MARKETS[line] not in bundles['models']:
+                print(f"{MARKETS[line]}: not in models.pkl, skipping")
+                continue
+            result = self.retrain_category(bundles, line)
+            if result is not None:
+                categories[MARKETS[line]] = result
+
+        if not categories:
+            return None
+        validate_bundles(bundles)
+        if not publish_models:
+            return {'categories': categories}
+
+        version = publish(bundles, self.model_dir, {'categories': categories})
+        self._save_state()
+        return version
+
+    def _save_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        for category, pending in self._pending.items():
+            pending['holdout'].to_parquet(self._holdout_path(category), index=False)
+            self.state[category] = {'trained_through': pending['trained_through']}
+            if pending['linear'] is not None:
+                self.state[category]['linear'] = pending['linear']
+        tmp_path = f'{self.state_path}.tmp'
+        joblib.dump(self.state, tmp_path)
+        os.replace(tmp_path, self.state_path)
+
+
+def publish(bundles, model_dir, metadata, keep=5):
+    """Writes the bundles as the current model set, then the version file that vouches for them.
+
+    Each pickle is staged next to its destination and swapped in with os.replace;
+    model_version.json goes last, so until it lands ModelStore sees pickles that
+    do not match the old version and keeps serving what it had.
+
+    Returns:
+        dict: The version metadata written.
+    """
+    previous = read_version(model_dir)
+    version = dt.now().strftime('%Y%m%dT%H%M%S')
+    staging = os.path.join(model_dir, f'.staging-{version}')
+    os.makedirs(staging)
+    try:
+        files = {}
+        for name, file_name in MODEL_FILES.items():
+            path = os.path.join(staging, file_name)
+            joblib.dump(bundles[name], path)
+            files[file_name] = file_digest(path)
+
+        # Keep the outgoing set for rollback
+        archive = os.path.join(model_dir, VERSIONS_DIR, previous['version'] if previous else 'initial')
+        if not os.path.exists(archive):
+            os.makedirs(archive)
+            for file_name in list(MODEL_FILES.values()) + [VERSION_FILE]:
+                if os.path.exists(os.path.join(model_dir, file_name)):
+                    shutil.copy2(os.path.join(model_dir, file_name), archive)
+
+        metadata = dict(metadata, version=version, parent=previous['version'] if previous else None,
+                        published_at=dt.now().isoformat(timespec='seconds'), files=files)
+        with open(os.path.join(staging, VERSION_FILE), 'w') as file:
+            json.dump(metadata, file, indent=2)
+
+        for file_name in files:
+            os.replace(os.path.join(staging, file_name), os.path.join(model_dir, file_name))
+        os.replace(os.path.join(staging, VERSION_FILE), os.path.join(model_dir, VERSION_FILE))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    versions = sorted(os.listdir(os.path.join(model_dir, VERSIONS_DIR)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(model_dir, VERSIONS_DIR, old), ignore_errors=True)
+    print(f"published model version {version} (parent {metadata['parent']})")
+    return metadata
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally retrain and publish the model stack.")
+    parser.add_argument('--markets', nargs='+', default=list(MARKETS), choices=list(MARKETS))
+    parser.add_argument('--model-dir', default=None)
+    parser.add_argument('--data-dir', default=None, help="Training set root written by models.training_data")
+    parser.add_argument('--skip-build', action='store_true', help="Use the training sets as they are")
+    parser.add_argument('--window-days', type=int, default=30, help="Recent days the booster and meta-model see")
+    parser.add_argument('--holdout-days', type=int, default=28, help="Rolling holdout for the thresholds")
+    parser.add_argument('--new-trees', type=int, default=25)
+    parser.add_argument('--min-bets', type=int, default=50)
+    parser.add_argument('--dry-run', action='store_true', help="Retrain without publishing")
+    args = parser.parse_args()
+
+    if not args.skip_build:
+        from models import model_utils
+        from models.training_data import TrainingSetBuilder
+
+        conn = model_utils.psql()
+        try:
+            TrainingSetBuilder(conn, args.data_dir).build(args.markets)
+        finally:
+            conn.close()
+
+    retrainer = Retrainer(args.model_dir, args.data_dir, args.window_days, args.holdout_days,
+                          args.new_trees, args.min_bets)
+    result = retrainer.run(args.markets, publish_models=not args.dry_run)
+    if result is None:
+        print("models already up to date")
@@ -0,0 +1,218 @@
+"""Scoring helpers shared by the daily prediction run and the inference server."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Base models that are trained in the notebook but not used at inference
+SKIPPED_MODELS = ["xgboost", "sarimax", "mlp", "random_forest"]
+
+# Prop markets: betting line column -> stat category used by the model bundles
+MARKETS = {
+    "points": "pts",
+    "rebounds": "reb",
+    "assists": "ast",
+    "threes": "3pm",
+}
+
+# Betting line column for each category
+CATEGORY_LINES = {category: line for line, category in MARKETS.items()}
+
+
+def classification_columns(category):
+    """Columns of {category}_classifications, as classification() and IncrementalScorer write them."""
+    return ['player', CATEGORY_LINES[category], 'Over', 'Under', 'Date_Updated', 'proba', 'recommendation']
+
+
+# Base models whose predictions are joined onto the odds board
+ODDS_MODELS = ['lightgbm', 'linear_model']
+
+
+def normalize_american_odds(odds_df, cols=('Over', 'Under')):
+    """Converts American odds strings such as '+120' or '−110' to ints in place."""
+    for col in cols:
+        odds_df[col] = pd.to_numeric(
+            odds_df[col].astype(str).str.replace('−', '-', regex=False).str.replace('+', '', regex=False),
+            errors='coerce'
+        ).fillna(0).astype(int)
+    return odds_df
+
+
+def merge_predictions(odds_df, latest_rows, category, line):
+    """Joins base model predictions onto the odds board and adds Over/Under picks per model.
+
+    Args:
+        odds_df (pd.DataFrame): Odds board with 'Player' and the line column.
+        latest_rows (pd.DataFrame): One row per player holding '{category}_{model}' predictions.
+        category (str): Stat category, e.g. 'pts'.
+        line (str): Betting line column, e.g. 'points'.
+
+    Returns:
+        pd.DataFrame: The odds board with prediction and 'recommendation_{category}_{model}' columns.
+    """
+    pred_cols = [f'{category}_{model_name}' for model_name in ODDS_MODELS
+                 if f'{category}_{model_name}' in latest_rows.columns]
+
+    preds = (latest_rows[['player'] + pred_cols]
+             .drop_duplicates(subset='player', keep='last')
+             .rename(columns={'player': 'Player'}))
+    preds['Player'] = preds['Player'].astype(str)
+
+    board = odds_df.drop(columns=pred_cols, errors='ignore').copy()
+    board['Player'] = board['Player'].astype(str)
+    merged = board.merge(preds, on='Player', how='left')
+
+    unmatched = merged.loc[merged[pred_cols].isna().all(axis=1), 'Player'] if pred_cols else merged['Player']
+    if len(unmatched):
+        print(f"Warning: No match found in category {category} for: {sorted(set(unmatched))}")
+
+    line_values = pd.to_numeric(merged[line], errors='coerce')
+    for col in pred_cols:
+        picks = pd.Series(np.where(merged[col] > line_values, 'Over', 'Under'), index=merged.index)
+        merged[f'recommendation_{col}'] = picks.where(merged[col].notna())
+    return merged
+
+
+def _predict_one(category, model_name, model, frame):
+    features = [f.strip() for f in model.feature_names_in_]
+
+    if not set(features).issubset(frame.columns):
+        missing = set(features) - set(frame.columns)
+        print(f"Skipping {model_name} for {category}: Missing features: {missing}")
+        return None
+
+    # Rows with a gap in a feature get no prediction rather than a bad one
+    complete = frame[features].notna().all(axis=1)
+    if not complete.all():
+        print(f"{model_name} for {category}: {(~complete).sum()} rows missing feature values")
+    preds = pd.Series(np.nan, index=frame.index, name=f'{category}_{model_name}')
+    if complete.any():
+        preds[complete] = model.predict(frame.loc[complete, features])
+    return preds
+
+
+def batch_base_predictions(models, categories, frame, max_workers=None):
+    """Runs the base models of several categories in one pass over a shared feature frame.
+
+    Args:
+        models (dict): Loaded models.pkl bundle.
+        categories (list): Stat categories to score, e.g. ['pts', 'reb'].
+        frame (pd.DataFrame): One row per player with model features.
+        max_workers (int, optional): Threads to spread model evaluations over.
+            LightGBM and NumPy release the GIL, so threads overlap well.
+
+    Returns:
+        pd.DataFrame: One '{category}_{model_name}' column per model, aligned to frame.
+    """
+    tasks = [(category, model_name, model)
+             for category in categories
+             for model_name, model in models[category].items()
+             if model_name.lower() not in SKIPPED_MODELS]
+
+    if max_workers and max_workers > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(lambda task: _predict_one(*task, frame), tasks))
+    else:
+        results = [_predict_one(*task, frame) for task in tasks]
+
+    columns = [preds for preds in results if preds is not None]
+    return pd.concat(columns, axis=1) if columns else pd.DataFrame(index=frame.index)
+
+
+def base_predictions(models, category, frame):
+    """Runs every usable base model for a single category over a feature frame."""
+    return batch_base_predictions(models, [category], frame)
+
+
+def ensemble_prediction(meta_models, category, linear, lightgbm):
+    """Weights the linear and LightGBM predictions with the meta-model coefficients."""
+    coef_linear, coef_lightgbm = meta_models[category].coef_
+    return linear * coef_linear + lightgbm * coef_lightgbm
+
+
+def market_ensemble(meta_models, market, linear, lightgbm):
+    """Vectorized ensemble over a long frame where each row belongs to a market.
+
+    Args:
+        meta_models (dict): Loaded meta_model.pkl bundle.
+        market (pd.Series): Category of each row, e.g. 'pts'.
+        linear (pd.Series): Linear model prediction per row.
+        lightgbm (pd.Series): LightGBM prediction per row.
+    """
+    categories = market.unique()
+    coef_linear = market.map({cat: meta_models[cat].coef_[0] for cat in categories})
+    coef_lightgbm = market.map({cat: meta_models[cat].coef_[1] for cat in categories})
+    return linear * coef_linear + lightgbm * coef_lightgbm
+
+
+def recommend(proba, threshold_over, threshold_under):
+    """Maps classifier probabilities to Over/Under/No Bet Recommendation.
+
+    Thresholds may be scalars or arrays aligned to proba (one pair per market).
+    """
+    proba = np.asarray(proba)
+    return np.where(proba > threshold_over, 'Over',
+                    np.where(proba < threshold_under, 'Under', 'No Bet Recommendation'))
+
+
+def classifier_features(model_dict, frame):
+    """Slices a frame to the classifier's expected features, filling absent ones with 0."""
+    clf = model_dict['Fitted_Model']
+    expected_features = list(clf.feature_names_in_)
+    features = frame.reindex(columns=expected_features, fill_value=0.0).astype(float)
+    assert list(features.columns) == expected_features
+    return features
+
+
+def classify(model_dict, frame):
+    """Scores a frame with the Over/Under classifier.
+
+    Args:
+        model_dict (dict): One category of classification_models.pkl.
+        frame (pd.DataFrame): Rows holding the classifier features.
+
+    Returns:
+        tuple: (proba, recommendation) arrays aligned to frame.
+    """
+    clf = model_dict['Fitted_Model']
+    proba = clf.predict_proba(classifier_features(model_dict, frame).to_numpy())[:, 1]
+    recommendation = recommend(proba, model_dict['Over_Threshold'], model_dict['Under_Threshold'])
+    return proba, recommendation
+
+
+def score_frame(bundles, category, frame):
+    """Runs the full base model -> meta-model -> classifier stack over feature rows.
+
+    Args:
+        bundles (dict): Loaded bundles keyed 'models', 'meta_model' and 'classification_models'.
+        category (str): Stat category, e.g. 'pts'.
+        frame (pd.DataFrame): Feature rows that also carry the betting line column.
+
+    Returns:
+        pd.DataFrame: Base predictions, ensemble, delta, proba and recommendation. Rows
+            missing a classifier input (a base model skipped a feature gap, or no
+            line) get NaN proba and no recommendation.
+    """
+    line = CATEGORY_LINES[category]
+    scored = base_predictions(bundles['models'], category, frame)
+
+    linear_col, lightgbm_col = f'{category}_linear_model', f'{category}_lightgbm'
+    if linear_col not in scored.columns or lightgbm_col not in scored.columns:
+        raise ValueError(f"Missing base model predictions for {category}")
+
+    scored[f'{category}_ensemble'] = ensemble_prediction(
+        bundles['meta_model'], category, scored[linear_col], scored[lightgbm_col])
+    scored[f'{category}_delta'] = scored[f'{category}_ensemble'] - pd.to_numeric(frame[line], errors='coerce')
+
+    features = pd.concat([frame.drop(columns=scored.columns, errors='ignore'), scored], axis=1)
+    model_dict = bundles['classification_models'][category]
+    complete = classifier_features(model_dict, features).notna().all(axis=1)
+    scored['proba'] = np.nan
+    scored['recommendation'] = None
+    if complete.any():
+        proba, recommendation = classify(model_dict, features[complete])
+        scored.loc[complete, 'proba'] = proba
+        scored.loc[complete, 'recommendation'] = recommendation
+    return scored
@@ -0,0 +1,314 @@
+"""Point-in-time training sets built with as-of joins.
+
+Every row is one player game. Its features are the player's latest
+clean_player_data row *before* the game (the same row recent_player_data
+reads on game day), the player's team and the opponent as of the same
+moment, and the odds snapshot that was live at bet time plus the last one
+before the close. Nothing dated on or after tip-off leaks into a row.
+
+    python -m models.training_data --markets points rebounds --out-dir training_data
+
+Output is partitioned Parquet, <out-dir>/<market>/season_start_year=<year>/,
+with manifest.json describing every partition. Intermediate feature joins are
+cached per season under <out-dir>/_cache, keyed by the input tables'
+watermark (latest date and row count), so a rebuild only redoes the seasons
+whose inputs changed.
+"""
+
+import argparse
+import json
+import os
+import time
+import unicodedata
+from datetime import datetime as dt
+
+import pandas as pd
+
+from models.scoring import MARKETS, normalize_american_odds
+
+
+PLAYER_TABLE = 'clean_player_data'
+TEAM_TABLE = 'clean_team_data'
+DATASET_DIR = os.path.join(os.getcwd(), 'training_data')
+
+PLAYER_KEYS = ['player_id', 'player', 'team', 'game_id', 'game_date', 'season', 'season_start_year', 'game_rank']
+TEAM_KEYS = ['team_id', 'team', 'team_name', 'game_id', 'game_date', 'matchup', 'wl', 'season_id',
+             'season', 'season_start_year', 'game_rank']
+
+# Stat column each market settles on
+MARKET_TARGETS = {'points': 'pts', 'rebounds': 'reb', 'assists': 'ast', 'threes': 'fgthree_m'}
+
+# Postgres folds the unquoted odds column names to lower case
+ODDS_COLUMNS = {'player': 'Player', 'over': 'Over', 'under': 'Under', 'date_updated': 'Date_Updated'}
+
+
+def normalize_name(name):
+    """Lower-cased, accent- and period-free player name used to match odds to player ids."""
+    name = unicodedata.normalize('NFKD', str(name))
+    return ''.join(c for c in name if not unicodedata.combining(c)).replace('.', '').lower().strip()
+
+
+def latest_before(left, right, by, on='game_date', as_of=None):
+    """As-of join: for each left row, the latest right row with right[on] strictly before left[on].
+
+    The matched row's date is kept in column `as_of` when given.
+    """
+    # The schema stores ids compactly; merge_asof wants identical key dtypes
+    left = left.dropna(subset=[by]).astype({by: 'int64'})
+    right = right.astype({by: 'int64'}).rename(columns={on: f'_{on}_asof'}).sort_values(f'_{on}_asof')
+    joined = pd.merge_asof(left.sort_values(on), right, left_on=on, right_on=f'_{on}_asof',
+                           by=by, allow_exact_matches=False, direction='backward')
+    if as_of:
+        return joined.rename(columns={f'_{on}_asof': as_of})
+    return joined.drop(columns=f'_{on}_asof')
+
+
+def _opponent(matchup):
+    # 'LAL vs. BOS' and 'LAL @ BOS' both end with the opponent
+    return matchup.str.split(' ').str[-1]
+
+
+def feature_frame(player_rows, team_rows):
+    """Joins each player game to the player, team and opponent features known before it.
+
+    Args:
+        player_rows (pd.DataFrame): clean_player_data rows.
+        team_rows (pd.DataFrame): clean_team_data rows for the same period.
+
+    Returns:
+        pd.DataFrame: One row per player game with 'target_<stat>' outcome columns
+        and features named the way recent_player_data names them.
+    """
+    player_rows = player_rows.assign(game_date=pd.to_datetime(player_rows['game_date']))
+    team_rows = team_rows.assign(game_date=pd.to_datetime(team_rows['game_date']))
+
+    targets = player_rows[['player_id', 'player', 'team', 'game_id', 'game_date', 'season_start_year']
+                          + [f'{stat}' for stat in MARKET_TARGETS.values()]]
+    targets = targets.rename(columns={stat: f'target_{stat}' for stat in MARKET_TARGETS.values()})
+
+    # Team and opponent ids for each player game come from the team box score
+    games = team_rows[['team', 'game_id', 'team_id', 'matchup']].drop_duplicates(['team', 'game_id'])
+    games = games.assign(opponent_team=_opponent(games['matchup'].astype(str))).drop(columns='matchup')
+    team_ids = team_rows.drop_duplicates('team', keep='last').set_index('team')['team_id']
+    games['opponent'] = games['opponent_team'].map(team_ids)
+    targets = targets.merge(games.drop(columns='opponent_team'), on=['team', 'game_id'], how='left')
+
+    player_features = [c for c in player_rows.columns if c not in PLAYER_KEYS]
+    frame = latest_before(targets, player_rows[['player_id', 'game_date'] + player_features],
+                          by='player_id', as_of='features_as_of')
+    # A player's first game of the season has nothing to predict from, as on game day
+    frame = frame.dropna(subset=['features_as_of'])
+
+    team_features = [c for c in team_rows.columns if c not in TEAM_KEYS]
+    team_side = team_rows[['team_id', 'game_date'] + team_features]
+    own_team = team_side.rename(columns={c: f'{c}_remove' for c in team_features if c in player_features})
+    opponent = team_side.rename(columns={'team_id': 'opponent', **{c: f'{c}_opponent' for c in team_features}})
+    frame = latest_before(frame, own_team, by='team_id')
+    frame = latest_before(frame, opponent, by='opponent')
+    return frame.reset_index(drop=True)
+
+
+def attach_odds(frame, odds, line, name_map, bet_time='12:00', close_time='19:00'):
+    """Adds the bet-time and closing odds snapshot for each player game.
+
+    Args:
+        frame (pd.DataFrame): Output of feature_frame.
+        odds (pd.DataFrame): player_<market>_odds rows (Player, line, Over, Under, Date_Updated).
+        line (str): Line column, e.g. 'points'.
+        name_map (dict): normalize_name(player) -> player_id.
+        bet_time (str): Local time on game day the bet is placed, 'HH:MM'.
+        close_time (str): Local time treated as the close (tip-off), 'HH:MM'.
+
+    Returns:
+        pd.DataFrame: Rows that had a snapshot at bet time, with the line, Over/Under,
+        close_<line>, close_Over, close_Under and 'actual' columns models.backtest reads.
+    """
+    odds = normalize_american_odds(odds.rename(columns=ODDS_COLUMNS).copy())
+    odds['player_id'] = odds['Player'].map(normalize_name).map(name_map)
+    unmatched = odds.loc[odds['player_id'].isna(), 'Player'].unique()
+    if len(unmatched):
+        print(f"{line}: {len(unmatched)} odds names did not match a player_id")
+    odds = (odds.dropna(subset=['player_id'])
+            .astype({'player_id': 'int64'})
+            .assign(Date_Updated=lambda df: pd.to_datetime(df['Date_Updated']),
+                    **{line: lambda df: pd.to_numeric(df[line], errors='coerce')})
+            [['player_id', 'Date_Updated', line, 'Over', 'Under']]
+            .sort_values('Date_Updated'))
+
+    frame = frame.astype({'player_id': 'int64'})
+    for prefix, at in [('', bet_time), ('close_', close_time)]:
+        offset = pd.to_timedelta(f'{at}:00')
+        snapshot = odds.rename(columns={c: f'{prefix}{c}' for c in [line, 'Over', 'Under']})
+        frame = pd.merge_asof(frame.assign(_at=frame['game_date'] + offset).sort_values('_at'),
+                              snapshot.rename(columns={'Date_Updated': f'{prefix}snapshot_at'}),
+                              left_on='_at', right_on=f'{prefix}snapshot_at', by='player_id',
+                              direction='backward', tolerance=offset).drop(columns='_at')
+
+    frame['actual'] = frame[f'target_{MARKET_TARGETS[line]}']
+    return frame.dropna(subset=[line]).reset_index(drop=True)
+
+
+class TrainingSetBuilder:
+    """Builds and incrementally refreshes the partitioned training sets.
+
+    Args:
+        conn: A models.model_utils.psql connection.
+        out_dir (str, optional): Dataset root, defaults to ./training_data.
+    """
+
+    def __init__(self, conn, out_dir=None):
+        self.conn = conn
+        self.out_dir = out_dir or DATASET_DIR
+        self.manifest_path = os.path.join(self.out_dir, 'manifest.json')
+        self.manifest = {'partitions': {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as file:
+                self.manifest = json.load(file)
+
+    def table_watermarks(self, table):
+        """{season: [first game_date, latest game_date, row count]} for a clean_* table."""
+        rows = self.conn.query(f"""
+            SELECT season_start_year, min(game_date) AS first, max(game_date) AS latest, count(*) AS n
+            FROM {table}
+            GROUP BY season_start_year
+        """)
+        return {int(r.season_start_year): [str(r.first), str(r.latest), int(r.n)] for r in rows.itertuples()}
+
+    @staticmethod
+    def _odds_window(player_mark):
+        # Snapshots from the season's first game day through its last
+        return pd.Timestamp(player_mark[0]), pd.Timestamp(player_mark[1]) + pd.Timedelta(days=1)
+
+    def odds_watermark(self, line, window):
+        start, end = window
+        rows = self.conn.query(f"""
+            SELECT max(date_updated) AS latest, count(*) AS n
+            FROM player_{line}_odds
+            WHERE date_updated >= %s AND date_updated < %s
+        """, params=(start, end))
+        return [str(rows['latest'].iloc[0]), int(rows['n'].iloc[0])]
+
+    def _season_rows(self, table, season):
+        return self.conn.query(f"SELECT * FROM {table} WHERE season_start_year = %s",
+                               params=(str(season),), stage=f'training_{table}')
+
+    def features(self, season, watermark):
+        """The season's feature join, read from the cache when the input watermark is unchanged."""
+        cache_dir = os.path.join(self.out_dir, '_cache', 'features')
+        path = os.path.join(cache_dir, f'season_start_year={season}.parquet')
+        mark_path = f'{path}.watermark.json'
+        if os.path.exists(path) and os.path.exists(mark_path):
+            with open(mark_path) as file:
+                if json.load(file) == watermark:
+                    return pd.read_parquet(path)
+
+        frame = feature_frame(self._season_rows(PLAYER_TABLE, season), self._season_rows(TEAM_TABLE, season))
+        os.makedirs(cache_dir, exist_ok=True)
+        frame.to_parquet(path, index=False)
+        with open(mark_path, 'w') as file:
+            json.dump(watermark, file)
+        return frame
+
+    def build(self, markets=('points',), seasons=None, bet_time='12:00', close_time='19:00'):
+        """Writes every market/season partition whose inputs changed since the last build.
+
+        Returns:
+            dict: The updated manifest.
+        """
+        player_marks = self.table_watermarks(PLAYER_TABLE)
+        team_marks = self.table_watermarks(TEAM_TABLE)
+        seasons = sorted(seasons or player_marks)
+
+        for season in seasons:
+            feature_mark = {'player': player_marks.get(season), 'team': team_marks.get(season)}
+            frame, name_map = None, None
+            for line in markets:
+                window = self._odds_window(player_marks[season])
+                watermark = dict(feature_mark, odds=self.odds_watermark(line, window),
+                                 bet_time=bet_time, close_time=close_time)
+                partition = self.manifest['partitions'].get(line, {}).get(str(season))
+                if partition and partition['watermark'] == watermark:
+                    print(f"{line} {season}: up to date ({partition['rows']} rows)")
+                    continue
+
+                start = time.perf_counter()
+                if frame is None:
+                    frame = self.features(season, feature_mark)
+                    names = frame.drop_duplicates('player_id', keep='last')
+                    name_map = dict(zip(names['player'].map(normalize_name), names['player_id']))
+                odds = self.conn.query(f"""
+                    SELECT * FROM player_{line}_odds
+                    WHERE date_updated >= %s AND date_updated < %s
+                """, params=window)
+                dataset = attach_odds(frame, odds, line, name_map, bet_time, close_time)
+
+                out = os.path.join(self.out_dir, line, f'season_start_year={season}')
+                if dataset.empty:
+                    # An empty frame writes its object columns as Arrow null, which the
+                    # other seasons' string columns cannot be read together with
+                    if os.path.exists(os.path.join(out, 'part-0.parquet')):
+                        os.remove(os.path.join(out, 'part-0.parquet'))
+                else:
+                    os.makedirs(out, exist_ok=True)
+                    tmp_path = os.path.join(out, 'part-0.parquet.tmp')
+                    dataset.drop(columns='season_start_year').to_parquet(tmp_path, index=False)
+                    os.replace(tmp_path, os.path.join(out, 'part-0.parquet'))
+
+                self.manifest['partitions'].setdefault(line, {})[str(season)] = {
+                    'path': os.path.relpath(out, self.out_dir), 'rows': len(dataset),
+                    'watermark': watermark, 'built_at': dt.now().isoformat(timespec='seconds'),
+                    'columns': len(dataset.columns),
+                }
+                self._write_manifest()
+                print(f"{line} {season}: {len(dataset)} rows in {time.perf_counter() - start:.1f}s")
+        return self.manifest
+
+    def _write_manifest(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def partition_schema(path):
+    """One Arrow schema over every partition file, taking each column's type from a file where it is not null."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = {}
+    for root, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            if not name.endswith('.parquet'):
+                continue
+            for field in pq.read_schema(os.path.join(root, name)):
+                if field.name not in fields or pa.types.is_null(fields[field.name].type):
+                    fields[field.name] = field
+    fields['season_start_year'] = pa.field('season_start_year', pa.int32())
+    return pa.schema(list(fields.values()))
+
+
+def load_training_set(line, out_dir=None, seasons=None, columns=None):
+    """Reads a market's partitions back as one frame (season_start_year restored from the path)."""
+    path = os.path.join(out_dir or DATASET_DIR, line)
+    filters = [('season_start_year', 'in', list(seasons))] if seasons else None
+    # Partitions written before empty seasons were skipped can hold null-typed columns
+    return pd.read_parquet(path, filters=filters, columns=columns, schema=partition_schema(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build point-in-time training sets from Postgres.")
+    parser.add_argument('--markets', nargs='+', default=['points'], choices=list(MARKETS))
+    parser.add_argument('--seasons', nargs='*', type=int, default=None)
+    parser.add_argument('--out-dir', default=None)
+    parser.add_argument('--bet-time', default='12:00')
+    parser.add_argument('--close-time', default='19:00')
+    args = parser.parse_args()
+
+    from models import model_utils
+
+    conn = model_utils.psql()
+    try:
+        TrainingSetBuilder(conn, args.out_dir).build(args.markets, args.seasons, args.bet_time, args.close_time)
+    finally:
+        conn.close()
@@ -1,205 +1,286 @@
-import pandas_gbq
+"""Grades the posted Over/Under recommendations against the box scores.
+
+Grading is vectorized and local: the day's bets are joined to the box score,
+labelled and scored in pandas, then MERGEd into {cat}_cl_outcome on
+player_id + game_date, so re-grading a bet replaces its row and every other
+bet of the day is kept. A small daily table, {cat}_cl_hit_rate, keeps per-day
+bet and hit counts with rolling and season-to-date hit rates, so a night of
+grading touches that night's bets plus at most a season of daily rows; its
+graded days' partitions are replaced. Both go through
+scraping_data/warehouse_writer.py as Parquet load jobs.
+"""
+
+from datetime import datetime as dt, timedelta
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
-from datetime import datetime as dt
+
 from scraping_data import utils
+from scraping_data.warehouse_cache import WarehouseCache
+from scraping_data.warehouse_writer import WarehouseWriter
 
 
-from google.oauth2 import service_account
-def clean_player_name(name):
-    """Standardizes player names by removing special characters and handling known name variations."""
-    name = name.lower().strip()  # Convert to lowercase & remove extra spaces
-    name = name.replace(".", "")  # Remove periods
-
-    # Known name changes (add more as needed)
-    name_corrections = {
-        "alexandre sarr": "alex sarr",
-        "jimmy butler": "jimmy butler iii",
-        "nicolas claxton": "nic claxton",
-        "kenyon martin jr": "kj martin",
-        "carlton carrington": "bub carrington",
-        "ron holland ii": "ronald holland ii",
-        'cameron thomas':'cam thomas'
-    }
-
-    # Apply corrections if the name exists in the dictionary
-    return name_corrections.get(name, name)  # Default to original name if no correction found
-
-def classify_result(row,table,cat):
-    return "Under" if row[f'{table}'] > row[f'{cat}'] else "Over"
+PROJECT_ID = 'miscellaneous-projects-444203'
+DATASET = 'capstone_data'
+KEY_PATH = '/home/aportra99/scraping_key.json'
+
+# (betting line column, stat category) graded each day
+MARKETS = [('points', 'pts')]
+
+ACCURACY_ALERT = .524
+ROLLING_DAYS = [7, 30]
+
+OUTCOME_COLUMNS = ['player_id', 'player', 'game_date', 'line', 'actual', 'result', 'recommendation', 'proba', 'hit']
+
+
+def outcome_columns(table, cat):
+    """OUTCOME_COLUMNS plus the line and stat under their original names ({table}, {cat}),
+    which models/ROI_tracker.ipynb and rows graded before 'line'/'actual' existed use."""
+    return OUTCOME_COLUMNS + [table, cat]
+
+
+@lru_cache(maxsize=1)
+def get_credentials():
+    """Service-account credentials, read once per process (None when running locally)."""
+    from google.oauth2 import service_account
 
-def past_outcomes():
-    tables = ["points"]
-    categories = ['pts']
     try:
-        credentials = service_account.Credentials.from_service_account_file(
-        "/home/aportra99/scraping_key.json"
-    )
-        local = False
+        return service_account.Credentials.from_service_account_file(KEY_PATH)
     except FileNotFoundError:
-        local = True
-    today = dt.today() - timedelta(1)
-    today = today.date()
-    season = today.year if today.month >= 10 else today.year - 1
-    game_query =f"""
-        select  *
-        from `capstone_data.player_prediction_data_partitioned`
-        where season_start_year = {season}
-        """
-    game_data =  pandas_gbq.read_gbq(game_query, project_id='miscellaneous-projects-444203',credentials=credentials if not local else None)
-
-    for table,cat in zip(tables,categories):
-        
-        predict_query = f"""
-            WITH ranked_predictions AS (
-                SELECT *, 
-                    ROW_NUMBER() OVER (PARTITION BY Player, date(Date_Updated) ORDER BY Date_Updated DESC) AS rn
-                FROM `capstone_data.{table}_classifications`
-                where recommendation != 'No Bet Recommendation'
-            )
-            SELECT * 
-            FROM ranked_predictions
-            WHERE rn = 1"""
+        return None
 
 
-        try:
-            credentials = service_account.Credentials.from_service_account_file(
-            "/home/aportra99/scraping_key.json"
+@lru_cache(maxsize=1)
+def get_client():
+    from google.cloud import bigquery
+
+    return bigquery.Client(project=PROJECT_ID, credentials=get_credentials())
+
+
+@lru_cache(maxsize=1)
+def get_warehouse():
+    return WarehouseCache(get_client())
+
+
+def read_gbq(query):
+    """Query results, served from the local cache while the tables read are unchanged."""
+    return get_warehouse().read(query)
+
+
+# Known name changes (add more as needed)
+NAME_CORRECTIONS = {
+    "alexandre sarr": "alex sarr",
+    "jimmy butler": "jimmy butler iii",
+    "nicolas claxton": "nic claxton",
+    "kenyon martin jr": "kj martin",
+    "carlton carrington": "bub carrington",
+    "ron holland ii": "ronald holland ii",
+    'cameron thomas': 'cam thomas',
+}
+
+
+def clean_player_name(name):
+    """Standardizes player names by removing special characters and handling known name variations."""
+    name = name.lower().strip().replace(".", "")
+    return NAME_CORRECTIONS.get(name, name)
+
+
+def clean_player_names(names):
+    """Vectorized clean_player_name over a Series."""
+    names = names.astype(str).str.lower().str.strip().str.replace(".", "", regex=False)
+    return names.replace(NAME_CORRECTIONS)
+
+
+def season_of(day):
+    return day.year if day.month >= 10 else day.year - 1
+
+
+def latest_predictions(cat, dates):
+    """The last posted bet per player and day for the given game dates."""
+    date_list = ', '.join(f"DATE '{day.isoformat()}'" for day in dates)
+    predict_query = f"""
+        WITH ranked_predictions AS (
+            SELECT *,
+                ROW_NUMBER() OVER (PARTITION BY Player, date(Date_Updated) ORDER BY Date_Updated DESC) AS rn
+            FROM `{DATASET}.{cat}_classifications`
+            WHERE recommendation != 'No Bet Recommendation'
+              AND date(Date_Updated) IN ({date_list})
         )
-            local = False
-        except FileNotFoundError:
-            credentials = False
-            local = True
+        SELECT *
+        FROM ranked_predictions
+        WHERE rn = 1"""
+    return read_gbq(predict_query)
+
 
-        predict_data = pandas_gbq.read_gbq(predict_query, project_id='miscellaneous-projects-444203',credentials=credentials if not local else None)
-        predict_data['player'] = predict_data['player'].apply(clean_player_name)
-        predict_data['Date_Updated'] = pd.to_datetime(predict_data['Date_Updated']).dt.date
-        game_data['game_date'] = pd.to_datetime(game_data['game_date']).dt.date
-        predict_data.rename(columns={'Date_Updated':'game_date'},inplace=True)
-        game_data['player'] = game_data['player'].apply(clean_player_name)
+def grade(game_data, predict_data, table, cat):
+    """Labels each bet Over/Under from the box score and marks whether it hit.
 
-        game_data = game_data[game_data['player'].isin(predict_data['player'])]
+    Args:
+        game_data (pd.DataFrame): Box score rows with player_id, player, game_date and the stat column.
+        predict_data (pd.DataFrame): Posted bets with player, Date_Updated, the line column,
+            recommendation and proba.
+        table (str): Line column, e.g. 'points'.
+        cat (str): Stat column, e.g. 'pts'.
 
-        full_data = game_data.merge(predict_data,on=['player','game_date'])
+    Returns:
+        pd.DataFrame: One row per graded bet with outcome_columns(table, cat); bets whose
+            line or box score stat is missing are left ungraded.
+    """
+    predict_data = predict_data.assign(
+        player=clean_player_names(predict_data['player']),
+        game_date=pd.to_datetime(predict_data['Date_Updated']).dt.date,
+    )
+    game_data = game_data.assign(
+        player=clean_player_names(game_data['player']),
+        game_date=pd.to_datetime(game_data['game_date']).dt.date,
+    )
 
-        full_data[f'{table}'] = pd.to_numeric(full_data[f'{table}'])
+    full_data = (game_data[['player_id', 'player', 'game_date', cat]]
+                 .merge(predict_data[['player', 'game_date', table, 'recommendation', 'proba']],
+                        on=['player', 'game_date'])
+                 .drop_duplicates(subset=['player_id', 'game_date']))
 
-        full_data['result'] = full_data.apply(lambda row:classify_result(row,table,cat), axis=1)
-        
-        full_data = full_data.drop_duplicates(subset=['player','game_date'])
+    line = pd.to_numeric(full_data[table], errors='coerce')
+    actual = pd.to_numeric(full_data[cat], errors='coerce')
+    # A NaN compares False and would grade as 'Over'
+    gradable = line.notna() & actual.notna()
+    if not gradable.all():
+        print(f"{cat}: {int((~gradable).sum())} bets without a line or {cat} left ungraded")
+    graded = full_data[gradable].assign(line=line[gradable], actual=actual[gradable])
+    graded[table], graded[cat] = graded['line'], graded['actual']
+    graded['result'] = np.where(graded['line'] > graded['actual'], 'Under', 'Over')
+    graded['hit'] = graded['result'] == graded['recommendation']
+    return graded[outcome_columns(table, cat)].reset_index(drop=True)
 
-        data_to_upload = full_data[['player',f'{table}',f'{cat}','game_date','result','recommendation','proba',]]
-        table_schema = [{"name": "game_date", "type": "DATE"}]
-        table_id = f"miscellaneous-projects-444203.capstone_data.{cat}_cl_outcome"
-        pandas_gbq.to_gbq(
-                data_to_upload,
-                project_id="miscellaneous-projects-444203",
-                destination_table=table_id,
-                if_exists="replace",
-                credentials=credentials if credentials else None,
-                table_schema=table_schema,
-            )
+
+def daily_hit_rates(graded):
+    """Per-day bet and hit counts, split by side."""
+    over = graded['recommendation'] == 'Over'
+    counts = graded.assign(
+        bets=1, hits=graded['hit'].astype(int),
+        overs=over.astype(int), over_hits=(over & graded['hit']).astype(int),
+        unders=(~over).astype(int), under_hits=(~over & graded['hit']).astype(int),
+    )
+    return (counts.groupby('game_date', as_index=False)[['bets', 'hits', 'overs', 'over_hits', 'unders', 'under_hits']]
+            .sum())
 
 
+def roll_hit_rates(daily):
+    """Adds rolling and season-to-date hit rates to a season of daily counts."""
+    daily = daily.sort_values('game_date').reset_index(drop=True)
+    indexed = daily.set_index(pd.to_datetime(daily['game_date']))
+    for days in ROLLING_DAYS:
+        window = indexed[['bets', 'hits']].rolling(f'{days}D').sum()
+        daily[f'rolling_{days}_hit_rate'] = (window['hits'] / window['bets']).to_numpy()
+    daily['season_bets'] = daily['bets'].cumsum()
+    daily['season_hits'] = daily['hits'].cumsum()
+    daily['season_hit_rate'] = daily['season_hits'] / daily['season_bets']
+    daily['accuracy'] = daily['hits'] / daily['bets']
+    return daily
 
-def current_outcome(data,date):
+
+def update_hit_rates(graded, cat, writer):
+    """Folds newly graded days into {cat}_cl_hit_rate and returns the updated daily rows."""
+    from google.api_core.exceptions import NotFound
+
+    daily = daily_hit_rates(graded)
+    first = min(daily['game_date'])
+    season = season_of(first)
     try:
-        game_data = data
-        game_data['game_date'] = date
-        game_data.rename(columns = {'player_name':'player','fg3m':'3pm'},inplace=True)
-        tables = ["points"]
-        categories = ['pts']
+        history = read_gbq(f"""
+            SELECT game_date, bets, hits, overs, over_hits, unders, under_hits
+            FROM `{DATASET}.{cat}_cl_hit_rate`
+            WHERE game_date >= DATE '{season}-08-01' AND game_date < DATE '{season + 1}-08-01'
+        """)
+        history['game_date'] = pd.to_datetime(history['game_date']).dt.date
+    except NotFound:
+        history = daily.iloc[:0]
+
+    season_rows = pd.concat([history[~history['game_date'].isin(daily['game_date'])], daily], ignore_index=True)
+    rolled = roll_hit_rates(season_rows)
+    # Later days' rolling and season-to-date values shift when an earlier day is (re)graded
+    changed = rolled[rolled['game_date'] >= first]
+    writer.overwrite_partitions(changed, f'{cat}_cl_hit_rate', 'game_date')
+    return changed
+
+
+def record_outcomes(game_data, dates, alert=True):
+    """Grades, writes and summarises the bets for the given game dates.
+
+    Returns:
+        dict: '{cat}_accuracy' for the latest graded date per market.
+    """
+    results = {}
+    writer = WarehouseWriter(get_client(), DATASET)
+    for table, cat in MARKETS:
+        predict_data = latest_predictions(cat, dates)
+        if predict_data.empty:
+            print(f"{cat}: no posted bets for {', '.join(str(d) for d in dates)}")
+            continue
+
+        graded = grade(game_data, predict_data, table, cat)
+        if graded.empty:
+            print(f"{cat}: no bets matched a box score")
+            continue
+        print(f"{cat}: {len(graded)} bets graded")
+
+        # Per bet: a re-graded frame need not hold every bet of its days
+        writer.upsert(graded, f'{cat}_cl_outcome', 'game_date', ['player_id', 'game_date'], ['player_id'])
+        daily = update_hit_rates(graded, cat, writer)
+
+        latest = daily.loc[daily['game_date'] == max(dates)]
+        if latest.empty:
+            continue
+        row = latest.iloc[0]
+        results[f"{cat}_accuracy"] = float(row['accuracy'])
+        print(f"{cat}: {row['accuracy']:.3f} today, "
+              + ", ".join(f"{row[f'rolling_{days}_hit_rate']:.3f} over {days}d" for days in ROLLING_DAYS)
+              + f", {row['season_hit_rate']:.3f} season to date")
+
+    writer.flush()
+
+    if alert:
+        for result, accuracy in results.items():
+            if accuracy < ACCURACY_ALERT:
+                utils.send_message(f"Warning This Model {result} Underperfoming: {accuracy:.3f}")
+        utils.send_message("Outcome Posted to GBQ: " + str([f"{key}: {results[key]}" for key in results]))
+    return results
+
+
+def past_outcomes():
+    """Grades every game date this season that is not in the outcome table yet."""
+    from google.api_core.exceptions import NotFound
+
+    today = (dt.today() - timedelta(1)).date()
+    season = season_of(today)
+    game_data = read_gbq(f"""
+        select *
+        from `{DATASET}.player_prediction_data_partitioned`
+        where season_start_year = {season}
+        """)
+    game_data['game_date'] = pd.to_datetime(game_data['game_date']).dt.date
+
+    for table, cat in MARKETS:
         try:
-            credentials = service_account.Credentials.from_service_account_file(
-            "/home/aportra99/scraping_key.json"
-        )
-            local = False
-        except FileNotFoundError:
-            credentials = False
-            local = True
-
-        for table,cat in zip(tables,categories):
-            
-            predict_query = f"""
-            WITH ranked_predictions AS (
-                    SELECT *, 
-                        ROW_NUMBER() OVER (PARTITION BY Player, Date_Updated ORDER BY Date_Updated DESC) AS rn
-                    FROM `capstone_data.{cat}_classifications`
-                    where date(Date_Updated) =current_date('America/Los_Angeles') and recommendation != 'No Bet Recommendation'
-                )
-                SELECT *
-                FROM ranked_predictions
-                WHERE rn = 1"""
-            try:
-                credentials = service_account.Credentials.from_service_account_file(
-                "/home/aportra99/scraping_key.json"
-            )
-                local = False
-            except FileNotFoundError:
-                local = True
-                
-            predict_data = pandas_gbq.read_gbq(predict_query, project_id='miscellaneous-projects-444203',credentials=credentials if not local else None)
-            print(predict_data)
-            predict_data['player'] = predict_data['player'].apply(clean_player_name).copy()
-            predict_data['Date_Updated'] = pd.to_datetime(predict_data['Date_Updated']).dt.date
-            game_data['game_date'] = pd.to_datetime(game_data['game_date']).dt.date
-            predict_data.rename(columns={'Date_Updated':'game_date'},inplace=True)
-            game_data['player'] = game_data['player'].apply(clean_player_name)
-
-            game_data = game_data[game_data['player'].isin(predict_data['player'])]
-
-            full_data = game_data.merge(predict_data,on=['player','game_date'])
-
-            full_data[f'{table}'] = pd.to_numeric(full_data[f'{table}'])
-
-            full_data.loc[:,'result'] = full_data.apply(lambda row:classify_result(row,table,cat), axis=1)
-            
-            full_data['outcome'] = (full_data['result']==full_data[f'recommendation'])
-
-            full_data = full_data.drop_duplicates(subset=['player','game_date'])
-
-            data_to_upload = full_data[['player',f'{table}',f'{cat}','game_date','result','recommendation','proba']]
-            table_schema = [{"name": "game_date", "type": "DATE"}]
-            table_id = f"miscellaneous-projects-444203.capstone_data.{cat}_cl_outcome"
-            print(data_to_upload)
-            print("Number of rows:", len(data_to_upload)) 
-            pandas_gbq.to_gbq(
-                    data_to_upload,
-                    project_id="miscellaneous-projects-444203",
-                    destination_table=table_id,
-                    if_exists="append",
-                    credentials=credentials if credentials else None,
-                    table_schema=table_schema,
-                )
-            project_id = 'miscellaneous-projects-444203'
-            categories = ['pts']
-            results = {}
-            for cat in categories:
-                query = f"""
-                SELECT 
-                    SUM(CASE WHEN result = recommendation THEN 1 ELSE 0 END) / COUNT(Player) AS accuracy
-                FROM `capstone_data.{cat}_cl_outcome`
-                where game_date = CURRENT_DATE('America/Los_Angeles')
-                """
-                df = pandas_gbq.read_gbq(query, project_id=project_id, dialect='standard')
-                results[f"{cat}_accuracy"] = df['accuracy'].iloc[0]
-
-            for result in results:
-                print(results[result])
-                if results[result] < .524:
-                    print(result)
-                    utils.send_email(
-                            subject=f"Warning This Model {result} Underperfoming",
-                            body=f"{result}: {results[result]}"
-                    )            
-
-
-            utils.send_email(
-            subject="Outcome Posted to GBQ",
-            body=str([f"{key}: {results[key]}" for key in results])
-                )
+            graded_dates = set(pd.to_datetime(read_gbq(
+                f"SELECT DISTINCT game_date FROM `{DATASET}.{cat}_cl_outcome`")['game_date']).dt.date)
+        except NotFound:
+            graded_dates = set()
+        missing = sorted(set(game_data['game_date']) - graded_dates)
+        if not missing:
+            print(f"{cat}: every game date is graded")
+            continue
+        print(f"{cat}: grading {len(missing)} new game dates")
+        record_outcomes(game_data[game_data['game_date'].isin(missing)], missing, alert=False)
+
+
+def current_outcome(data, date):
+    """Grades last night's bets from the freshly scraped box score."""
+    try:
+        game_data = data.rename(columns={'player_name': 'player', 'fg3m': '3pm'}).assign(game_date=date)
+        day = pd.to_datetime(date).date()
+        return record_outcomes(game_data, [day])
     except Exception as e:
         print(e)
-        utils.send_email(
-        subject="Outcomes Error",
-        body=f"Error {e}")
-
+        utils.send_message(f"Outcomes Error: {e}")
@@ -1,9 +1,102 @@
-from scraping_data.scrape_odds import gather_odds 
-from models.predict_new_games import run_predictions
+import argparse
+import os
+
 from scraping_data.todays_matchups import get_matchups
-matchups = get_matchups()
-if matchups.empty:
-    print("no games today")
-else:
-    odds = gather_odds()
-    run_predictions(odds, matchups)
+from scraping_data.instrumentation import pipeline_run
+from scraping_data.pipeline import Pipeline, StopPipeline, add_arguments
+
+
+# Betting line columns to pull and score; set from --markets, every trained market when None
+markets = None
+
+
+def trained_markets():
+    """Line columns of every market in models.scoring.MARKETS with a trained model."""
+    from models.model_store import get_store
+    from models.scoring import MARKETS
+
+    models = get_store(f'{os.getcwd()}/models').get()['models']
+    return tuple(line for line, category in MARKETS.items() if category in models)
+
+
+def matchups_stage():
+    matchups = get_matchups()
+    if matchups.empty:
+        raise StopPipeline("no games today")
+    return matchups
+
+
+def odds_stage(matchups):
+    # Odds and model imports are only needed when there is a slate
+    from scraping_data.scrape_odds import gather_odds
+    return gather_odds(markets or trained_markets())
+
+
+def roster_stage(matchups):
+    from scraping_data.roster_cache import get_roster
+
+    roster = get_roster(matchups)
+    if roster.empty:
+        raise RuntimeError("no players resolved for today's teams")
+    return roster
+
+
+def features_stage(roster):
+    from models.predict_new_games import recent_player_data
+
+    full_data, _ = recent_player_data(None, roster)
+    if full_data is None:
+        raise RuntimeError("no feature rows for today's players")
+    return full_data
+
+
+def predict_stage(full_data, odds):
+    from models.predict_new_games import predict_games
+    return predict_games(full_data, odds)
+
+
+def classify_stage(lowest_data, predictions):
+    from models.predict_new_games import classification
+    return classification(lowest_data, predictions)
+
+
+def snapshot_stage(matchups, full_data, classified):
+    from models import dashboard_snapshot
+    from models.predict_new_games import get_conn
+    from scraping_data.game_scheduler import league_date
+
+    return dashboard_snapshot.publish(get_conn(), matchups, full_data, classified, league_date())
+
+
+pipeline = (Pipeline('daily_predictions')
+            .add('matchups', matchups_stage, outputs=['matchups'])
+            # The odds API pull and the feature queries overlap
+            .add('gather_odds', odds_stage, inputs=['matchups'], outputs=['odds'])
+            # Rosters are fetched once per day, later runs read roster_cache/
+            .add('roster', roster_stage, inputs=['matchups'], outputs=['roster'])
+            .add('recent_player_data', features_stage, inputs=['roster'], outputs=['full_data'])
+            .add('predict_games', predict_stage, inputs=['full_data', 'odds'],
+                 outputs=['lowest_data', 'predictions'])
+            .add('classification', classify_stage, inputs=['lowest_data', 'predictions'], outputs=['classified'])
+            # The dashboard reads this one file instead of querying the warehouse per visit
+            .add('dashboard_snapshot', snapshot_stage, inputs=['matchups', 'full_data', 'classified'],
+                 outputs=['snapshot_path']))
+
+
+if __name__ == "__main__":
+    from models.scoring import MARKETS
+
+    parser = add_arguments(argparse.ArgumentParser(description="Pull today's odds and score them."))
+    parser.add_argument('--markets', nargs='+', default=None, choices=sorted(MARKETS),
+                        help="Prop markets to pull and score (default: every market with a trained model).")
+    args = parser.parse_args()
+    markets = args.markets
+
+    with pipeline_run('daily_predictions'):
+        try:
+            pipeline.run(from_stage=args.from_stage, resume=args.resume)
+        finally:
+            from models.predict_new_games import close_conn
+            from scraping_data.schema import memory_report
+            print(memory_report())
+            close_conn()
@@ -0,0 +1,269 @@
+"""Long-running ingestion that processes each game as soon as it goes final.
+
+    python -m scraping_data.game_scheduler            # run until stopped
+    python -m scraping_data.game_scheduler --once     # one poll, e.g. from cron
+
+Every poll reads the scoreboard for the current league date and for any
+earlier date that still has unfinished games. The league date is Eastern
+time rolled over at 6 AM, so a West Coast game ending after midnight still
+belongs to its own slate. Each game's state is kept in a SQLite ledger:
+
+    scheduled / live -> final -> ingesting -> ingested
+                                          \\-> failed (retried up to max_attempts)
+
+A game is claimed with a conditional UPDATE before it is scraped, cleaned
+and uploaded on its own, so it is processed once however many pollers run
+or restart. Ingestion also skips a table that already has rows for the
+game_id, which covers a crash between the upload and the ledger update.
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+import traceback
+from datetime import datetime as dt, timedelta
+from zoneinfo import ZoneInfo
+
+
+LEDGER_PATH = os.environ.get('NBA_LEDGER', os.path.join(os.getcwd(), 'ingest_ledger.sqlite'))
+
+LEAGUE_TZ = ZoneInfo('America/New_York')
+# Hours after midnight Eastern that still count as the previous league date
+ROLLOVER_HOURS = 6
+
+# Scoreboard GAME_STATUS_ID
+STATUSES = {1: 'scheduled', 2: 'live', 3: 'final'}
+
+# Seconds between polls while games are live, upcoming, or when nothing is open
+POLL_LIVE = 60
+POLL_UPCOMING = 5 * 60
+POLL_IDLE = 30 * 60
+
+MAX_ATTEMPTS = 30
+
+
+def league_date(now=None):
+    """The slate date a moment belongs to (Eastern time, rolled over at ROLLOVER_HOURS)."""
+    now = now.astimezone(LEAGUE_TZ) if now is not None else dt.now(LEAGUE_TZ)
+    return (now - timedelta(hours=ROLLOVER_HOURS)).date()
+
+
+class Ledger:
+    """Per-game ingestion state in SQLite."""
+
+    def __init__(self, path=None):
+        self.path = path or LEDGER_PATH
+        self.conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS games (
+                game_id TEXT PRIMARY KEY,
+                game_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                seen_at TEXT,
+                final_at TEXT,
+                ingested_at TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )""")
+
+    def observe(self, game_id, game_date, status):
+        """Records a scoreboard reading; a game never moves back out of final."""
+        now = dt.now().isoformat()
+        self.conn.execute("""
+            INSERT INTO games (game_id, game_date, status, seen_at, final_at)
+            VALUES (?, ?, ?, ?, CASE WHEN ? = 'final' THEN ? END)
+            ON CONFLICT (game_id) DO UPDATE SET
+                status = excluded.status,
+                seen_at = excluded.seen_at,
+                final_at = COALESCE(games.final_at, excluded.final_at)
+            WHERE games.status IN ('scheduled', 'live')
+        """, (game_id, game_date.isoformat(), status, now, status, now))
+
+    def claim(self, game_id, max_attempts=MAX_ATTEMPTS):
+        """Marks a final game as being ingested; False when another run has it or it is done."""
+        cursor = self.conn.execute("""
+            UPDATE games SET status = 'ingesting', attempts = attempts + 1
+            WHERE game_id = ? AND status IN ('final', 'failed') AND attempts < ?
+        """, (game_id, max_attempts))
+        return cursor.rowcount == 1
+
+    def done(self, game_id):
+        self.conn.execute("UPDATE games SET status = 'ingested', ingested_at = ?, last_error = NULL WHERE game_id = ?",
+                          (dt.now().isoformat(), game_id))
+
+    def fail(self, game_id, error):
+        self.conn.execute("UPDATE games SET status = 'failed', last_error = ? WHERE game_id = ?", (error, game_id))
+
+    def release(self, game_id):
+        """Puts a claimed game back without counting the attempt (its data is not published yet)."""
+        self.conn.execute("UPDATE games SET status = 'final', attempts = attempts - 1 WHERE game_id = ?", (game_id,))
+
+    def recover(self):
+        """Games left 'ingesting' by a crashed run become retryable."""
+        return self.conn.execute("UPDATE games SET status = 'failed', last_error = 'interrupted' "
+                                 "WHERE status = 'ingesting'").rowcount
+
+    def ready(self, max_attempts=MAX_ATTEMPTS):
+        """(game_id, game_date) of final or failed games still to ingest, oldest final first."""
+        rows = self.conn.execute("""
+            SELECT game_id, game_date FROM games
+            WHERE status IN ('final', 'failed') AND attempts < ?
+            ORDER BY final_at, game_id
+        """, (max_attempts,)).fetchall()
+        return [(game_id, dt.fromisoformat(game_date).date()) for game_id, game_date in rows]
+
+    def open_dates(self):
+        """League dates with games not final yet."""
+        rows = self.conn.execute("SELECT DISTINCT game_date FROM games WHERE status IN ('scheduled', 'live')")
+        return {dt.fromisoformat(game_date).date() for game_date, in rows}
+
+    def counts(self, game_date=None):
+        query = "SELECT status, COUNT(*) FROM games"
+        params = ()
+        if game_date is not None:
+            query += " WHERE game_date = ?"
+            params = (game_date.isoformat(),)
+        return dict(self.conn.execute(query + " GROUP BY status", params).fetchall())
+
+
+def published(conn, table, game_id):
+    """True when a clean table already holds rows for the game."""
+    rows = conn.query(f"SELECT 1 AS found FROM {table} WHERE game_id = %s LIMIT 1", (game_id,))
+    return not rows.empty
+
+
+def ingest_game(game_id, game_date, game_log=None):
+    """Scrapes, cleans and uploads one finished game.
+
+    Returns:
+        bool: False when the league game log does not list the game yet.
+    """
+    from cleaning_data.cleaning_script import clean_current_player_data, clean_current_team_ratings
+    from scraping_data import utils
+    from scraping_data.scrape_games import scrape_game
+
+    scraped = scrape_game(game_id, game_log)
+    if scraped is None:
+        return False
+    team_data, player_data = scraped
+
+    conn = utils.psql()
+    try:
+        # The cleaning steps report their own errors instead of raising, so
+        # success is read back from the tables
+        if not published(conn, 'clean_player_data', game_id):
+            clean_current_player_data(player_data, game_date)
+        if not published(conn, 'clean_team_data', game_id):
+            clean_current_team_ratings(team_data)
+        missing = [table for table in ('clean_player_data', 'clean_team_data') if not published(conn, table, game_id)]
+    finally:
+        conn.close()
+    if missing:
+        raise RuntimeError(f"cleaning did not upload {', '.join(missing)}")
+    return True
+
+
+class GameScheduler:
+    """Polls the scoreboard and ingests each game once it is final.
+
+    Args:
+        ledger (Ledger): Game state store.
+        scoreboard (callable): date -> scoreboard GameHeader frame (GAME_ID, GAME_STATUS_ID).
+        ingest (callable): (game_id, game_date, game_log) -> bool, see ingest_game.
+        game_log (callable, optional): game_id -> leaguegamelog rows for its season,
+            fetched once per poll and shared by the games that finished together.
+    """
+
+    def __init__(self, ledger, scoreboard=None, ingest=ingest_game, game_log=None, max_attempts=MAX_ATTEMPTS):
+        if scoreboard is None:
+            from scraping_data.todays_matchups import get_matchups
+
+            scoreboard = lambda day: get_matchups(game_date=day)
+        if game_log is None:
+            from scraping_data.scrape_games import fetch_game_log, game_season
+
+            game_log = lambda game_id: fetch_game_log(*game_season(game_id))
+        self.ledger = ledger
+        self.scoreboard = scoreboard
+        self.ingest = ingest
+        self.game_log = game_log
+        self.max_attempts = max_attempts
+        self.ledger.recover()
+
+    def observe(self, day):
+        board = self.scoreboard(day)
+        if board is None or board.empty:
+            return 0
+        for game_id, status in zip(board['GAME_ID'], board['GAME_STATUS_ID']):
+            self.ledger.observe(str(game_id), day, STATUSES.get(int(status), 'scheduled'))
+        return len(board)
+
+    def poll(self, now=None):
+        """Reads the open scoreboards and ingests every game that went final.
+
+        Returns:
+            dict: Counts of games seen, ingested, waiting on the game log and failed.
+        """
+        today = league_date(now)
+        counts = {'seen': 0, 'ingested': 0, 'waiting': 0, 'failed': 0}
+        for day in sorted(self.ledger.open_dates() | {today}):
+            counts['seen'] += self.observe(day)
+
+        logs = {}
+        for game_id, game_date in self.ledger.ready(self.max_attempts):
+            if not self.ledger.claim(game_id, self.max_attempts):
+                continue
+            start = time.perf_counter()
+            try:
+                season = game_id[:5]
+                if season not in logs:
+                    logs[season] = self.game_log(game_id)
+                if self.ingest(game_id, game_date, logs[season]):
+                    self.ledger.done(game_id)
+                    counts['ingested'] += 1
+                    print(f"{game_id} ({game_date}) ingested in {time.perf_counter() - start:.1f}s")
+                else:
+                    self.ledger.release(game_id)
+                    counts['waiting'] += 1
+                    # The cached log predates this game; fetch a fresh one next poll
+                    logs.pop(season, None)
+            except Exception as e:
+                self.ledger.fail(game_id, f"{type(e).__name__}: {e}")
+                counts['failed'] += 1
+                print(f"{game_id} ingestion failed: {e}\n{traceback.format_exc()}")
+        return counts
+
+    def next_poll(self, now=None):
+        """Seconds until the next poll: short while games are live or final, longer otherwise."""
+        statuses = self.ledger.counts(league_date(now))
+        if statuses.get('live') or statuses.get('final') or statuses.get('failed'):
+            return POLL_LIVE
+        if statuses.get('scheduled'):
+            return POLL_UPCOMING
+        return POLL_IDLE
+
+    def run(self, once=False):
+        from scraping_data import utils
+
+        while True:
+            try:
+                counts = self.poll()
+                print(f"{dt.now():%H:%M:%S} poll: {counts}")
+                if counts['failed']:
+                    utils.send_message(f"NBA INGEST: {counts['failed']} game(s) failed, will retry")
+            except Exception as e:
+                print(f"poll failed: {e}")
+            if once:
+                return
+            time.sleep(self.next_poll())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest each NBA game as soon as it goes final.")
+    parser.add_argument('--once', action='store_true', help="Poll once and exit.")
+    parser.add_argument('--ledger', default=None, help="SQLite ledger path (NBA_LEDGER).")
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+    args = parser.parse_args()
+
+    GameScheduler(Ledger(args.ledger), max_attempts=args.max_attempts).run(once=args.once)
@@ -0,0 +1,260 @@
+"""Stage-level timing and memory instrumentation for the daily pipeline.
+
+Wrap a step with the ``stage`` context manager or the ``instrumented``
+decorator and it records wall time, rows in/out, memory and the number
+of DB/HTTP calls made while it ran. ``finish_run`` writes every stage of the
+run to a local SQLite metrics table and a JSON run report under metrics/.
+
+Memory is process-wide, so it is only attributable to a stage that ran alone:
+
+    rss_peak_mb      the process's resident high-water mark when the stage ended
+    rss_growth_mb    change in resident memory from the stage's start to its end
+    traced_peak_mb   tracemalloc peak while the stage ran (NBA_PROFILE only)
+
+Pipeline DAG stages run concurrently; a stage that shared the process with
+another one is marked ``overlapped`` and its memory numbers include the other
+stages' allocations. Traced stages are serialized against each other, since
+tracemalloc keeps one peak per process; profile a stage with --from-stage or
+a serial run when its memory matters.
+
+Profiling is toggled per stage with the NBA_PROFILE environment variable:
+
+    NBA_PROFILE=predict_games:cprofile,recent_player_data:tracemalloc
+    NBA_PROFILE=all            # both profilers on every stage
+"""
+
+import cProfile
+import functools
+import json
+import os
+import resource
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime as dt
+
+
+METRICS_DIR = os.environ.get('NBA_METRICS_DIR', os.path.join(os.getcwd(), 'metrics'))
+
+_local = threading.local()
+_lock = threading.Lock()
+_run = {'run_id': None, 'name': None, 'started_at': None, 'stages': []}
+# Stage records running right now, in any thread
+_active = []
+# One traced stage at a time (re-entrant for nested stages in the same thread)
+_trace_lock = threading.RLock()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _rss_peak_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def _rss_mb():
+    """Current resident memory; the high-water mark where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return _rss_peak_mb()
+
+
+def _traces():
+    # Per thread: peak seen so far by each open traced stage, outermost first
+    if not hasattr(_local, 'traces'):
+        _local.traces = []
+    return _local.traces
+
+
+def profile_modes(name):
+    """Returns the profilers NBA_PROFILE enables for a stage."""
+    modes = set()
+    for entry in filter(None, os.environ.get('NBA_PROFILE', '').split(',')):
+        stage_name, _, mode = entry.strip().partition(':')
+        if stage_name in ('all', name):
+            modes.update([mode] if mode else ['cprofile', 'tracemalloc'])
+    return modes
+
+
+def count_call(kind, n=1):
+    """Counts a DB or HTTP call against every stage running in this thread."""
+    for record in _stack():
+        record['calls'][kind] = record['calls'].get(kind, 0) + n
+
+
+def _rows(value):
+    if hasattr(value, 'shape') and hasattr(value, 'columns'):
+        return len(value)
+    if isinstance(value, dict):
+        counts = [_rows(v) for v in value.values()]
+    elif isinstance(value, (list, tuple)):
+        counts = [_rows(v) for v in value]
+    else:
+        return None
+    counts = [c for c in counts if c is not None]
+    return sum(counts) if counts else None
+
+
+def start_run(name):
+    """Starts a new run; stages recorded afterwards belong to it."""
+    with _lock:
+        _run.update(run_id=dt.now().strftime('%Y%m%dT%H%M%S'), name=name,
+                    started_at=dt.now().isoformat(), stages=[])
+    return _run['run_id']
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Records one pipeline stage.
+
+    Args:
+        name (str): Stage name used in the metrics table and NBA_PROFILE.
+        rows_in (int, optional): Rows entering the stage.
+
+    Yields:
+        dict: The stage record; set record['rows_out'] before leaving the block.
+    """
+    if _run['run_id'] is None:
+        start_run(os.path.basename(sys.argv[0]) or 'interactive')
+
+    record = {'run_id': _run['run_id'], 'stage': name, 'rows_in': rows_in, 'rows_out': None,
+              'calls': {}, 'status': 'ok', 'thread': threading.current_thread().name,
+              'started_at': dt.now().isoformat(), 'overlapped': False}
+    modes = profile_modes(name)
+    traced = 'tracemalloc' in modes
+
+    profiler = cProfile.Profile() if 'cprofile' in modes else None
+    started_tracing = False
+    if traced:
+        _trace_lock.acquire()
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        # An enclosing traced stage keeps the peak it reached before this one resets it
+        traces = _traces()
+        if traces:
+            traces[-1] = max(traces[-1], tracemalloc.get_traced_memory()[1])
+        traces.append(0)
+        tracemalloc.reset_peak()
+    rss_before = _rss_mb()
+
+    with _lock:
+        # Nested stages in one thread are not concurrent with their parent
+        others = [r for r in _active if r['thread'] != record['thread']]
+        for other in others:
+            other['overlapped'] = True
+        record['overlapped'] = bool(others)
+        _active.append(record)
+
+    _stack().append(record)
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException:
+        record['status'] = 'failed'
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        record['wall_s'] = time.perf_counter() - start
+        _stack().pop()
+        with _lock:
+            _active.remove(record)
+
+        record['rss_peak_mb'] = _rss_peak_mb()
+        record['rss_growth_mb'] = _rss_mb() - rss_before
+        if traced:
+            traces = _traces()
+            peak = max(traces.pop(), tracemalloc.get_traced_memory()[1])
+            record['traced_peak_mb'] = peak / 1e6
+            if traces:
+                traces[-1] = max(traces[-1], peak)
+            if started_tracing:
+                tracemalloc.stop()
+            _trace_lock.release()
+        if profiler:
+            os.makedirs(os.path.join(METRICS_DIR, 'profiles'), exist_ok=True)
+            record['profile'] = os.path.join(METRICS_DIR, 'profiles', f"{record['run_id']}_{name}.prof")
+            profiler.dump_stats(record['profile'])
+
+        with _lock:
+            _run['stages'].append(record)
+        print(f"[stage] {name}: {record['wall_s']:.2f}s rows {record['rows_in']}->{record['rows_out']} "
+              f"calls {record['calls']} peak rss {record['rss_peak_mb']:.0f} MB "
+              f"({record['rss_growth_mb']:+.0f} MB{', overlapped' if record['overlapped'] else ''})")
+
+
+def instrumented(name=None):
+    """Decorator form of ``stage`` that counts DataFrame rows in and out automatically."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, rows_in=_rows(list(args) + list(kwargs.values()))) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = _rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def finish_run():
+    """Writes the current run to metrics/pipeline_metrics.db and metrics/runs/<run_id>.json.
+
+    Returns:
+        str: Path of the JSON run report, or None if no stage ran.
+    """
+    with _lock:
+        run = dict(_run, stages=list(_run['stages']))
+        _run.update(run_id=None, name=None, started_at=None, stages=[])
+    if run['run_id'] is None:
+        return None
+
+    os.makedirs(os.path.join(METRICS_DIR, 'runs'), exist_ok=True)
+    report_path = os.path.join(METRICS_DIR, 'runs', f"{run['run_id']}.json")
+    run['finished_at'] = dt.now().isoformat()
+    with open(report_path, 'w') as file:
+        json.dump(run, file, indent=2, default=str)
+
+    with sqlite3.connect(os.path.join(METRICS_DIR, 'pipeline_metrics.db')) as db:
+        db.execute("""
+            create table if not exists stage_metrics (
+                run_id text, run_name text, stage text, status text, started_at text,
+                wall_s real, rows_in integer, rows_out integer, db_calls integer, http_calls integer,
+                rss_peak_mb real, rss_growth_mb real, traced_peak_mb real, overlapped integer
+            )""")
+        # Tables created before stages were marked overlapped
+        if 'overlapped' not in [row[1] for row in db.execute("pragma table_info(stage_metrics)")]:
+            db.execute("alter table stage_metrics add column overlapped integer")
+        db.executemany(
+            "insert into stage_metrics values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(r['run_id'], run['name'], r['stage'], r['status'], r['started_at'], r['wall_s'],
+              r['rows_in'], r['rows_out'], r['calls'].get('db', 0), r['calls'].get('http', 0),
+              r['rss_peak_mb'], r['rss_growth_mb'], r.get('traced_peak_mb'), int(r['overlapped']))
+             for r in run['stages']])
+
+    print(f"run report written to {report_path}")
+    return report_path
+
+
+@contextmanager
+def pipeline_run(name):
+    """Groups the stages of one entry point run and writes the report when it ends."""
+    start_run(name)
+    try:
+        yield
+    finally:
+        finish_run()
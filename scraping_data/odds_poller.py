@@ -0,0 +1,333 @@
+"""Long-running odds refresh that polls each event harder as tip-off nears.
+
+    python -m scraping_data.odds_poller                  # run until stopped
+    python -m scraping_data.odds_poller --daily-budget 300 --markets points rebounds
+
+Each event's board is refreshed on an interval set by the time left before
+its commence_time:
+
+    more than 6h    every 2h
+    3h - 6h         every 60 min
+    1h - 3h         every 20 min
+    last hour       every 5 min
+    started         never again
+
+Every odds call costs markets x regions requests of the odds API's monthly
+quota. The API reports the quota on each response (x-requests-used,
+x-requests-remaining, x-requests-last); QuotaBudget keeps those readings in a
+small JSON file so a restart does not reset the day's spend. The day's budget
+is the smaller of --daily-budget and an even split of the remaining monthly
+quota over the days left in the month. Before each round the poller counts
+the calls the schedule above would make until the last tip-off; when that is
+more than the budget left, every interval is stretched by the same factor, so
+spend stays inside the budget while the last hour still gets the densest
+refreshes. Refreshed boards are appended like gather_odds' (player_<market>_odds);
+with --rescore the moved lines are also re-scored into <cat>_classifications
+(see models/incremental_scoring.py) by a scorer rebuilt for each league date.
+"""
+
+import argparse
+import calendar
+import json
+import os
+import time
+import traceback
+from datetime import datetime as dt, timedelta, timezone
+
+from scraping_data.game_scheduler import LEAGUE_TZ, ROLLOVER_HOURS, league_date
+
+
+STATE_PATH = os.environ.get('NBA_ODDS_STATE', os.path.join(os.getcwd(), 'odds_quota.json'))
+
+DAILY_BUDGET = int(os.environ.get('NBA_ODDS_DAILY_BUDGET', 400))
+# Requests of the monthly quota never spent by the poller
+RESERVE = 50
+
+# (time to tip-off under, refresh every), closest first; beyond the last, DEFAULT_INTERVAL
+INTERVALS = [
+    (timedelta(hours=1), timedelta(minutes=5)),
+    (timedelta(hours=3), timedelta(minutes=20)),
+    (timedelta(hours=6), timedelta(minutes=60)),
+]
+DEFAULT_INTERVAL = timedelta(hours=2)
+
+# Seconds between rounds, and how often the events list is re-read
+TICK = 60
+EVENTS_INTERVAL = timedelta(minutes=30)
+# Events never refreshed cost a call at any stretch, so the search stops here
+MAX_STRETCH = 64
+
+
+def refresh_interval(to_tip):
+    """How often a board is refreshed while to_tip remains before its game."""
+    for limit, interval in INTERVALS:
+        if to_tip <= limit:
+            return interval
+    return DEFAULT_INTERVAL
+
+
+def planned_calls(commence, last, now, stretch=1.0):
+    """Odds calls the schedule makes for one event from now until it starts."""
+    calls = 0
+    at = now if last is None else max(now, last + refresh_interval(commence - now) * stretch)
+    while at < commence:
+        calls += 1
+        at += refresh_interval(commence - at) * stretch
+    return calls
+
+
+def slate_end(now):
+    """UTC end of the league date now belongs to (the next day's rollover, Eastern)."""
+    next_day = league_date(now) + timedelta(days=1)
+    return dt(next_day.year, next_day.month, next_day.day, ROLLOVER_HOURS, tzinfo=LEAGUE_TZ).astimezone(timezone.utc)
+
+
+def parse_time(value):
+    """Odds API timestamp ('2025-01-14T00:10:00Z') as an aware datetime."""
+    return dt.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def slate_scorer(markets):
+    """An IncrementalScorer over today's feature rows, built the way run_predictions builds them."""
+    from models.incremental_scoring import IncrementalScorer
+    from models.predict_new_games import recent_player_data
+    from models.scoring import MARKETS
+    from scraping_data.roster_cache import get_roster
+    from scraping_data.todays_matchups import get_matchups
+
+    full_data, _ = recent_player_data(None, get_roster(get_matchups()))
+    if full_data is None:
+        raise RuntimeError("no feature rows for today's players")
+    return IncrementalScorer.for_slate(full_data, [MARKETS[market] for market in markets])
+
+
+class SlateRescorer:
+    """The poller's rescore hook: applies boards to the slate's scorer, rebuilt each league date.
+
+    Args:
+        markets (list): Betting line columns polled.
+        build (callable): markets -> IncrementalScorer; slate_scorer by default.
+    """
+
+    def __init__(self, markets, build=slate_scorer):
+        self.markets = markets
+        self.build = build
+        self.scorer = None
+        self.day = None
+
+    def __call__(self, boards, now=None):
+        today = league_date(now)
+        # Yesterday's players and features do not carry over to today's slate
+        if self.day != today:
+            self.scorer = self.build(self.markets)
+            self.day = today
+        return self.scorer.apply(boards)
+
+
+class QuotaBudget:
+    """Daily spend of the odds API quota, read from the API's usage headers.
+
+    Args:
+        path (str): JSON file the readings persist to.
+        daily (int): Most requests spent per league date.
+        reserve (int): Monthly requests never spent.
+    """
+
+    def __init__(self, path=None, daily=DAILY_BUDGET, reserve=RESERVE):
+        self.path = path or STATE_PATH
+        self.daily = daily
+        self.reserve = reserve
+        self.state = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.state = json.load(f)
+
+    def _save(self):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def observe(self, headers, now=None):
+        """Records one response's x-requests-* headers; returns the request's cost."""
+        try:
+            used = int(float(headers['x-requests-used']))
+            remaining = int(float(headers['x-requests-remaining']))
+        except (KeyError, TypeError, ValueError):
+            return 0
+        cost = int(float(headers.get('x-requests-last') or 0))
+        today = league_date(now).isoformat()
+        # The first reading of a day (or after the monthly reset) starts its count
+        if self.state.get('date') != today or used < self.state.get('used_at_start', 0):
+            self.state['date'] = today
+            self.state['used_at_start'] = used - cost
+        self.state['used'] = used
+        self.state['remaining'] = remaining
+        self._save()
+        return cost
+
+    def spent(self, now=None):
+        if self.state.get('date') != league_date(now).isoformat():
+            return 0
+        return self.state['used'] - self.state['used_at_start']
+
+    def limit(self, now=None):
+        """Requests allowed today: --daily-budget, or less when the month's quota is running out."""
+        remaining = self.state.get('remaining')
+        if remaining is None:
+            return self.daily
+        day = league_date(now)
+        days_left = calendar.monthrange(day.year, day.month)[1] - day.day + 1
+        return min(self.daily, self.spent(now) + max(remaining - self.reserve, 0) // days_left)
+
+    def available(self, now=None):
+        return max(self.limit(now) - self.spent(now), 0)
+
+
+class OddsPoller:
+    """Refreshes each event's prop boards on the adaptive schedule within the quota budget.
+
+    Args:
+        budget (QuotaBudget): Quota readings and the daily limit.
+        markets (tuple): Betting line columns to pull, e.g. ('points', 'rebounds').
+        events (callable): (start, end) -> (event dicts, headers), see scrape_odds.fetch_events.
+        odds (callable): (event_id, markets) -> odds API response, see scrape_odds.fetch_event_odds.
+        upload (callable): {line column: board} -> None; scrape_odds.upload_boards by default.
+        rescore (callable, optional): {line column: board} -> None, run after each upload,
+            e.g. SlateRescorer.
+    """
+
+    def __init__(self, budget, markets=('points',), events=None, odds=None, upload=None, rescore=None):
+        from scraping_data import scrape_odds
+
+        self.budget = budget
+        self.markets = tuple(markets)
+        self.fetch_events = events or scrape_odds.fetch_events
+        self.fetch_odds = odds or scrape_odds.fetch_event_odds
+        self.upload = upload or self._upload
+        self.rescore = rescore
+        # One request per market in the one region until the API reports otherwise
+        self.cost = len(self.markets)
+        self.events = {}
+        self.last = {}
+        self.events_at = None
+        self.exhausted_on = None
+
+    def _upload(self, boards):
+        from scraping_data import utils
+        from scraping_data.scrape_odds import upload_boards
+
+        psql = utils.psql()
+        try:
+            upload_boards(boards, psql)
+        finally:
+            psql.close()
+
+    def refresh_events(self, now):
+        """Re-reads the slate's events, dropping any that started."""
+        data, headers = self.fetch_events(now, slate_end(now))
+        self.budget.observe(headers, now)
+        self.events = {event['id']: parse_time(event['commence_time']) for event in data}
+        self.last = {event_id: at for event_id, at in self.last.items() if event_id in self.events}
+        self.events_at = now
+
+    def upcoming(self, now):
+        return {event_id: commence for event_id, commence in self.events.items() if commence > now}
+
+    def stretch(self, now):
+        """Factor on every interval that keeps the planned calls within today's budget."""
+        upcoming = self.upcoming(now)
+        available = self.budget.available(now)
+        planned = sum(planned_calls(commence, self.last.get(event_id), now) for event_id, commence in upcoming.items())
+        if not planned or planned * self.cost <= available:
+            return 1.0
+        if available < self.cost:
+            return float('inf')
+        # Raise the stretch until the schedule fits; the plan shrinks roughly inversely
+        stretch = planned * self.cost / available
+        while stretch < MAX_STRETCH and sum(planned_calls(commence, self.last.get(event_id), now, stretch)
+                                            for event_id, commence in upcoming.items()) * self.cost > available:
+            stretch *= 1.25
+        return stretch
+
+    def due(self, now, stretch=1.0):
+        """Upcoming event ids whose board is older than their interval, soonest tip-off first."""
+        due = [(commence, event_id) for event_id, commence in self.upcoming(now).items()
+               if self.last.get(event_id) is None or now - self.last[event_id] >= refresh_interval(commence - now) * stretch]
+        return [event_id for _, event_id in sorted(due)]
+
+    def poll(self, now=None):
+        """One round: refreshes the events list when stale, then every board that is due.
+
+        Returns:
+            dict: Events upcoming and refreshed, calls skipped for budget, today's spend and limit.
+        """
+        from scraping_data.scrape_odds import parse_markets
+
+        now = now or dt.now(timezone.utc)
+        if self.events_at is None or now - self.events_at >= EVENTS_INTERVAL or league_date(self.events_at) != league_date(now):
+            self.refresh_events(now)
+
+        stretch = self.stretch(now)
+        due = self.due(now, stretch) if stretch != float('inf') else []
+        counts = {'upcoming': len(self.upcoming(now)), 'refreshed': 0, 'skipped': 0}
+        payloads = []
+        for event_id in due:
+            if self.budget.available(now) < self.cost:
+                counts['skipped'] += 1
+                continue
+            response = self.fetch_odds(event_id, self.markets)
+            self.cost = self.budget.observe(response.headers, now) or self.cost
+            self.last[event_id] = now
+            if response.status_code != 200:
+                print(f"odds for {event_id} returned {response.status_code}")
+                continue
+            payloads.append(response.json())
+            counts['refreshed'] += 1
+
+        if payloads:
+            boards = parse_markets(payloads, self.markets)
+            self.upload(boards)
+            if self.rescore is not None:
+                self.rescore(boards)
+        if stretch == float('inf') or counts['skipped']:
+            self._exhausted(now)
+        counts.update(stretch=round(stretch, 2) if stretch != float('inf') else None,
+                      spent=self.budget.spent(now), limit=self.budget.limit(now))
+        return counts
+
+    def _exhausted(self, now):
+        from scraping_data import utils
+
+        today = league_date(now)
+        if self.exhausted_on != today:
+            self.exhausted_on = today
+            utils.send_message(f"NBA ODDS: daily quota budget of {self.budget.limit(now)} requests spent, "
+                               "boards stop refreshing until tomorrow")
+
+    def run(self):
+        while True:
+            try:
+                counts = self.poll()
+                if counts['refreshed'] or counts['skipped']:
+                    print(f"{dt.now():%H:%M:%S} odds poll: {counts}")
+            except Exception as e:
+                print(f"odds poll failed: {e}\n{traceback.format_exc()}")
+            time.sleep(TICK)
+
+
+if __name__ == "__main__":
+    from scraping_data.scrape_odds import ODDS_API_MARKETS
+
+    parser = argparse.ArgumentParser(description="Refresh player prop odds more often as each game nears tip-off.")
+    parser.add_argument('--markets', nargs='+', default=['points'], choices=sorted(ODDS_API_MARKETS))
+    parser.add_argument('--daily-budget', type=int, default=DAILY_BUDGET,
+                        help="Most odds API requests spent per league date (NBA_ODDS_DAILY_BUDGET).")
+    parser.add_argument('--reserve', type=int, default=RESERVE, help="Monthly requests never spent.")
+    parser.add_argument('--state', default=None, help="Quota state file (NBA_ODDS_STATE).")
+    parser.add_argument('--rescore', action='store_true',
+                        help="Re-score moved lines into <cat>_classifications as boards refresh.")
+    args = parser.parse_args()
+
+    rescore = SlateRescorer(args.markets) if args.rescore else None
+    OddsPoller(QuotaBudget(args.state, args.daily_budget, args.reserve), args.markets, rescore=rescore).run()
@@ -0,0 +1,274 @@
+"""Small DAG runner for the daily entry points.
+
+Stages declare the artifacts they read and write; a stage starts as soon as
+its inputs exist, so independent stages (cleaning players and teams, pulling
+odds while the feature queries run) overlap on a thread pool. Every output
+is checkpointed under checkpoints/<pipeline>/<date>/ (DataFrames as Parquet),
+which lets a crashed run pick up again:
+
+    python main.py --from-stage clean_teams   # rerun clean_teams and everything after it
+    python main.py --resume                   # skip stages that already finished today
+
+The critical path of each run is printed at the end.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime as dt
+
+import pandas as pd
+
+
+CHECKPOINT_DIR = os.environ.get('NBA_CHECKPOINT_DIR', os.path.join(os.getcwd(), 'checkpoints'))
+
+
+class StopPipeline(Exception):
+    """Raised by a stage to end the run early without an error (e.g. no games today)."""
+
+
+class CheckpointStore:
+    """Persists stage outputs for one pipeline run.
+
+    DataFrames are written as Parquet, dicts of DataFrames as a directory of
+    Parquet files, and dates/scalars as JSON. manifest.json records which
+    stages finished and what they produced.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as file:
+                self.manifest = json.load(file)
+        else:
+            self.manifest = {'stages': {}, 'artifacts': {}}
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def save(self, name, value):
+        path = self._path(name)
+        if isinstance(value, pd.DataFrame):
+            value.to_parquet(f'{path}.parquet', index=False)
+            kind = 'frame'
+        elif isinstance(value, dict) and all(isinstance(v, pd.DataFrame) for v in value.values()):
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            for key, frame in value.items():
+                frame.to_parquet(os.path.join(path, f'{key}.parquet'), index=False)
+            kind = 'frames'
+        elif isinstance(value, (date, dt)):
+            with open(f'{path}.json', 'w') as file:
+                json.dump(value.isoformat(), file)
+            kind = 'datetime' if isinstance(value, dt) else 'date'
+        else:
+            with open(f'{path}.json', 'w') as file:
+                json.dump(value, file)
+            kind = 'json'
+        with self._lock:
+            self.manifest['artifacts'][name] = kind
+
+    def load(self, name):
+        kind = self.manifest['artifacts'].get(name)
+        path = self._path(name)
+        if kind == 'frame':
+            return pd.read_parquet(f'{path}.parquet')
+        if kind == 'frames':
+            return {file[:-len('.parquet')]: pd.read_parquet(os.path.join(path, file))
+                    for file in sorted(os.listdir(path))}
+        if kind is None:
+            raise KeyError(f"no checkpoint for '{name}' in {self.root}")
+        with open(f'{path}.json') as file:
+            value = json.load(file)
+        if kind == 'date':
+            return date.fromisoformat(value)
+        if kind == 'datetime':
+            return dt.fromisoformat(value)
+        return value
+
+    def completed(self, stage_name):
+        return self.manifest['stages'].get(stage_name, {}).get('status') == 'ok'
+
+    def record(self, stage_name, status, wall_s):
+        with self._lock:
+            self.manifest['stages'][stage_name] = {'status': status, 'wall_s': wall_s,
+                                                   'finished_at': dt.now().isoformat()}
+            with open(self.manifest_path, 'w') as file:
+                json.dump(self.manifest, file, indent=2)
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), outputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+
+class Pipeline:
+    """A set of stages wired together by the artifacts they read and write.
+
+    Args:
+        name (str): Pipeline name, used for the checkpoint directory.
+        max_workers (int): Stages allowed to run at once.
+        checkpoint_dir (str, optional): Root of the checkpoint store.
+    """
+
+    def __init__(self, name, max_workers=4, checkpoint_dir=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.checkpoint_dir = checkpoint_dir or CHECKPOINT_DIR
+        self.stages = {}
+
+    def add(self, name, func, inputs=(), outputs=()):
+        """Registers a stage. func is called with the input artifacts in order and
+        returns one value per output (a tuple when there are several)."""
+        if name in self.stages:
+            raise ValueError(f"duplicate stage {name}")
+        self.stages[name] = Stage(name, func, inputs, outputs)
+        return self
+
+    def _producers(self):
+        producers = {}
+        for stage in self.stages.values():
+            for output in stage.outputs:
+                producers[output] = stage.name
+        return producers
+
+    def dependencies(self, stage):
+        producers = self._producers()
+        missing = [i for i in stage.inputs if i not in producers]
+        if missing:
+            raise ValueError(f"stage {stage.name} reads {missing}, which no stage produces")
+        return {producers[i] for i in stage.inputs}
+
+    def downstream(self, name):
+        """The stage and every stage that depends on it, directly or not."""
+        found, frontier = {name}, [name]
+        while frontier:
+            current = frontier.pop()
+            for stage in self.stages.values():
+                if stage.name not in found and current in self.dependencies(stage):
+                    found.add(stage.name)
+                    frontier.append(stage.name)
+        return found
+
+    def run(self, from_stage=None, resume=False, run_key=None):
+        """Runs the pipeline.
+
+        Args:
+            from_stage (str, optional): Rerun this stage and everything downstream of it,
+                loading the other stages' outputs from today's checkpoints.
+            resume (bool): Skip stages that already finished in today's checkpoints.
+            run_key (str, optional): Checkpoint folder, defaults to today's date.
+
+        Returns:
+            dict: Every artifact produced or loaded, keyed by name.
+        """
+        store = CheckpointStore(os.path.join(self.checkpoint_dir, self.name, run_key or date.today().isoformat()))
+        to_run = set(self.stages)
+        if from_stage is not None:
+            if from_stage not in self.stages:
+                raise ValueError(f"unknown stage {from_stage}; stages: {list(self.stages)}")
+            to_run = self.downstream(from_stage)
+        elif resume:
+            to_run = {name for name in self.stages if not store.completed(name)}
+
+        artifacts, timings = {}, {}
+        for name in [name for name in self.stages if name not in to_run]:
+            for output in self.stages[name].outputs:
+                artifacts[output] = store.load(output)
+            print(f"[pipeline] {name}: loaded from checkpoint")
+
+        done = set(self.stages) - to_run
+        pending = set(to_run)
+        stopped = None
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as pool:
+            running = {}
+            while pending or running:
+                if stopped is None:
+                    for name in sorted(pending):
+                        if self.dependencies(self.stages[name]) <= done:
+                            pending.discard(name)
+                            running[pool.submit(self._run_stage, self.stages[name], artifacts, store)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        outputs, timings[name] = future.result()
+                    except StopPipeline as e:
+                        stopped = e
+                        print(f"[pipeline] {name}: stopping, {e}")
+                        continue
+                    artifacts.update(outputs)
+                    done.add(name)
+
+        print(f"[pipeline] {self.name}: {time.perf_counter() - start:.2f}s wall")
+        self.print_critical_path(timings)
+        return artifacts
+
+    def _run_stage(self, stage, artifacts, store):
+        print(f"[pipeline] {stage.name}: starting")
+        start = time.perf_counter()
+        try:
+            result = stage.func(*[artifacts[i] for i in stage.inputs])
+        except StopPipeline:
+            store.record(stage.name, 'stopped', time.perf_counter() - start)
+            raise
+        except BaseException:
+            store.record(stage.name, 'failed', time.perf_counter() - start)
+            raise
+        wall_s = time.perf_counter() - start
+
+        values = result if len(stage.outputs) > 1 else (result,)
+        if len(stage.outputs) > 1 and (not isinstance(result, tuple) or len(result) != len(stage.outputs)):
+            raise ValueError(f"stage {stage.name} should return {len(stage.outputs)} values")
+        outputs = dict(zip(stage.outputs, values))
+        for name, value in outputs.items():
+            try:
+                store.save(name, value)
+            except Exception as e:
+                # A failed checkpoint only costs resumability, not the run
+                print(f"[pipeline] could not checkpoint {name}: {e}")
+        store.record(stage.name, 'ok', wall_s)
+        print(f"[pipeline] {stage.name}: done in {wall_s:.2f}s")
+        return outputs, wall_s
+
+    def critical_path(self, timings):
+        """Longest chain of dependent stages by wall time among the stages that ran.
+
+        Returns:
+            tuple: (list of stage names, total seconds)
+        """
+        best = {}
+
+        def longest(name):
+            if name not in best:
+                deps = [d for d in self.dependencies(self.stages[name]) if d in timings]
+                prior = max((longest(d) for d in deps), key=lambda path: path[1], default=([], 0.0))
+                best[name] = (prior[0] + [name], prior[1] + timings[name])
+            return best[name]
+
+        return max((longest(name) for name in timings), key=lambda path: path[1], default=([], 0.0))
+
+    def print_critical_path(self, timings):
+        path, total = self.critical_path(timings)
+        if path:
+            chain = ' -> '.join(f'{name} ({timings[name]:.2f}s)' for name in path)
+            print(f"[pipeline] critical path: {chain} = {total:.2f}s")
+
+
+def add_arguments(parser):
+    """Adds the --from-stage / --resume options shared by the entry points."""
+    parser.add_argument('--from-stage', default=None, help="Rerun this stage and everything downstream of it")
+    parser.add_argument('--resume', action='store_true', help="Skip stages that already finished today")
+    return parser
@@ -0,0 +1,157 @@
+"""Today's players, resolved from the scoreboard to each team's active roster once per day.
+
+    python -m scraping_data.roster_cache            # resolve (or show) today's roster
+    python -m scraping_data.roster_cache --refresh  # fetch the rosters again
+
+get_matchups() returns one GameHeader row per game. slate_roster() turns it
+into one row per player with the integer keys recent_player_data joins on:
+
+    player_id  team_id  opponent  home  game_id
+
+Team rosters come from commonteamroster, one request per team, and are kept
+for the league date in ROSTER_DIR/<date>.parquet (int32 keys, sorted by
+team_id then player_id). Later runs that day, intraday re-predictions and
+the odds poller read the file instead of asking NBA.com again; a team
+missing from the day's file (a second slate, a late add) is fetched on its
+own and appended.
+"""
+
+import argparse
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+from scraping_data import utils
+from scraping_data.game_scheduler import league_date
+from scraping_data.scrape_games import game_season
+
+
+ROSTER_DIR = os.environ.get('NBA_ROSTER_DIR', os.path.join(os.getcwd(), 'roster_cache'))
+
+# Days of roster files kept
+KEEP_DAYS = 14
+
+ROSTER_COLUMNS = ['player_id', 'team_id', 'opponent', 'home', 'game_id']
+
+
+def slate_sides(games):
+    """Both sides of every scoreboard game: game_id, team_id, opponent, home."""
+    home = pd.DataFrame({'game_id': games['GAME_ID'].astype(str), 'team_id': games['HOME_TEAM_ID'],
+                         'opponent': games['VISITOR_TEAM_ID'], 'home': True})
+    away = pd.DataFrame({'game_id': games['GAME_ID'].astype(str), 'team_id': games['VISITOR_TEAM_ID'],
+                         'opponent': games['HOME_TEAM_ID'], 'home': False})
+    sides = pd.concat([home, away], ignore_index=True)
+    return sides.astype({'team_id': 'int32', 'opponent': 'int32'})
+
+
+def fetch_team_roster(team_id, season):
+    """A team's current roster from commonteamroster: player_id, team_id."""
+    response = utils.establish_requests(
+        f"https://stats.nba.com/stats/commonteamroster?LeagueID=00&Season={season}&TeamID={team_id}")
+    if response.status_code != 200:
+        raise RuntimeError(f"commonteamroster returned {response.status_code} for team {team_id}")
+    result_set = response.json()['resultSets'][0]
+    roster = pd.DataFrame(result_set['rowSet'], columns=result_set['headers'])
+    return pd.DataFrame({'player_id': roster['PLAYER_ID'], 'team_id': team_id}).astype('int32')
+
+
+class RosterCache:
+    """Team rosters per league date, fetched once and kept as a compact Parquet table.
+
+    Args:
+        cache_dir (str): Directory of the per-day files; ROSTER_DIR by default.
+        fetch (callable): (team_id, season) -> player_id, team_id frame; fetch_team_roster by default.
+    """
+
+    def __init__(self, cache_dir=None, fetch=fetch_team_roster):
+        self.cache_dir = cache_dir or ROSTER_DIR
+        self.fetch = fetch
+        self.loaded = {}
+
+    def path(self, day):
+        return os.path.join(self.cache_dir, f'{day.isoformat()}.parquet')
+
+    def load(self, day):
+        """The day's stored team rosters, or an empty frame."""
+        if day not in self.loaded:
+            path = self.path(day)
+            self.loaded[day] = (pd.read_parquet(path) if os.path.exists(path)
+                                else pd.DataFrame({'player_id': pd.Series(dtype='int32'),
+                                                   'team_id': pd.Series(dtype='int32')}))
+        return self.loaded[day]
+
+    def _store(self, day, rosters):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        rosters = rosters.sort_values(['team_id', 'player_id']).reset_index(drop=True)
+        tmp = f'{self.path(day)}.tmp'
+        rosters.to_parquet(tmp, index=False)
+        os.replace(tmp, self.path(day))
+        self.loaded[day] = rosters
+        self.prune()
+
+    def prune(self, keep_days=KEEP_DAYS, today=None):
+        """Removes the files of league dates more than keep_days before today."""
+        cutoff = (today or league_date()) - timedelta(days=keep_days)
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.parquet'):
+                continue
+            try:
+                day = date.fromisoformat(name[:-len('.parquet')])
+            except ValueError:
+                continue
+            if day < cutoff:
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def team_rosters(self, team_ids, season, day, refresh=False):
+        """Rosters of the given teams for the day, fetching only teams not stored yet."""
+        stored = self.load(day)
+        wanted = set(int(team_id) for team_id in team_ids)
+        missing = sorted(wanted if refresh else wanted - set(stored['team_id']))
+        if missing:
+            print(f"roster cache: fetching {len(missing)} team roster(s) for {day}")
+            stored = pd.concat([stored[~stored['team_id'].isin(missing)]]
+                               + [self.fetch(team_id, season) for team_id in missing], ignore_index=True)
+            self._store(day, stored)
+        return stored[stored['team_id'].isin(team_ids)]
+
+    def slate_roster(self, games, day=None, refresh=False):
+        """One row per player on today's slate: player_id, team_id, opponent, home, game_id.
+
+        Args:
+            games (pd.DataFrame): Scoreboard GameHeader rows (get_matchups()).
+            day (date, optional): League date the rosters are kept under; today's by default.
+            refresh (bool): Fetch every team again instead of reading the day's file.
+        """
+        if games is None or games.empty:
+            return pd.DataFrame(columns=ROSTER_COLUMNS)
+        day = day or league_date()
+        sides = slate_sides(games)
+        season = game_season(sides['game_id'].iloc[0])[0]
+        rosters = self.team_rosters(sides['team_id'].unique(), season, day, refresh)
+        roster = rosters.merge(sides, on='team_id', how='inner')
+        return roster[ROSTER_COLUMNS].reset_index(drop=True)
+
+
+_cache = None
+
+
+def get_roster(games, day=None, refresh=False):
+    """Today's slate roster through the process-wide RosterCache."""
+    global _cache
+    if _cache is None:
+        _cache = RosterCache()
+    return _cache.slate_roster(games, day, refresh)
+
+
+if __name__ == "__main__":
+    from scraping_data.todays_matchups import get_matchups
+
+    parser = argparse.ArgumentParser(description="Resolve today's games to the players on each active roster.")
+    parser.add_argument('--refresh', action='store_true', help="Fetch every team's roster again.")
+    parser.add_argument('--cache-dir', default=None, help="Roster files directory (NBA_ROSTER_DIR).")
+    args = parser.parse_args()
+
+    roster = RosterCache(args.cache_dir).slate_roster(get_matchups(), refresh=args.refresh)
+    print(roster.groupby(['game_id', 'team_id', 'home']).size().rename('players').reset_index())
+    print(f"{len(roster)} players")
@@ -0,0 +1,117 @@
+"""Declared column schema for frames moving through the pipeline.
+
+Frames coming back from NBA.com, the odds API and Postgres default to
+int64/float64/object columns. ``apply_schema`` casts them to the compact
+dtypes declared here and records how many bytes each stage saved so the
+inference box can be sized from ``memory_report()``.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Text columns with a small set of repeated values
+CATEGORICAL_COLUMNS = {
+    'team', 'team_abbreviation', 'team_name', 'player', 'player_name', 'Player',
+    'season', 'recommendation', 'matchup', 'wl',
+}
+
+# Box score counting stats (and their renamed variants) fit comfortably in int16
+INT16_COLUMNS = {
+    'fgm', 'fga', 'fg3m', 'fg3a', 'fgthree_m', 'fgthree_a', '3pm',
+    'ftm', 'fta', 'oreb', 'dreb', 'reb', 'ast', 'stl', 'blk',
+    'to', 'turnovers', 'pf', 'pts', 'plus_minus', 'season_start_year',
+    'game_rank', 'Over', 'Under',
+}
+
+# Identifiers are too large for int16 but not for int32
+INT32_COLUMNS = {'player_id', 'team_id'}
+
+# Rolling features produced by cleaning_script
+FLOAT32_SUFFIXES = ('_three_gm_avg', '_season', '_momentum')
+
+# Suffixes added by the merges in recent_player_data
+MERGE_SUFFIXES = ('_opponent', '_remove')
+
+# Columns that must never be cast (join keys stored as text, timestamps)
+PASSTHROUGH_COLUMNS = {'game_id', 'game_date', 'Date_Updated'}
+
+MEMORY_REPORT = []
+
+
+def _to_int(series, dtype):
+    """Casts to a fixed-width int when the values allow it, otherwise float32."""
+    values = pd.to_numeric(series, errors='coerce')
+    if values.notna().sum() != series.notna().sum():
+        # Leave text the schema does not understand alone rather than blanking it
+        return series
+    info = np.iinfo(dtype)
+    if values.notna().all() and values.between(info.min, info.max).all() and (values % 1 == 0).all():
+        return values.astype(dtype)
+    return values.astype('float32')
+
+
+def _base_name(col):
+    for suffix in MERGE_SUFFIXES:
+        if col.endswith(suffix):
+            return col[:-len(suffix)]
+    return col
+
+
+def _cast_column(series, col):
+    base = _base_name(col)
+    if base in PASSTHROUGH_COLUMNS:
+        return series
+    if base in CATEGORICAL_COLUMNS:
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if base in INT16_COLUMNS:
+        return _to_int(series, np.int16)
+    if base in INT32_COLUMNS:
+        return _to_int(series, np.int32)
+    if series.dtype == 'float64':
+        return series.astype('float32')
+    if series.dtype == 'object' and base.endswith(FLOAT32_SUFFIXES):
+        # Postgres numeric columns come back as Decimal objects
+        converted = pd.to_numeric(series, errors='coerce')
+        if converted.notna().sum() == series.notna().sum():
+            return converted.astype('float32')
+    return series
+
+
+def frame_bytes(df):
+    """Returns the deep memory footprint of a frame in bytes."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def apply_schema(df, stage=None):
+    """Casts a frame to the declared pipeline schema.
+
+    Args:
+        df (pd.DataFrame): Frame fresh from a scrape or query.
+        stage (str, optional): Name recorded in the memory report.
+
+    Returns:
+        pd.DataFrame: Frame with compact dtypes.
+    """
+    if df is None or df.empty:
+        return df
+
+    before = frame_bytes(df)
+    df = df.copy()
+    for col in df.columns:
+        df[col] = _cast_column(df[col], col)
+    after = frame_bytes(df)
+
+    if stage is not None:
+        MEMORY_REPORT.append({'stage': stage, 'rows': len(df), 'bytes_before': before, 'bytes_after': after})
+        saved = 100 * (1 - after / before) if before else 0
+        print(f"[memory] {stage}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({saved:.0f}% smaller)")
+
+    return df
+
+
+def memory_report():
+    """Returns the bytes before/after for every stage that applied the schema."""
+    report = pd.DataFrame(MEMORY_REPORT, columns=['stage', 'rows', 'bytes_before', 'bytes_after'])
+    report['saved_pct'] = 100 * (1 - report['bytes_after'] / report['bytes_before'])
+    return report
@@ -6,14 +6,152 @@ import traceback
 from datetime import datetime as dt,timedelta
 
 import pandas as pd
-import pandas_gbq
 from scraping_data import utils
-from google.oauth2 import service_account
+from scraping_data.schema import apply_schema
+from scraping_data.instrumentation import instrumented
 
 
 num_retries = 0
 
 
+# Box score columns kept for cleaning, in upload order
+DESIRED_COLUMNS = [
+    'game_id', 'team_abbreviation', 'player_id', 'player_name', 'min',
+    'fgm', 'fga', 'fg_pct', 'fg3m', 'fg3a', 'fg3_pct',
+    'ftm', 'fta', 'ft_pct', 'oreb', 'dreb', 'reb',
+    'ast', 'stl', 'blk', 'to', 'pf', 'pts', 'plus_minus'
+]
+
+
+def parse_box_score(game_response, game):
+    """Flattens one boxscoretraditionalv3 payload into a row per player.
+
+    Args:
+        game_response (dict): Parsed JSON from the boxscoretraditionalv3 endpoint.
+        game (str): Game id the payload belongs to.
+
+    Returns:
+        pd.DataFrame: Player rows restricted to DESIRED_COLUMNS.
+    """
+    # Home team players
+    home_players = game_response['boxScoreTraditional']['homeTeam']['players']
+    home_df = pd.json_normalize(home_players)
+
+    # Away team players
+    away_players = game_response['boxScoreTraditional']['awayTeam']['players']
+    away_df = pd.json_normalize(away_players)
+
+    # Add context
+    home_df['team'] = game_response['boxScoreTraditional']['homeTeam']['teamTricode']
+    away_df['team'] = game_response['boxScoreTraditional']['awayTeam']['teamTricode']
+
+    # Combine
+    game_data = pd.concat([home_df, away_df], ignore_index=True) 
+
+    rename_map = {
+        'personId': 'player_id',
+        'statistics.minutes': 'min',
+        'statistics.fieldGoalsMade': 'fgm',
+        'statistics.fieldGoalsAttempted': 'fga',
+        'statistics.fieldGoalsPercentage': 'fg_pct',
+        'statistics.threePointersMade': 'fg3m',
+        'statistics.threePointersAttempted': 'fg3a',
+        'statistics.threePointersPercentage': 'fg3_pct',
+        'statistics.freeThrowsMade': 'ftm',
+        'statistics.freeThrowsAttempted': 'fta',
+        'statistics.freeThrowsPercentage': 'ft_pct',
+        'statistics.reboundsOffensive': 'oreb',
+        'statistics.reboundsDefensive': 'dreb',
+        'statistics.reboundsTotal': 'reb',
+        'statistics.assists': 'ast',
+        'statistics.steals': 'stl',
+        'statistics.blocks': 'blk',
+        'statistics.turnovers': 'to',
+        'statistics.foulsPersonal': 'pf',
+        'statistics.points': 'pts',
+        'statistics.plusMinusPoints': 'plus_minus',
+        'team': 'team_abbreviation'
+    }
+
+    game_data.rename(columns=rename_map,inplace=True)
+
+    game_data['min'] = game_data['min'].apply(lambda x: ''.join(x.split('.000000')) if isinstance(x, str) and '.000000' in x else x)
+
+
+    game_data['player_name'] = game_data.apply(lambda row: f"{row['firstName']} {row['familyName']}", axis=1)
+    game_data['game_id'] = game
+
+    # Drop all other columns
+    return game_data[[col for col in DESIRED_COLUMNS if col in game_data.columns]]
+
+
+def parse_game_log(data):
+    """Turns a leaguegamelog payload into one row per team game with game_date as a date."""
+    headers = [header.lower() for header in data['resultSets'][0]['headers']]
+    rows = data['resultSets'][0]['rowSet']
+    df = pd.DataFrame(rows,columns=headers)
+    df = df.drop(columns=['video_available'])
+    df['game_date'] = pd.to_datetime(df['game_date']).dt.date
+    return df
+
+
+def standardize_columns(df):
+    """Renames scraped stat columns to the names stored in Postgres ('fg3m' -> 'fgthree_m', 'to' -> 'turnovers')."""
+    df.columns = df.columns.str.replace('%', '_pct')
+    df.columns = df.columns.str.replace('3', 'three_')
+    if 'to' in df.columns:
+        df.rename(columns={'to': 'turnovers'}, inplace=True)
+    return df
+
+
+# Third digit of a game id -> leaguegamelog SeasonType
+SEASON_TYPES = {'1': 'Pre Season', '2': 'Regular Season', '4': 'Playoffs', '5': 'PlayIn'}
+
+
+def game_season(game_id):
+    """('2025-26', 'Regular Season') for a game id such as '0022500123'."""
+    start = 2000 + int(game_id[3:5])
+    return f'{start}-{(start + 1) % 100:02d}', SEASON_TYPES.get(game_id[2], 'Regular Season')
+
+
+def fetch_game_log(api_season, season_type):
+    """The season's leaguegamelog team rows."""
+    url = (f"https://stats.nba.com/stats/leaguegamelog?LeagueID=00&Season={api_season}"
+           f"&SeasonType={season_type.replace(' ', '%20')}&PlayerOrTeam=T&Counter=0&Sorter=DATE&Direction=DESC")
+    response = utils.establish_requests(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"leaguegamelog returned {response.status_code}")
+    return parse_game_log(response.json())
+
+
+@instrumented()
+def scrape_game(game_id, game_log=None):
+    """Scrapes one finished game, shaped like scrape_current_games' output.
+
+    Args:
+        game_id (str): Game id from the scoreboard.
+        game_log (pd.DataFrame, optional): leaguegamelog rows already fetched
+            for the game's season, so several finals can share one request.
+
+    Returns:
+        tuple: (team rows, player rows), or None while the game log does not list the game yet.
+    """
+    if game_log is None:
+        game_log = fetch_game_log(*game_season(game_id))
+    teams = game_log[game_log['game_id'] == game_id]
+    if len(teams) < 2:
+        return None
+
+    game_response = utils.establish_requests(
+        f"https://stats.nba.com/stats/boxscoretraditionalv3?GameID={game_id}&StartPeriod=0&EndPeriod=10").json()
+    players = parse_box_score(game_response, game_id)
+
+    teams = apply_schema(standardize_columns(teams.copy()), 'scrape_team_games')
+    players = apply_schema(standardize_columns(players), 'scrape_player_games')
+    return teams, players
+
+
+@instrumented()
 def scrape_current_games(retries):
     psql = utils.psql()
 
@@ -50,14 +188,8 @@ def scrape_current_games(retries):
             print(response.status_code)
             data = response.json()
 
-            headers = [header.lower() for header in data['resultSets'][0]['headers']]
-            rows = data['resultSets'][0]['rowSet']
-            df = pd.DataFrame(rows,columns=headers)
-            print(df)
-            df = df.drop(columns=['video_available'])
+            df = parse_game_log(data)
             print(df[['game_date','matchup']])
-            df['game_date'] = pd.to_datetime(df['game_date']).dt.date
-            print(df['game_date'])
 
             psql_table_id = f"{season}_team_ratings"
             df = df[df['game_date'] == scrape_date.date()]
@@ -78,78 +210,16 @@ def scrape_current_games(retries):
                 game_response = utils.establish_requests(f"https://stats.nba.com/stats/boxscoretraditionalv3?GameID={game}&StartPeriod=0&EndPeriod=10")
                 game_response = game_response.json()
 
-                # Home team players
-                home_players = game_response['boxScoreTraditional']['homeTeam']['players']
-                home_df = pd.json_normalize(home_players)
-
-                # Away team players
-                away_players = game_response['boxScoreTraditional']['awayTeam']['players']
-                away_df = pd.json_normalize(away_players)
-
-                # Add context
-                home_df['team'] = game_response['boxScoreTraditional']['homeTeam']['teamTricode']
-                away_df['team'] = game_response['boxScoreTraditional']['awayTeam']['teamTricode']
-
-                # Combine
-                game_data = pd.concat([home_df, away_df], ignore_index=True) 
-
-                rename_map = {
-                    'personId': 'player_id',
-                    'statistics.minutes': 'min',
-                    'statistics.fieldGoalsMade': 'fgm',
-                    'statistics.fieldGoalsAttempted': 'fga',
-                    'statistics.fieldGoalsPercentage': 'fg_pct',
-                    'statistics.threePointersMade': 'fg3m',
-                    'statistics.threePointersAttempted': 'fg3a',
-                    'statistics.threePointersPercentage': 'fg3_pct',
-                    'statistics.freeThrowsMade': 'ftm',
-                    'statistics.freeThrowsAttempted': 'fta',
-                    'statistics.freeThrowsPercentage': 'ft_pct',
-                    'statistics.reboundsOffensive': 'oreb',
-                    'statistics.reboundsDefensive': 'dreb',
-                    'statistics.reboundsTotal': 'reb',
-                    'statistics.assists': 'ast',
-                    'statistics.steals': 'stl',
-                    'statistics.blocks': 'blk',
-                    'statistics.turnovers': 'to',
-                    'statistics.foulsPersonal': 'pf',
-                    'statistics.points': 'pts',
-                    'statistics.plusMinusPoints': 'plus_minus',
-                    'team': 'team_abbreviation'
-                }
-
-                game_data.rename(columns=rename_map,inplace=True)
-
-                game_data['min'] = game_data['min'].apply(lambda x: ''.join(x.split('.000000')) if isinstance(x, str) and '.000000' in x else x)
-
-
-                game_data['player_name'] = game_data.apply(lambda row: f"{row['firstName']} {row['familyName']}", axis=1)
-                game_data['game_id'] = game
-
-                games.append(game_data)
+                games.append(parse_box_score(game_response, game))
                 time.sleep(5)
             full_data = pd.concat(games)
-            # Your desired columns
-            desired_columns = [
-                'game_id', 'team_abbreviation', 'player_id', 'player_name', 'min',
-                'fgm', 'fga', 'fg_pct', 'fg3m', 'fg3a', 'fg3_pct',
-                'ftm', 'fta', 'ft_pct', 'oreb', 'dreb', 'reb',
-                'ast', 'stl', 'blk', 'to', 'pf', 'pts', 'plus_minus'
-            ]
-
-            # Drop all other columns
-            full_data = full_data[[col for col in desired_columns if col in full_data.columns]]
             psql_data = full_data.copy()
 
-            full_data.columns = full_data.columns.str.replace('%', '_pct')
-            full_data.columns = full_data.columns.str.replace('3', 'three_')
-            if 'to' in full_data.columns:
-                full_data.rename(columns={'to': 'turnovers'}, inplace=True)
-            df.columns = df.columns.str.replace('%', '_pct')
-            df.columns = df.columns.str.replace('3', 'three_')
-            if 'to' in df.columns:
-                df.rename(columns={'to': 'turnovers'}, inplace=True)
+            full_data = standardize_columns(full_data)
+            df = standardize_columns(df)
             print(psql_data)
+            df = apply_schema(df, 'scrape_team_games')
+            full_data = apply_schema(full_data, 'scrape_player_games')
             if len(full_data) > 0:
                 print(len(full_data))
                 utils.send_message('scraping of new games complete')
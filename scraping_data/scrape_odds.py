@@ -1,22 +1,33 @@
 """Module for scraping NBA player prop odds from DraftKings and uploading to BigQuery."""
 import json
-import yaml
 import time
 import traceback
 from datetime import datetime as dt
 from datetime import timedelta,timezone
 from scraping_data import utils
+from scraping_data.schema import apply_schema
+from scraping_data.instrumentation import count_call, instrumented
 import requests
 import pandas as pd
-import pandas_gbq
-import os
 
-current_wd = os.getcwd()
 
-with open(f'{current_wd}/config.yaml', mode='r') as file:
-    config = yaml.safe_load(file)
+ODDS_API = 'https://api.the-odds-api.com/v4/sports/basketball_nba'
 
-    api_key = config['api']
+
+def fetch_events(start, end):
+    """Odds API events commencing in [start, end), with the response's quota headers.
+
+    Returns:
+        tuple: (list of event dicts with id and commence_time, response headers).
+    """
+    api_key = utils.get_config()['api']
+    count_call('http')
+    response = requests.get(f'{ODDS_API}/events', params={
+        'apiKey': api_key,
+        'commenceTimeFrom': start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'commenceTimeTo': end.strftime("%Y-%m-%dT%H:%M:%SZ")})
+    response.raise_for_status()
+    return response.json(), response.headers
 
 
 def gather_events():
@@ -27,58 +38,124 @@ def gather_events():
     tomorrow = (dt.today() + timedelta(days=1)).replace(
         hour=7, minute=0, second=0, microsecond=0, tzinfo=timezone.utc
     )
-    tomorrow = tomorrow.strftime("%Y-%m-%dT%H:%M:%SZ")
-    today = today.strftime("%Y-%m-%dT%H:%M:%SZ")
-    data = requests.get(f'https://api.the-odds-api.com/v4/sports/basketball_nba/events?apiKey={api_key}&commenceTimeFrom={today}&commenceTimeTo={tomorrow}')
-    events = [data.json()[event]['id'] for event in range(len(data.json()))]
+    data, _ = fetch_events(today, tomorrow)
+    events = [event['id'] for event in data]
     events = list(set(events))
 
     return events
 # v4/sports/{sport}/events/{eventId}/odds?apiKey={apiKey}&regions={regions}&markets={markets}&dateFormat={dateFormat}&oddsFormat={oddsFormat}
 
 
-def process_categories(events):
-    """Scrapes NBA player prop odds from DraftKings and uploads data to BigQuery."""
+# Betting line column -> odds API market key
+ODDS_API_MARKETS = {
+    'points': 'player_points',
+    'rebounds': 'player_rebounds',
+    'assists': 'player_assists',
+    'threes': 'player_threes',
+}
+
+
+def fetch_event_odds(event_id, markets=('points',)):
+    """One odds API call for every requested prop market of an event; returns the response."""
+    market_keys = ','.join(ODDS_API_MARKETS[market] for market in markets)
+    api_key = utils.get_config()['api']
+    url = f'{ODDS_API}/events/{event_id}/odds?apiKey={api_key}&regions=us&markets={market_keys}&oddsFormat=american'
+    count_call('http')
+    return requests.get(url)
+
+
+def process_categories(events, markets=('points',)):
+    """Pulls every requested prop market for each event in one odds API call per event."""
     full_data = []
     for event in range(len(events)):
-        url =f'https://api.the-odds-api.com/v4/sports/basketball_nba/events/{events[event]}/odds?apiKey={api_key}&regions=us&markets=player_points&oddsFormat=american'
-        data = requests.get(url)
-        for i in range(len(data.json())):
-            full_data.append(data.json())
+        data = fetch_event_odds(events[event], markets)
+        full_data.append(data.json())
 
     return full_data
 
 
-def gather_odds():
+def parse_markets(data, markets=('points',)):
+    """Flattens event odds into one board per market with Over and Under priced side by side.
+
+    Args:
+        data (list): Event odds payloads from process_categories.
+        markets (tuple): Betting line columns requested, e.g. ('points', 'rebounds').
+
+    Returns:
+        dict: {line column: DataFrame of Player, line, Over, Under, Date_Updated}.
+    """
+    market_lines = {ODDS_API_MARKETS[market]: market for market in markets}
+    outcomes = []
+    for event in data:
+        if not event.get('bookmakers'):
+            continue
+        for market in event['bookmakers'][0]['markets']:
+            if market['key'] not in market_lines:
+                continue
+            for outcome in market['outcomes']:
+                outcomes.append({'market': market_lines[market['key']], 'Player': outcome['description'],
+                                 'line': outcome.get('point'), 'side': outcome['name'], 'price': outcome['price']})
+
+    columns = ['market', 'Player', 'line', 'side', 'price']
+    outcomes = pd.DataFrame(outcomes, columns=columns)
+    if outcomes.empty:
+        return {market: pd.DataFrame(columns=['Player', market, 'Over', 'Under', 'Date_Updated']) for market in markets}
+    boards = (outcomes.pivot_table(index=['market', 'Player', 'line'], columns='side', values='price', aggfunc='first')
+              .reindex(columns=['Over', 'Under'])
+              .reset_index())
+    boards['Date_Updated'] = pd.to_datetime(dt.today())
+
+    return {market: (boards[boards['market'] == market]
+                     .drop(columns='market')
+                     .rename(columns={'line': market})
+                     .rename_axis(columns=None)
+                     .reset_index(drop=True))
+            for market in markets}
+
+
+def ensure_odds_table(psql, board, table_name):
+    """Creates a market's Postgres odds table from its first board if it does not exist yet."""
+    exists = psql.query("SELECT to_regclass(%s) IS NOT NULL AS present", (table_name,))
+    if not bool(exists['present'].iloc[0]):
+        print(f"creating {table_name}")
+        psql.create_table(board, table_name)
+
+
+def upload_boards(boards, psql):
+    """Appends each market's board to BigQuery and Postgres (player_<market>_odds)."""
+    # BigQuery client libraries are slow to import, only load them when uploading
+    from scraping_data.warehouse_writer import WarehouseWriter
+
+    # Every market's board goes up in one flush at the end of the block
+    with WarehouseWriter() as writer:
+        for market, df in boards.items():
+            if df.empty:
+                continue
+            writer.append(df, f'player_{market}_odds', 'Date_Updated', ['Player'])
+            # Only the points table predates the other markets
+            ensure_odds_table(psql, df, f'player_{market}_odds')
+            psql.upload_data(df, f'player_{market}_odds')
+
+
+@instrumented()
+def gather_odds(markets=('points',)):
+    """Gathers today's player prop boards and uploads one odds table per market.
+
+    Args:
+        markets (tuple): Betting line columns to pull, e.g. ('points', 'rebounds').
+
+    Returns:
+        dict: {line column: odds board}.
+    """
     psql = utils.psql()
     events = gather_events()
     print(len(events))
-    if len(events) > 4:
-        data = process_categories(events)
-    else:
-        data = process_categories(events)
-
-    parsed_json = data[0]['bookmakers'][0]['markets'][0]['outcomes']
-    output = {'Player':[],'points':[],'Over':[],'Under':[],'Date_Updated':[]}
-    for i in range(len(parsed_json)):
-        if parsed_json[i]['name'] == 'Over':
-            output['Over'].append(parsed_json[i]['price'])
-            output['Player'].append(parsed_json[i]['description'])
-            output['points'].append(parsed_json[i]['point'])
-        else:
-            output['Under'].append(parsed_json[i]['price'])
-            output['Date_Updated'].append(pd.to_datetime(dt.today()))
-
-    df = pd.DataFrame(output)
-    pandas_gbq.to_gbq(
-        df,
-        project_id="miscellaneous-projects-444203",
-        destination_table="miscellaneous-projects-444203.capstone_data.player_points_odds",
-        if_exists="append"
-    )
-    psql.upload_data(df, 'player_points_odds')
+    data = process_categories(events, markets)
+
+    boards = parse_markets(data, markets)
+    upload_boards(boards, psql)
     psql.close()
 
     utils.send_message("player odds gathered and uploaded")
 
-    return df
+    return {market: apply_schema(df, f'gather_{market}_odds') for market, df in boards.items()}
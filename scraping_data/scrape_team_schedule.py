@@ -4,13 +4,12 @@ import time
 from datetime import datetime as dt
 from datetime import timedelta
 import pandas as pd
-import pandas_gbq
-import utils
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from tqdm import tqdm
-import utils
+from scraping_data import utils
+from scraping_data.warehouse_writer import WarehouseWriter
 
 
 NBA_TEAMS = [
@@ -109,14 +108,9 @@ def scrape_team_schedule(nba_teams):
     # Normalize team abbreviations
     combined_data["team"] = combined_data["team"].replace({"NO": "NOP", "UTAH": "UTA", "WSH": "WAS","NY":"NYK","GS":"GSW","SA":"SAC","LA":"LAC"})
 
-    # Upload to BigQuery
-    pandas_gbq.to_gbq(
-        combined_data,
-        project_id="miscellaneous-projects-444203",
-        destination_table="miscellaneous-projects-444203.capstone_data.schedule",
-        if_exists="replace",
-        table_schema=[{"name": "date", "type": "DATE"}]
-    )
+    # Upload to BigQuery, replacing only the game days that were scraped
+    with WarehouseWriter() as writer:
+        writer.overwrite_partitions(combined_data, 'schedule', 'date', ['team'])
 
     utils.upload_data(combined_data, 'schedule')
 
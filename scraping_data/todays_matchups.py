@@ -1,13 +1,14 @@
 import pandas as pd
-import pandas_gbq
 from datetime import date as dt
 # from datetime import timedelta
 import requests
+from scraping_data.instrumentation import count_call, instrumented
 
 
-def get_matchups(local=False):
-    # Set today's date in MM/DD/YYYY format
-    today = dt.today()
+@instrumented()
+def get_matchups(local=False, game_date=None):
+    # Scoreboard for game_date (today by default)
+    today = game_date or dt.today()
 
     # NBA API endpoint
     url = "https://stats.nba.com/stats/scoreboardv2"
@@ -23,6 +24,7 @@ def get_matchups(local=False):
     "Origin": "https://www.nba.com"}
 
     # Make the request
+    count_call('http')
     response = requests.get(url, headers=headers, params=params)
     print(response.status_code)
     if response.status_code == '200':
@@ -1,4 +1,5 @@
 import yaml
+import functools
 from io import StringIO
 import io
 import os
@@ -6,10 +7,18 @@ import pandas as pd
 import requests
 import psycopg2
 from datetime import datetime as dt
+from scraping_data.schema import apply_schema
+from scraping_data import instrumentation
 
-config = os.getcwd()
-with open('config.yaml', 'r') as file:
-    config = yaml.safe_load(file)
+@functools.lru_cache(maxsize=None)
+def _read_config(path):
+    with open(path, 'r') as file:
+        return yaml.safe_load(file)
+
+
+def get_config(path='config.yaml'):
+    """Returns config.yaml (relative to the working directory), read once per path."""
+    return _read_config(os.path.abspath(path))
 
 
 def establish_requests(url, params=False):
@@ -21,6 +30,7 @@ def establish_requests(url, params=False):
         "Referer": "https://www.nba.com/stats/",
         "Origin": "https://www.nba.com"
     }
+    instrumentation.count_call('http')
     if not params:
         # Send request
         response = requests.get(url, headers=headers)
@@ -32,9 +42,14 @@ def establish_requests(url, params=False):
 
 
 def send_message(message):
-    ds_url = config['discord_url']
+    ds_url = get_config().get('discord_url')
+    if not ds_url:
+        # Local runs and benchmarks have no webhook configured
+        print(message)
+        return
 
     m = {'content': message, 'username': 'Captain Hook'}
+    instrumentation.count_call('http')
 
     response = requests.post(ds_url, m)
 
@@ -70,6 +85,7 @@ def convert_date(date_str):
 class psql:
     def __init__(self):
 
+        config = get_config()
         try:
             print("database connection successful")
             self.connect = (psycopg2.connect(database=config['database'],
@@ -89,13 +105,16 @@ class psql:
         dtype_converter = {
             "int64": "bigint",
             "int32": "integer",
+            "int16": "smallint",
             "float64": "double precision",
             "float32": "real",
             "bool": "boolean",
             "boolean": "boolean",
             "object": "text",
             "string": "text",
+            "category": "text",
             "datetime64[ns]": "timestamp",
+            "datetime64[us]": "timestamp",
             "datetime64[ns, utc]": "timestamptz",
         }
         d = ([(col, dtype_converter[str(table[col].dtype)])
@@ -118,34 +137,38 @@ class psql:
         if cur is None:
             return
 
-        buffer = StringIO()
-        df = table.copy()
+        with instrumentation.stage(f'upload:{table_name}', rows_in=len(table)) as record:
+            buffer = StringIO()
+            df = table.copy()
 
-        df.columns = df.columns.str.replace('%', '_pct')
-        df.columns = df.columns.str.replace('3', 'three_')
-        if 'to' in table.columns:
-            df.rename(columns={'to': 'turnovers'}, inplace=True)
-        cols = ','.join([f'{i}' for i in df.columns])
-        table.to_csv(buffer, index=False, header=False)
+            df.columns = df.columns.str.replace('%', '_pct')
+            df.columns = df.columns.str.replace('3', 'three_')
+            if 'to' in table.columns:
+                df.rename(columns={'to': 'turnovers'}, inplace=True)
+            cols = ','.join([f'{i}' for i in df.columns])
+            table.to_csv(buffer, index=False, header=False)
 
-        buffer.seek(0)
+            buffer.seek(0)
 
-        cur.copy_expert(
-            f"""copy "{table_name}"
-                ({cols})
-                from stdin with (format csv)""", buffer)
+            instrumentation.count_call('db')
+            cur.copy_expert(
+                f"""copy "{table_name}"
+                    ({cols})
+                    from stdin with (format csv)""", buffer)
 
-        self.connect.commit()
+            self.connect.commit()
+            record['rows_out'] = len(table)
 
 
-    def query(self, query, params = None):
+    def query(self, query, params = None, stage = None):
         cur = self.connect.cursor()
 
+        instrumentation.count_call('db')
         cur.execute(query, params)
         columns = [desc[0] for desc in cur.description]
         data = pd.DataFrame(cur.fetchall(), columns=columns)
 
-        return data
+        return apply_schema(data, stage)
 
     def close(self):
 
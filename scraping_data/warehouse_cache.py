@@ -0,0 +1,202 @@
+"""Read-through cache for BigQuery query results.
+
+A read is keyed by a hash of the whitespace-normalized SQL, its parameters
+and the client's project. The result is stored as Parquet under
+NBA_WAREHOUSE_CACHE together with the last-modified time of every table the
+query reads; a later read of the same query is served from disk as long as
+none of those tables changed. Queries that depend on the clock
+(CURRENT_DATE, CURRENT_TIMESTAMP, ...) always go to the warehouse.
+
+The client only needs get_table(table_id).modified and
+query(sql, job_config=...).to_dataframe(), so a google.cloud.bigquery.Client
+works as is and benchmarks/fake_warehouse.py stands in for it offline.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+from scraping_data.instrumentation import count_call
+
+
+CACHE_DIR = os.environ.get('NBA_WAREHOUSE_CACHE', os.path.join(os.getcwd(), 'warehouse_cache'))
+
+BUDGET_BYTES = 500 * 1024 * 1024
+
+# Seconds a table's last-modified time is trusted before it is looked up again
+CHECK_INTERVAL = 30
+
+# Backticked `dataset.table` / `project.dataset.table`, or a bare one after FROM / JOIN
+TABLE_PATTERN = re.compile(r'`([\w-]+(?:\.[\w-]+){1,2})`|\b(?:FROM|JOIN)\s+([\w-]+\.[\w-]+(?:\.[\w-]+)?)\b', re.I)
+
+NONDETERMINISTIC = re.compile(r'\bCURRENT_(DATE|DATETIME|TIME|TIMESTAMP)\b|\b(RAND|GENERATE_UUID)\s*\(', re.I)
+
+
+def normalize_sql(query):
+    return ' '.join(query.split()).rstrip(';').strip()
+
+
+def query_tables(query):
+    """Tables a query reads, as written in the SQL."""
+    return sorted({backticked or bare for backticked, bare in TABLE_PATTERN.findall(query)})
+
+
+def _param_type(value):
+    if isinstance(value, bool):
+        return 'BOOL'
+    if isinstance(value, int):
+        return 'INT64'
+    if isinstance(value, float):
+        return 'FLOAT64'
+    if isinstance(value, datetime.datetime):
+        return 'TIMESTAMP'
+    if isinstance(value, datetime.date):
+        return 'DATE'
+    return 'STRING'
+
+
+def query_config(params):
+    """A QueryJobConfig with @name parameters, None without parameters."""
+    if not params:
+        return None
+    from google.cloud import bigquery
+
+    parameters = []
+    for name, value in params.items():
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            parameters.append(bigquery.ArrayQueryParameter(name, _param_type(values[0]) if values else 'STRING', values))
+        else:
+            parameters.append(bigquery.ScalarQueryParameter(name, _param_type(value), value))
+    return bigquery.QueryJobConfig(query_parameters=parameters)
+
+
+def cache_key(query, params=None, project=None):
+    payload = json.dumps([normalize_sql(query), params or {}, project], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class WarehouseCache:
+    """Parquet-backed query cache invalidated by table modification time.
+
+    Args:
+        client: BigQuery client (or a fake with the same two methods).
+        cache_dir (str): Where results are stored, NBA_WAREHOUSE_CACHE by default.
+        budget_bytes (int): Disk budget; least recently read results are evicted past it.
+        check_interval (float): Seconds a table's modified time is reused before re-checking.
+    """
+
+    def __init__(self, client, cache_dir=None, budget_bytes=BUDGET_BYTES, check_interval=CHECK_INTERVAL):
+        self.client = client
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.budget_bytes = budget_bytes
+        self.check_interval = check_interval
+        self.modified = {}
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'bypassed': 0}
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def table_modified(self, table):
+        """Last-modified time of a table as an ISO string, looked up at most every check_interval seconds."""
+        with self.lock:
+            checked = self.modified.get(table)
+        if checked and time.monotonic() - checked[0] < self.check_interval:
+            return checked[1]
+        count_call('bq')
+        modified = self.client.get_table(table).modified
+        modified = modified.isoformat() if modified is not None else None
+        with self.lock:
+            self.modified[table] = (time.monotonic(), modified)
+        return modified
+
+    def _run(self, query, params):
+        count_call('bq')
+        return self.client.query(query, job_config=query_config(params)).to_dataframe()
+
+    def read(self, query, params=None, tables=None):
+        """Runs the query, or returns the stored result when its tables are unchanged.
+
+        Args:
+            query (str): SQL, with @name placeholders for params.
+            params (dict, optional): Query parameters.
+            tables (list, optional): Tables the query depends on; parsed from the SQL by default.
+
+        Returns:
+            pd.DataFrame: Query result.
+        """
+        if NONDETERMINISTIC.search(query):
+            self._count('bypassed')
+            return self._run(query, params)
+
+        tables = tables or query_tables(query)
+        versions = {table: self.table_modified(table) for table in tables}
+        key = cache_key(query, params, getattr(self.client, 'project', None))
+        data_path = os.path.join(self.cache_dir, f'{key}.parquet')
+        meta_path = os.path.join(self.cache_dir, f'{key}.json')
+
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+            if meta['tables'] == versions and versions:
+                result = pd.read_parquet(data_path)
+                os.utime(data_path)
+                self._count('hits')
+                return result
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            pass
+
+        self._count('misses')
+        result = self._run(query, params)
+        # Without a known source table a result can never be validated, so it is not stored
+        if versions:
+            self._store(key, result, {'query': normalize_sql(query), 'params': params, 'tables': versions,
+                                      'rows': len(result), 'stored_at': datetime.datetime.now().isoformat()})
+        return result
+
+    def _store(self, key, result, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path = os.path.join(self.cache_dir, f'{key}.parquet')
+        try:
+            result.to_parquet(f'{data_path}.tmp', index=False)
+        except Exception as e:
+            # Columns Arrow cannot hold (e.g. mixed objects) just skip the cache
+            print(f"warehouse cache: not storing result: {e}")
+            return
+        os.replace(f'{data_path}.tmp', data_path)
+        with open(os.path.join(self.cache_dir, f'{key}.json.tmp'), 'w') as file:
+            json.dump(meta, file, default=str)
+        os.replace(os.path.join(self.cache_dir, f'{key}.json.tmp'), os.path.join(self.cache_dir, f'{key}.json'))
+        self.evict()
+
+    def evict(self):
+        """Removes least recently read results past the disk budget; returns bytes freed."""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.parquet')]
+        except FileNotFoundError:
+            return 0
+        entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries)
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in entries:
+            if total - freed <= self.budget_bytes:
+                break
+            for stale in (path, path[:-len('.parquet')] + '.json'):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            freed += size
+        return freed
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
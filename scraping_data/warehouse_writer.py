@@ -0,0 +1,212 @@
+"""Batched Parquet load jobs for BigQuery writes.
+
+Frames queued on a WarehouseWriter are grouped per destination table, staged
+as one compressed Parquet file and sent as a load job when the writer is
+flushed (or its ``with`` block exits). New tables are created partitioned by
+day on the given date column and clustered on the given columns.
+
+Three write modes:
+
+    append                 adds the rows (odds snapshots, anything time-stamped)
+    overwrite_partitions   replaces exactly the days present in the frame, so a
+                           re-run of a day is idempotent and other days are untouched
+    upsert                 replaces the rows whose keys are in the frame and inserts
+                           the rest; rows of the same days with other keys are kept
+
+A partitioned table gets one WRITE_TRUNCATE job per day (``table$YYYYMMDD``),
+submitted together. An existing unpartitioned table gets a DELETE of those
+days followed by one append. An upsert loads the frame into <table>_staging
+and MERGEs it into the table on the keys, adding any new columns to the
+table first. flush() prints and returns rows, staged bytes and upload time
+per table.
+
+The client needs get_table, update_table, load_table_from_file and query
+(for the DELETE and MERGE); benchmarks/fake_warehouse.FakeBigQueryClient
+implements them offline.
+"""
+
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from scraping_data.instrumentation import count_call
+
+
+PROJECT_ID = 'miscellaneous-projects-444203'
+DATASET = 'capstone_data'
+
+STAGING_DIR = os.environ.get('NBA_STAGING_DIR', os.path.join(tempfile.gettempdir(), 'nba_staging'))
+
+COMPRESSION = 'zstd'
+
+
+def partition_days(values):
+    """Calendar day of each value of a date, timestamp or date-string column."""
+    return pd.to_datetime(values).dt.date
+
+
+class WarehouseWriter:
+    """Queues frames and writes them to BigQuery as Parquet load jobs.
+
+    Args:
+        client: BigQuery client; a google.cloud.bigquery.Client for PROJECT_ID by default.
+        dataset (str): Dataset the table names are relative to.
+        compression (str): Parquet codec of the staged files.
+    """
+
+    def __init__(self, client=None, dataset=DATASET, compression=COMPRESSION, staging_dir=None):
+        if client is None:
+            from google.cloud import bigquery
+
+            client = bigquery.Client(project=PROJECT_ID)
+        self.client = client
+        self.dataset = dataset
+        self.compression = compression
+        self.staging_dir = staging_dir or STAGING_DIR
+        self.pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def _add(self, frame, table, mode, partition_field, cluster_fields, keys=None):
+        if frame is None or frame.empty:
+            return
+        batch = self.pending.setdefault((table, mode), {'frames': [], 'partition_field': partition_field,
+                                                        'cluster_fields': cluster_fields, 'keys': keys})
+        batch['frames'].append(frame)
+
+    def append(self, frame, table, partition_field, cluster_fields=None):
+        """Queues rows to be appended to table."""
+        self._add(frame, table, 'append', partition_field, cluster_fields)
+
+    def overwrite_partitions(self, frame, table, partition_field, cluster_fields=None):
+        """Queues rows that replace every day of partition_field they cover."""
+        self._add(frame, table, 'overwrite', partition_field, cluster_fields)
+
+    def upsert(self, frame, table, partition_field, keys, cluster_fields=None):
+        """Queues rows that replace the table's rows with the same keys and insert the rest."""
+        self._add(frame, table, 'upsert', partition_field, cluster_fields, keys)
+
+    def table_id(self, table):
+        return f'{self.client.project}.{self.dataset}.{table}'
+
+    def _stage(self, frame, name):
+        os.makedirs(self.staging_dir, exist_ok=True)
+        path = os.path.join(self.staging_dir, f'{name}-{os.getpid()}-{time.time_ns()}.parquet')
+        frame.to_parquet(path, index=False, compression=self.compression)
+        return path
+
+    def _job_config(self, write_disposition, partition_field=None, cluster_fields=None, existing=True):
+        from google.cloud import bigquery
+
+        config = bigquery.LoadJobConfig(source_format=bigquery.SourceFormat.PARQUET,
+                                        write_disposition=write_disposition)
+        if existing:
+            config.schema_update_options = [bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+        else:
+            config.time_partitioning = bigquery.TimePartitioning(type_=bigquery.TimePartitioningType.DAY,
+                                                                 field=partition_field)
+            config.clustering_fields = cluster_fields or None
+        return config
+
+    def _load(self, frame, destination, config, name):
+        path = self._stage(frame, name)
+        size = os.path.getsize(path)
+        try:
+            with open(path, 'rb') as file:
+                count_call('bq')
+                job = self.client.load_table_from_file(file, destination, job_config=config)
+        finally:
+            os.remove(path)
+        return job, size
+
+    def _existing(self, table_id):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self.client.get_table(table_id)
+        except NotFound:
+            return None
+
+    def _delete_days(self, table_id, field, days):
+        from google.cloud import bigquery
+
+        config = bigquery.QueryJobConfig(query_parameters=[bigquery.ArrayQueryParameter('days', 'DATE', days)])
+        count_call('bq')
+        self.client.query(f"DELETE FROM `{table_id}` WHERE DATE({field}) IN UNNEST(@days)", job_config=config).result()
+
+    def _merge(self, frame, table_id, existing, keys, name):
+        from google.cloud import bigquery
+
+        staging = f'{table_id}_staging'
+        config = bigquery.LoadJobConfig(source_format=bigquery.SourceFormat.PARQUET,
+                                        write_disposition='WRITE_TRUNCATE')
+        job, size = self._load(frame, staging, config, name)
+        job.result()
+
+        # MERGE cannot insert into columns the table does not have yet
+        known = {field.name for field in existing.schema}
+        added = [field for field in self.client.get_table(staging).schema if field.name not in known]
+        if added:
+            existing.schema = list(existing.schema) + added
+            self.client.update_table(existing, ['schema'])
+
+        columns = list(frame.columns)
+        count_call('bq')
+        job = self.client.query(f"""
+            MERGE `{table_id}` t
+            USING `{staging}` s
+            ON {' AND '.join(f't.{key} = s.{key}' for key in keys)}
+            WHEN MATCHED THEN UPDATE SET {', '.join(f'{col} = s.{col}' for col in columns if col not in keys)}
+            WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) VALUES ({', '.join(f's.{col}' for col in columns)})
+        """)
+        return job, size
+
+    def write_table(self, table, mode, frames, partition_field, cluster_fields=None, keys=None):
+        """Writes one table's queued frames; returns its report row."""
+        start = time.perf_counter()
+        frame = pd.concat(frames, ignore_index=True)
+        if frame[partition_field].dtype == object or pd.api.types.is_string_dtype(frame[partition_field]):
+            frame[partition_field] = partition_days(frame[partition_field])
+        table_id = self.table_id(table)
+        existing = self._existing(table_id)
+
+        jobs = []
+        if mode == 'append' or existing is None:
+            # A new table is created partitioned and clustered by its first load
+            config = self._job_config('WRITE_APPEND', partition_field, cluster_fields, existing is not None)
+            jobs.append(self._load(frame, table_id, config, table))
+        elif mode == 'upsert':
+            jobs.append(self._merge(frame, table_id, existing, keys, table))
+        elif getattr(existing.time_partitioning, 'field', None) == partition_field:
+            config = self._job_config('WRITE_TRUNCATE')
+            for day, rows in frame.groupby(partition_days(frame[partition_field]), sort=True):
+                jobs.append(self._load(rows, f'{table_id}${day:%Y%m%d}', config, table))
+        else:
+            # Tables created before partitioning: clear the days, then append
+            self._delete_days(table_id, partition_field, sorted(set(partition_days(frame[partition_field]))))
+            jobs.append(self._load(frame, table_id, self._job_config('WRITE_APPEND'), table))
+
+        for job, _ in jobs:
+            job.result()
+        return {'table': table, 'mode': mode, 'rows': len(frame), 'jobs': len(jobs),
+                'bytes': sum(size for _, size in jobs), 'seconds': time.perf_counter() - start}
+
+    def flush(self):
+        """Sends every queued table; returns [{table, mode, rows, jobs, bytes, seconds}]."""
+        pending, self.pending = self.pending, {}
+        report = []
+        for (table, mode), batch in pending.items():
+            row = self.write_table(table, mode, batch['frames'], batch['partition_field'], batch['cluster_fields'],
+                                   batch['keys'])
+            print(f"warehouse: {row['table']} {row['mode']} {row['rows']} rows in {row['jobs']} job(s), "
+                  f"{row['bytes'] / 1024:.1f} KiB staged, {row['seconds']:.2f}s")
+            report.append(row)
+        return report